@@ -3,10 +3,12 @@ from logging.config import fileConfig
 import os
 from dotenv import load_dotenv
 
+from sqlalchemy import Text
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.ext.compiler import compiles
 
 from alembic import context
 
@@ -30,6 +32,23 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
+
+
+# Ранние ревизии (8bfc0c3c7742, 98950bb5aa04) создают колонки TEXT(n): в
+# SQLite длина ни на что не влияет, а в PostgreSQL TEXT(n) - ошибка.
+# Сами ревизии не меняются, чтобы схема SQLite не зависела от того, когда
+# база была создана
+@compiles(Text, "postgresql")
+def compile_text_postgresql(type_, compiler, **kw):
+    return "TEXT"
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # R*Tree и ее служебные таблицы ведутся миграцией и триггерами вручную
+    if type_ == "table" and name.startswith("reservation_rtree"):
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -52,6 +71,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -64,6 +84,7 @@ def do_run_migrations(connection: Connection) -> None:
     context.configure(
         connection=connection,
         target_metadata=target_metadata,
+        include_object=include_object,
         render_as_batch=True,
     )
 
@@ -0,0 +1,45 @@
+"""Dropped foreign keys of reservation_archive
+
+Revision ID: 2c7f9a4d1b58
+Revises: 6b1d4e8f2a37
+Create Date: 2026-10-18 20:41:17.093514
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2c7f9a4d1b58'
+down_revision = '6b1d4e8f2a37'
+branch_labels = None
+depends_on = None
+
+
+# Ограничения в d7e2b4f81a05 созданы без имен. В PostgreSQL это имена по
+# умолчанию, в SQLite имен нет - их задает соглашение для batch-режима
+FOREIGN_KEYS = [
+    ('meetingroom_id', 'meetingroom'),
+    ('user_id', 'user'),
+]
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def foreign_key_name(column: str, referred_table: str) -> str:
+    if op.get_bind().dialect.name == "postgresql":
+        return f"reservation_archive_{column}_fkey"
+    return f"fk_reservation_archive_{column}_{referred_table}"
+
+
+def upgrade() -> None:
+    # Архив - история: удаление комнаты или пользователя его не трогает
+    with op.batch_alter_table('reservation_archive', naming_convention=NAMING_CONVENTION) as batch_op:
+        for column, referred_table in FOREIGN_KEYS:
+            batch_op.drop_constraint(foreign_key_name(column, referred_table), type_='foreignkey')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('reservation_archive', naming_convention=NAMING_CONVENTION) as batch_op:
+        for column, referred_table in FOREIGN_KEYS:
+            batch_op.create_foreign_key(
+                foreign_key_name(column, referred_table), referred_table, [column], ['id']
+            )
@@ -0,0 +1,30 @@
+"""Added composite indexes for reservation, activity and audit
+
+Revision ID: 3c9e1f4b7a20
+Revises: a14254a2bb7c
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e1f4b7a20'
+down_revision = 'a14254a2bb7c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_reservation_room_interval', 'reservation', ['meetingroom_id', 'to_reserve', 'from_reserve'], unique=False)
+    op.create_index('ix_reservation_user_interval', 'reservation', ['user_id', 'to_reserve', 'from_reserve'], unique=False)
+    op.create_index('ix_activity_log_room_user_time', 'activity_log', ['meetingroom_id', 'user_id', 'computer_time'], unique=False)
+    op.create_index(op.f('ix_auditevent_time'), 'auditevent', ['time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_auditevent_time'), table_name='auditevent')
+    op.drop_index('ix_activity_log_room_user_time', table_name='activity_log')
+    op.drop_index('ix_reservation_user_interval', table_name='reservation')
+    op.drop_index('ix_reservation_room_interval', table_name='reservation')
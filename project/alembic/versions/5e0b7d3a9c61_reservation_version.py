@@ -0,0 +1,29 @@
+"""Added version column to reservation for optimistic locking
+
+Revision ID: 5e0b7d3a9c61
+Revises: c4a81d2f6e93
+Create Date: 2026-10-18 14:02:37.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0b7d3a9c61'
+down_revision = 'c4a81d2f6e93'
+branch_labels = None
+depends_on = None
+
+
+# Без batch-режима: ADD/DROP COLUMN выполняются в SQLite на месте, таблица
+# не пересоздается и триггеры R*Tree остаются на ней
+def upgrade() -> None:
+    op.add_column(
+        'reservation',
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('reservation', 'version')
@@ -0,0 +1,31 @@
+"""Added change_log table
+
+Revision ID: 6b1d4e8f2a37
+Revises: f3b8d1c6a2e9
+Create Date: 2026-10-18 19:05:41.512877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b1d4e8f2a37'
+down_revision = 'f3b8d1c6a2e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Строки таблиц появляются при первой записи в них (app.core.changes)
+    op.create_table('change_log',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('table_name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('change_log')
@@ -0,0 +1,67 @@
+"""Added R*Tree index for reservation intervals
+
+Revision ID: 7f2d8c5e9b14
+Revises: 3c9e1f4b7a20
+Create Date: 2026-10-18 11:04:17.552930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f2d8c5e9b14'
+down_revision = '3c9e1f4b7a20'
+branch_labels = None
+depends_on = None
+
+
+# Время в R*Tree хранится целыми секундами от эпохи; та же функция
+# используется в запросах (app/crud/reservation.py), поэтому обе стороны
+# переводят наивное время одинаково
+def epoch(column: str) -> str:
+    return f"CAST(strftime('%s', {column}) AS INTEGER)"
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE reservation_rtree USING rtree_i32("
+        "id, min_room, max_room, from_reserve, to_reserve)"
+    )
+    op.execute(
+        "INSERT INTO reservation_rtree "
+        "SELECT id, meetingroom_id, meetingroom_id, "
+        f"{epoch('from_reserve')}, {epoch('to_reserve')} FROM reservation"
+    )
+    op.execute(
+        "CREATE TRIGGER reservation_rtree_insert AFTER INSERT ON reservation BEGIN "
+        "INSERT INTO reservation_rtree VALUES (new.id, new.meetingroom_id, new.meetingroom_id, "
+        f"{epoch('new.from_reserve')}, {epoch('new.to_reserve')}); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER reservation_rtree_update "
+        "AFTER UPDATE OF from_reserve, to_reserve, meetingroom_id ON reservation BEGIN "
+        "UPDATE reservation_rtree SET min_room = new.meetingroom_id, max_room = new.meetingroom_id, "
+        f"from_reserve = {epoch('new.from_reserve')}, to_reserve = {epoch('new.to_reserve')} "
+        "WHERE id = new.id; "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER reservation_rtree_delete AFTER DELETE ON reservation BEGIN "
+        "DELETE FROM reservation_rtree WHERE id = old.id; "
+        "END"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    op.execute("DROP TRIGGER IF EXISTS reservation_rtree_delete")
+    op.execute("DROP TRIGGER IF EXISTS reservation_rtree_update")
+    op.execute("DROP TRIGGER IF EXISTS reservation_rtree_insert")
+    op.execute("DROP TABLE IF EXISTS reservation_rtree")
@@ -0,0 +1,52 @@
+"""Restored NOT NULL on epoch timestamp columns
+
+Revision ID: 8e4b2f6a9c13
+Revises: 2c7f9a4d1b58
+Create Date: 2026-10-18 21:12:58.640271
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b2f6a9c13'
+down_revision = '2c7f9a4d1b58'
+branch_labels = None
+depends_on = None
+
+
+# Колонки, которые c4a81d2f6e93 до исправления пересоздавала без NOT NULL
+COLUMNS = {
+    'reservation': ['from_reserve', 'to_reserve'],
+    'activity_log': ['received_at_time'],
+    'auditevent': ['time'],
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+
+    inspector = sa.inspect(bind)
+    for table, columns in COLUMNS.items():
+        nullable = {column['name'] for column in inspector.get_columns(table) if column['nullable']}
+        columns = [column for column in columns if column in nullable]
+        if not columns:
+            continue
+        # Пересоздание таблицы в batch-режиме удаляет ее триггеры (R*Tree у reservation)
+        triggers = bind.execute(
+            sa.text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :table"),
+            {"table": table},
+        ).scalars().all()
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.BigInteger(), nullable=False)
+        for trigger in triggers:
+            op.execute(trigger)
+
+
+def downgrade() -> None:
+    # NULL в этих колонках не было и до c4a81d2f6e93: возвращать нечего
+    pass
@@ -0,0 +1,28 @@
+"""Added keyset pagination indexes for reservation
+
+Revision ID: 9a3f6c1e2d47
+Revises: 5e0b7d3a9c61
+Create Date: 2026-10-18 14:41:09.650217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a3f6c1e2d47'
+down_revision = '5e0b7d3a9c61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_reservation_from_id', 'reservation', ['from_reserve', 'id'], unique=False)
+    op.create_index('ix_reservation_room_from_id', 'reservation', ['meetingroom_id', 'from_reserve', 'id'], unique=False)
+    op.create_index('ix_reservation_user_from_id', 'reservation', ['user_id', 'from_reserve', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reservation_user_from_id', table_name='reservation')
+    op.drop_index('ix_reservation_room_from_id', table_name='reservation')
+    op.drop_index('ix_reservation_from_id', table_name='reservation')
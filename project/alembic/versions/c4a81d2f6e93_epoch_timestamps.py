@@ -0,0 +1,131 @@
+"""Store reservation, activity and audit timestamps as integer epoch
+
+Revision ID: c4a81d2f6e93
+Revises: 7f2d8c5e9b14
+Create Date: 2026-10-18 12:21:05.904113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a81d2f6e93'
+down_revision = '7f2d8c5e9b14'
+branch_labels = None
+depends_on = None
+
+
+# Колонки, которые переводятся в микросекунды от эпохи (app.core.types.EpochDateTime):
+# таблица -> [(колонка, nullable, server_default)]
+COLUMNS = {
+    'reservation': [
+        ('from_reserve', False, None),
+        ('to_reserve', False, None),
+    ],
+    'activity_log': [
+        ('received_at_time', False, 'now'),
+        ('computer_time', False, None),
+    ],
+    'auditevent': [
+        ('time', False, 'now'),
+    ],
+}
+
+INDEXES = [
+    ('ix_reservation_room_interval', 'reservation', ['meetingroom_id', 'to_reserve', 'from_reserve']),
+    ('ix_reservation_user_interval', 'reservation', ['user_id', 'to_reserve', 'from_reserve']),
+    ('ix_activity_log_room_user_time', 'activity_log', ['meetingroom_id', 'user_id', 'computer_time']),
+    ('ix_auditevent_time', 'auditevent', ['time']),
+]
+
+EPOCH_NOW = (
+    "(CAST(strftime('%s', 'now') AS INTEGER) * 1000000 "
+    "+ CAST(substr(strftime('%f', 'now'), 4) AS INTEGER) * 1000)"
+)
+
+
+# SQLAlchemy пишет DateTime в SQLite как 'YYYY-MM-DD HH:MM:SS.ffffff',
+# CURRENT_TIMESTAMP - без дробной части
+def text_to_epoch(column: str) -> str:
+    return (
+        f"CAST(strftime('%s', {column}) AS INTEGER) * 1000000 "
+        f"+ CAST(substr({column}, 21, 6) AS INTEGER)"
+    )
+
+
+def epoch_to_text(column: str) -> str:
+    return (
+        f"strftime('%Y-%m-%d %H:%M:%S', {column} / 1000000, 'unixepoch') "
+        f"|| printf('.%06d', {column} % 1000000)"
+    )
+
+
+def drop_rtree_triggers() -> None:
+    op.execute("DROP TRIGGER IF EXISTS reservation_rtree_delete")
+    op.execute("DROP TRIGGER IF EXISTS reservation_rtree_update")
+    op.execute("DROP TRIGGER IF EXISTS reservation_rtree_insert")
+
+
+# Триггеры из 7f2d8c5e9b14; пересоздание таблицы в batch-режиме их удаляет
+def create_rtree_triggers(epoch) -> None:
+    op.execute(
+        "CREATE TRIGGER reservation_rtree_insert AFTER INSERT ON reservation BEGIN "
+        "INSERT INTO reservation_rtree VALUES (new.id, new.meetingroom_id, new.meetingroom_id, "
+        f"{epoch('new.from_reserve')}, {epoch('new.to_reserve')}); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER reservation_rtree_update "
+        "AFTER UPDATE OF from_reserve, to_reserve, meetingroom_id ON reservation BEGIN "
+        "UPDATE reservation_rtree SET min_room = new.meetingroom_id, max_room = new.meetingroom_id, "
+        f"from_reserve = {epoch('new.from_reserve')}, to_reserve = {epoch('new.to_reserve')} "
+        "WHERE id = new.id; "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER reservation_rtree_delete AFTER DELETE ON reservation BEGIN "
+        "DELETE FROM reservation_rtree WHERE id = old.id; "
+        "END"
+    )
+
+
+def convert(type_, convert_sql, now_sql) -> None:
+    drop_rtree_triggers()
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
+
+    for table, columns in COLUMNS.items():
+        for column, _, _ in columns:
+            op.add_column(table, sa.Column(f'{column}_new', type_, nullable=True))
+            op.execute(f"UPDATE {table} SET {column}_new = {convert_sql(column)}")
+        with op.batch_alter_table(table) as batch_op:
+            for column, nullable, default in columns:
+                batch_op.drop_column(column)
+                batch_op.alter_column(
+                    f'{column}_new',
+                    new_column_name=column,
+                    existing_type=type_,
+                    nullable=nullable,
+                    server_default=sa.text(now_sql) if default else None,
+                )
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    convert(sa.BigInteger(), text_to_epoch, EPOCH_NOW)
+    # Секунды для R*Tree теперь получаются делением, значения не меняются
+    create_rtree_triggers(lambda column: f"{column} / 1000000")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    convert(sa.DateTime(), epoch_to_text, "(CURRENT_TIMESTAMP)")
+    create_rtree_triggers(lambda column: f"CAST(strftime('%s', {column}) AS INTEGER)")
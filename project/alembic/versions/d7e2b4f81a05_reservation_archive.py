@@ -0,0 +1,51 @@
+"""Added reservation_archive table
+
+Revision ID: d7e2b4f81a05
+Revises: 9a3f6c1e2d47
+Create Date: 2026-10-18 15:20:44.287613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e2b4f81a05'
+down_revision = '9a3f6c1e2d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Время хранится так же, как в reservation (app.core.types.EpochDateTime)
+    if op.get_bind().dialect.name == "sqlite":
+        time_type = sa.BigInteger()
+        now = (
+            "(CAST(strftime('%s', 'now') AS INTEGER) * 1000000 "
+            "+ CAST(substr(strftime('%f', 'now'), 4) AS INTEGER) * 1000)"
+        )
+    else:
+        time_type = sa.DateTime()
+        now = "CURRENT_TIMESTAMP"
+
+    op.create_table('reservation_archive',
+    sa.Column('from_reserve', time_type, nullable=True),
+    sa.Column('to_reserve', time_type, nullable=True),
+    sa.Column('meetingroom_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('confirmed_activity', sa.Boolean(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('archived_at', time_type, server_default=sa.text(now), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['meetingroom_id'], ['meetingroom.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reservation_archive_room_interval', 'reservation_archive', ['meetingroom_id', 'to_reserve', 'from_reserve'], unique=False)
+    op.create_index('ix_reservation_archive_user_interval', 'reservation_archive', ['user_id', 'to_reserve', 'from_reserve'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reservation_archive_user_interval', table_name='reservation_archive')
+    op.drop_index('ix_reservation_archive_room_interval', table_name='reservation_archive')
+    op.drop_table('reservation_archive')
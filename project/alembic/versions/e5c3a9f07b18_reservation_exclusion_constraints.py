@@ -0,0 +1,49 @@
+"""Added PostgreSQL exclusion constraints against overlapping reservations
+
+Revision ID: e5c3a9f07b18
+Revises: d7e2b4f81a05
+Create Date: 2026-10-18 16:05:12.431870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c3a9f07b18'
+down_revision = 'd7e2b4f81a05'
+branch_labels = None
+depends_on = None
+
+
+# Имена используются в app/crud/reservation.py, чтобы отличить нарушение
+# по комнате от нарушения по пользователю
+CONSTRAINTS = {
+    'reservation_room_no_overlap': 'meetingroom_id',
+    'reservation_user_no_overlap': 'user_id',
+}
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    # Две брони одной комнаты (пользователя) не могут пересекаться по
+    # времени. Интервал полуоткрытый '[)', как в проверках приложения:
+    # стыкующиеся брони разрешены. Равенство id записано как пересечение
+    # вырожденных диапазонов int4range - так GiST обходится без btree_gist.
+    # Колонки времени - timestamp without time zone, поэтому tsrange
+    for name, column in CONSTRAINTS.items():
+        op.execute(
+            f"ALTER TABLE reservation ADD CONSTRAINT {name} EXCLUDE USING gist ("
+            f"int4range({column}, {column}, '[]') WITH &&, "
+            "tsrange(from_reserve, to_reserve, '[)') WITH &&)"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    for name in CONSTRAINTS:
+        op.execute(f"ALTER TABLE reservation DROP CONSTRAINT {name}")
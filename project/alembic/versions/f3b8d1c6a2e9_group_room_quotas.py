@@ -0,0 +1,41 @@
+"""Added group room quotas and reservation_quota_counter table
+
+Revision ID: f3b8d1c6a2e9
+Revises: e5c3a9f07b18
+Create Date: 2026-10-18 17:42:19.160385
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d1c6a2e9'
+down_revision = 'e5c3a9f07b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('grouproompermission', sa.Column('max_week_duration', sa.Interval(), nullable=True))
+    op.add_column('grouproompermission', sa.Column('max_active_reservations', sa.Integer(), nullable=True))
+
+    # Таблица заполняется при старте приложения (reservation_quota_crud.rebuild)
+    op.create_table('reservation_quota_counter',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('meetingroom_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('reservations', sa.Integer(), nullable=False),
+    sa.Column('seconds', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.ForeignKeyConstraint(['meetingroom_id'], ['meetingroom.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'meetingroom_id', 'day', name='_quota_user_room_day_uc')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('reservation_quota_counter')
+    op.drop_column('grouproompermission', 'max_active_reservations')
+    op.drop_column('grouproompermission', 'max_week_duration')
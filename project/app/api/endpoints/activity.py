@@ -8,7 +8,7 @@ from fastapi_users.exceptions import UserNotExists
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.validators import check_meeting_room_exists_by_name
-from app.core.db import get_async_session
+from app.core.db import get_async_read_session, get_async_session
 from app.core.user import UserManager, get_user_manager, current_superuser
 from app.crud.activity import activity_crud
 from app.models.activity import Activity
@@ -35,6 +35,8 @@ async def post_ping_event(
             logging.info(f"User {ping.activeUser} not found.")
             raise HTTPException(status_code=404, detail=f"No such user: {ping.activeUser}")
 
+    # Запись идет через очередь записи (app.core.writer): пинги от разных
+    # компьютеров фиксируются пачками, одним коммитом
     await activity_crud.create(
         Activity(
             user_id=user.id if user else None,
@@ -54,7 +56,7 @@ async def post_ping_event(
 async def list_reports(
     meetingroom_id: int = None,
     lookback: timedelta = timedelta(minutes=5),
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_async_read_session),
 ):
     if meetingroom_id is None:
         ping_list = await activity_crud.get_multi(session=session)
@@ -1,13 +1,15 @@
 # app/api/endpoints/user.py
+from datetime import datetime, timedelta
 from typing import List
 
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.core.config import settings
+from app.core.db import get_async_read_session, get_async_session
 from app.core.user import current_superuser
 from app.crud.audit import audit_crud
-from app.crud.reservation import reservation_crud
+from app.crud.reservation_archive import reservation_archive_crud
 from app.schemas.audit import AuditBase
 
 router = APIRouter()
@@ -20,7 +22,7 @@ router = APIRouter()
     response_description="Запрос успешно получен",
 )
 async def list_audit_events(
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_async_read_session),
 ):
     events = await audit_crud.get_all(session=session)
     return events
@@ -36,4 +38,9 @@ async def list_audit_events(
         days_after: int = 45
 ):
     await audit_crud.remove_older(session=session, days=days_after)
-    await reservation_crud.remove_older(session=session, days=days_after)
\ No newline at end of file
+    # Брони не удаляются, а переносятся в архив: история нужна для отчетов
+    await reservation_archive_crud.archive_finished(
+        before=datetime.now() - timedelta(days=days_after),
+        chunk_size=settings.reservation_archive_chunk_size,
+        session=session,
+    )
\ No newline at end of file
@@ -7,8 +7,10 @@ from starlette import status
 
 from app.core import security
 from app.core.authenticators.common import auth_type_internal
-from app.core.user import UserManager, get_user_manager
-from app.schemas.config import FirstInit
+from app.core.db import statement_cache
+from app.core.user import UserManager, current_superuser, get_user_manager
+from app.crud.base import cached_cruds
+from app.schemas.config import FirstInit, ReadCacheStats, StatementCacheStats
 from app.schemas.user import UserCreate
 
 router = APIRouter()
@@ -51,4 +53,24 @@ async def init_config(
         return FirstInit(
             login=login,
             password=password
-        )
\ No newline at end of file
+        )
+
+
+@router.get(
+    "/statement_cache",
+    response_model=StatementCacheStats,
+    dependencies=[Depends(current_superuser)],
+    summary="Статистика кэша скомпилированных запросов",
+)
+async def get_statement_cache_stats():
+    return statement_cache.as_dict()
+
+
+@router.get(
+    "/read_cache",
+    response_model=list[ReadCacheStats],
+    dependencies=[Depends(current_superuser)],
+    summary="Статистика кэшей чтения CRUD",
+)
+async def get_read_cache_stats():
+    return [crud.cache.as_dict() for crud in cached_cruds]
@@ -8,7 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import Response
 
 from app.api.validators import check_timesheet_setting_exists
-from app.core.db import get_async_session
+from app.core.db import get_async_read_session, get_async_session
 from app.core.user import current_superuser
 from app.crud.timesheet_settings import timesheet_setting_crud
 from app.models import TimesheetSetting
@@ -125,7 +125,7 @@ async def add_sheet_config(
     summary="Список сконфигурированных листов",
 )
 async def get_list(
-    session: AsyncSession = Depends(get_async_session)
+    session: AsyncSession = Depends(get_async_read_session)
 ):
     configs = await timesheet_setting_crud.get_multi(session=session)
     con = []
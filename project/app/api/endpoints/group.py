@@ -6,7 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.validators import (
     check_group_exists, check_meeting_room_exists,
 )
-from app.core.db import get_async_session
+from app.core.db import get_async_read_session, get_async_session
 from app.core.user import current_user, current_superuser
 from app.crud.audit import audit_crud
 from app.crud.group import group_crud
@@ -57,7 +57,7 @@ async def create_group(
     description="Получить список всех групп",
 )
 async def get_all_groups(
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_async_read_session),
 ):
     groups = await group_crud.get_multi(session)
     return groups
@@ -163,7 +163,7 @@ async def get_group(
         title="ID группы",
         description="Любое положительное число",
     ),
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_async_read_session),
 ):
     group = await check_group_exists(group_id=group_id, session=session)
     return group
\ No newline at end of file
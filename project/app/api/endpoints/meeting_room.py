@@ -1,19 +1,24 @@
 # app/api/endpoints/meeting_room.py
-from typing import List
-from fastapi import APIRouter, Depends, Path
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.db import get_async_session
+from app.core.db import get_async_read_session, get_async_session
+from app.core.schedule import free_intervals
 from app.core.user import current_superuser, current_user
 from app.crud.audit import audit_crud
+from app.crud.group import group_crud
 from app.crud.meeting_room import meeting_room_crud
 from app.crud.reservation import reservation_crud
-from app.api.validators import check_meeting_room_exists, check_name_duplicate
+from app.api.validators import check_meeting_room_exists, check_name_duplicate, check_schedule_window
 from app.models import User
 from app.schemas.audit import AuditCreate
 from app.schemas.reservation import ReservationRoomDB
 from app.schemas.meeting_room import (
+    FreeInterval,
+    MeetingRoomAvailability,
     MeetingRoomCreate,
     MeetingRoomDB,
     MeetingRoomUpdate,
@@ -59,7 +64,7 @@ async def create_new_meeting_room(
     response_description="Список получен",
 )
 async def get_all_meeting_rooms(
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_async_read_session),
     user: User = Depends(current_user),
 ):
     """
@@ -75,6 +80,68 @@ async def get_all_meeting_rooms(
     return get_rooms
 
 
+@router.get(
+    "/availability",
+    response_model=list[MeetingRoomAvailability],
+    response_model_exclude_none=True,
+    summary="Свободное время переговорных комнат",
+    response_description="Свободные интервалы по каждой комнате",
+)
+async def get_meeting_rooms_availability(
+    from_reserve: datetime = Query(..., alias="from", description="Начало окна. Формата 2022-12-14T08:00"),
+    to_reserve: datetime = Query(..., alias="to", description="Конец окна. Формата 2022-12-14T20:00"),
+    min_duration: int = Query(0, ge=0, description="Минимальная длительность свободного интервала, минут"),
+    session: AsyncSession = Depends(get_async_read_session),
+    user: User = Depends(current_user),
+):
+    """
+    Свободные интервалы в окне [from, to) для всех комнат, которые
+    пользователь может бронировать. Прошедшее время и время дальше
+    разрешенного группе горизонта бронирования свободным не считаются.
+    """
+    if from_reserve >= to_reserve:
+        raise HTTPException(
+            status_code=422,
+            detail="Время начала окна не может быть больше его окончания",
+        )
+
+    now = datetime.now()
+    # Для каждой комнаты - крайний момент, до которого группе можно бронировать
+    horizons = {}
+    if user.is_superuser or settings.bypass_group_perms:
+        rooms = await meeting_room_crud.get_multi(session)
+    else:
+        rooms = await meeting_room_crud.get_allowed_rooms(group_id=user.group_id, session=session)
+        group = await group_crud.get(obj_id=user.group_id, session=session)
+        for perm in group.permissions if group is not None else []:
+            horizon = now + perm.max_future_reservation
+            horizons[perm.meetingroom_id] = min(horizons.get(perm.meetingroom_id, horizon), horizon)
+
+    window_start = max(from_reserve, now)
+    busy = await reservation_crud.get_rooms_busy_intervals(
+        meetingroom_ids=[room.id for room in rooms],
+        from_reserve=window_start,
+        to_reserve=to_reserve,
+        session=session,
+    )
+    min_duration = timedelta(minutes=min_duration)
+    return [
+        MeetingRoomAvailability(
+            meetingroom=MeetingRoomDB.model_validate(room),
+            free=[
+                FreeInterval(from_reserve=free_from, to_reserve=free_to)
+                for free_from, free_to in free_intervals(
+                    busy[room.id],
+                    window_start,
+                    min(to_reserve, horizons.get(room.id, to_reserve)),
+                    min_duration,
+                )
+            ],
+        )
+        for room in rooms
+    ]
+
+
 # Обновление объекта передаём PATH методом
 @router.patch(
     "/{meeting_room_id}",
@@ -188,10 +255,26 @@ async def get_reservations_for_room(
         description="Любое положительное число",
     ),
     history: bool = False,
-    session: AsyncSession = Depends(get_async_session),
+    from_reserve: Optional[datetime] = Query(None, alias="from", description="Начало окна. Формата 2022-12-14T00:00"),
+    to_reserve: Optional[datetime] = Query(None, alias="to", description="Конец окна. Формата 2022-12-21T00:00"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.reservation_page_max_limit),
+    session: AsyncSession = Depends(get_async_read_session),
 ):
+    """
+    Будущие брони комнаты, с history=true - прошедшие, от новых к старым
+
+    - **from**, **to** = Окно: все брони, пересекающиеся с [from, to), и прошедшие,
+      и будущие; history при этом не учитывается
+    - **limit** = Не больше limit броней
+    """
+    check_schedule_window(from_reserve, to_reserve)
     await check_meeting_room_exists(meeting_room_id, session)
     reservations = await reservation_crud.get_reservations_for_room(
-        room_id=meeting_room_id, session=session, include_past=history
+        room_id=meeting_room_id,
+        session=session,
+        include_past=history,
+        from_reserve=from_reserve,
+        to_reserve=to_reserve,
+        limit=limit,
     )
     return reservations
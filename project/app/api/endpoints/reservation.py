@@ -1,25 +1,47 @@
 # app/api/endpoints/reservation.py
-from fastapi import APIRouter, Depends, Path
+from datetime import datetime
+from typing import Optional, Union
+
+from fastapi import APIRouter, Body, Depends, Header, Path, Query, Response
 from fastapi import HTTPException
 from fastapi_users.exceptions import UserNotExists
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.validators import (
-    check_meeting_room_exists,
+    check_overlap_violation,
+    check_reservation_context,
     check_reservation_intersections,
+    check_reservation_slots,
+    check_reservations_bulk,
+    check_series_intersections,
     check_reservation_before_edit,
+    check_reservation_cursor,
+    check_reservation_version,
+    check_schedule_window,
+    reservation_version_conflict,
     check_user_exists, check_reservation_permissions, check_reservation_exist,
 )
-from app.core.db import get_async_session
+from app.core.config import settings
+from app.core.db import get_async_read_session, get_async_session, overlap_savepoint
 from app.core.user import current_user, current_superuser, get_user_manager
+from app.core.writer import write_queue
 from app.crud.audit import audit_crud
 from app.crud.reservation import reservation_crud
 from app.models import User
 from app.schemas.audit import AuditCreate
 from app.schemas.reservation import (
+    BulkItemError,
+    BulkMode,
+    ReservationBulkCreate,
+    ReservationBulkDelete,
+    ReservationBulkResult,
     ReservationRoomDB,
     ReservationRoomUpdate,
     ReservationRoomCreate,
+    ReservationSlot,
+    ReservationSlotCheck,
+    encode_cursor,
 )
 
 router = APIRouter()
@@ -29,7 +51,7 @@ router = APIRouter()
 # параметра response_model_exclude_none=True
 @router.post(
     "/",
-    response_model=ReservationRoomDB,
+    response_model=Union[ReservationRoomDB, list[ReservationRoomDB]],
     summary="Зарезервировать комнату",
     response_description="Комната зарезервирована",
 )
@@ -48,11 +70,12 @@ async def create_reservation(
     - **user_id** = Опциональное поле. ID пользователя, для которого создается бронь.
       Если указано, то пользователь должен быть суперпользователем.
       Если не указано, то бронь создается для текущего пользователя.
+    - **repeat** = Опциональное поле. Повторение брони: frequency (daily/weekly),
+      interval, until (дата) или count. Если указано, создается серия броней
+      и возвращается их список.
     """
-    meeting_room = await check_meeting_room_exists(reservation.meetingroom_id, session)
-
     # Определяем, для какого пользователя создаем бронь
-    reservation_user = user
+    reservation_user_id = user.id
     if reservation.user_id is not None:
         # Проверяем, является ли текущий пользователь суперпользователем
         if not user.is_superuser:
@@ -60,41 +83,280 @@ async def create_reservation(
                 status_code=403,
                 detail="Только суперпользователь может создавать бронирования для других пользователей"
             )
-        # Проверяем существование пользователя, для которого создаем бронь
-        reservation_user = await check_user_exists(user_id=reservation.user_id, session=session)
-    # cyclic but syncs both variables
-    reservation.user_id = reservation_user.id
+        # В схеме user_id - строка, а в запросы передаем число, как в колонке:
+        # PostgreSQL, в отличие от SQLite, не сравнивает integer со строкой
+        if not reservation.user_id.strip().isdigit():
+            raise HTTPException(
+                status_code=404,
+                detail=f"Пользователь не найден ID: {reservation.user_id}"
+            )
+        reservation_user_id = int(reservation.user_id)
 
-    if not user.is_superuser:
-        await check_reservation_permissions(
+    # Проверки, запись брони и аудита - одна запись очереди записи
+    # (app.core.writer): в одной транзакции, коммит делает очередь
+    async def write(session: AsyncSession):
+        # Комната, пользователь, права группы и пересечения - одним запросом
+        context = await check_reservation_context(
+            from_reserve=reservation.from_reserve,
             to_reserve=reservation.to_reserve,
-            meetingroom=meeting_room,
-            user=reservation_user,
-            session=session
+            meetingroom_id=reservation.meetingroom_id,
+            user_id=reservation_user_id,
+            session=session,
         )
+        meeting_room = context.MeetingRoom
+        reservation_user = context.User
+        # cyclic but syncs both variables
+        reservation.user_id = reservation_user.id
+        occurrences = reservation.occurrences()
 
-    await check_reservation_intersections(
-        # Т.к. Валидатор принимает **kwargs, аргументы нужно передать
-        # с указанием ключей
-        from_reserve=reservation.from_reserve,
-        to_reserve=reservation.to_reserve,
-        meetingroom_id=reservation.meetingroom_id,
-        user_id=reservation_user.id,
-        session=session
-    )
+        if not user.is_superuser:
+            await check_reservation_permissions(
+                # Для серии ограничение проверяется по последней брони
+                to_reserve=occurrences[-1][1],
+                meetingroom=meeting_room,
+                user=reservation_user,
+                session=session,
+                context=context,
+                # Квоты - по всем броням серии сразу
+                occurrences=occurrences,
+            )
 
-    new_reservation = await reservation_crud.create(reservation, session)
+        if reservation.repeat is not None:
+            await check_series_intersections(
+                occurrences=occurrences,
+                meetingroom_id=reservation.meetingroom_id,
+                user_id=reservation_user.id,
+                session=session,
+            )
+            try:
+                async with overlap_savepoint(session):
+                    new_reservations = await reservation_crud.create_many(
+                        [
+                            dict(
+                                from_reserve=from_reserve,
+                                to_reserve=to_reserve,
+                                meetingroom_id=reservation.meetingroom_id,
+                                user_id=reservation_user.id,
+                            )
+                            for from_reserve, to_reserve in occurrences
+                        ],
+                        session,
+                        commit=False,
+                    )
+            except IntegrityError as error:
+                await check_overlap_violation(error, session, lambda: check_series_intersections(
+                    occurrences=occurrences,
+                    meetingroom_id=reservation.meetingroom_id,
+                    user_id=reservation_user.id,
+                    session=session,
+                ))
 
-    # создаем аудит
-    event = AuditCreate(
-        description="Создано бронирование: {0}".format(
-            new_reservation
-        ),
-        user_id=user.id
-    )
-    await audit_crud.create(event, session)
+            # один аудит на всю серию
+            event = AuditCreate(
+                description="Создана серия из {0} бронирований ({1}), первое: {2}, последнее: {3}".format(
+                    len(new_reservations),
+                    reservation.repeat.frequency.value,
+                    new_reservations[0],
+                    new_reservations[-1],
+                ),
+                user_id=user.id
+            )
+            await audit_crud.create(event, session, commit=False)
 
-    return new_reservation
+            return new_reservations
+
+        await check_reservation_intersections(
+            # Т.к. Валидатор принимает **kwargs, аргументы нужно передать
+            # с указанием ключей
+            from_reserve=reservation.from_reserve,
+            to_reserve=reservation.to_reserve,
+            meetingroom_id=reservation.meetingroom_id,
+            user_id=reservation_user.id,
+            session=session,
+            context=context,
+        )
+
+        try:
+            async with overlap_savepoint(session):
+                new_reservation = await reservation_crud.create(reservation, session, commit=False)
+        except IntegrityError as error:
+            await check_overlap_violation(error, session, lambda: check_reservation_intersections(
+                from_reserve=reservation.from_reserve,
+                to_reserve=reservation.to_reserve,
+                meetingroom_id=reservation.meetingroom_id,
+                user_id=reservation_user.id,
+                session=session,
+            ))
+
+        # создаем аудит
+        event = AuditCreate(
+            description="Создано бронирование: {0}".format(
+                new_reservation
+            ),
+            user_id=user.id
+        )
+        await audit_crud.create(event, session, commit=False)
+
+        return new_reservation
+
+    return await write_queue.execute(session, write)
+
+
+@router.post(
+    "/check",
+    response_model=list[ReservationSlotCheck],
+    summary="Проверить слоты перед бронированием",
+    response_description="Результат проверки каждого слота",
+)
+async def check_reservation_slots_available(
+    slots: list[ReservationSlot] = Body(..., max_length=settings.reservation_check_max_slots),
+    session: AsyncSession = Depends(get_async_read_session),
+    user: User = Depends(current_user),
+):
+    """
+    Проверка списка слотов для текущего пользователя без бронирования:
+    пересечения, права группы и длительность, как при создании брони.
+
+    - **meetingroom_id** = Целое число. ID переговорной комнаты
+    - **from_reserve** = Дата начала бронирования. Формата 2022-12-14T23:06
+    - **to_reserve** = Дата окончания бронирования. Формата 2022-12-15T08:56
+
+    Результаты возвращаются в порядке слотов в запросе.
+    """
+    return await check_reservation_slots(slots, user, session)
+
+
+@router.post(
+    "/bulk",
+    response_model=ReservationBulkResult,
+    summary="Массовое создание броней",
+    response_description="Созданные брони и ошибки по элементам",
+)
+async def create_reservations_bulk(
+    bulk: ReservationBulkCreate,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_superuser),
+):
+    """
+    (Могут пользоваться только суперпользователи)
+    Создание пачки броней одной транзакцией:
+
+    - **items** = Брони: meetingroom_id, from_reserve, to_reserve и
+      опционально user_id (по умолчанию - текущий пользователь)
+    - **mode** = all_or_nothing (по умолчанию) - при любой ошибке ничего не
+      создается и возвращается 422 с ошибками; best_effort - создаются все
+      брони без ошибок
+    """
+    async def write(session: AsyncSession):
+        item_errors = await check_reservations_bulk(bulk.items, user, session)
+        errors = [
+            BulkItemError(index=index, errors=item_error)
+            for index, item_error in enumerate(item_errors) if item_error
+        ]
+        if errors and bulk.mode == BulkMode.all_or_nothing:
+            raise HTTPException(status_code=422, detail=[error.model_dump() for error in errors])
+
+        try:
+            async with overlap_savepoint(session):
+                reservations = await reservation_crud.create_many(
+                    [
+                        dict(
+                            from_reserve=item.from_reserve,
+                            to_reserve=item.to_reserve,
+                            meetingroom_id=item.meetingroom_id,
+                            user_id=item.user_id if item.user_id is not None else user.id,
+                        )
+                        for item, item_error in zip(bulk.items, item_errors) if not item_error
+                    ],
+                    session,
+                    commit=False,
+                )
+        except IntegrityError as error:
+            async def recheck():
+                recheck_errors = await check_reservations_bulk(bulk.items, user, session)
+                if any(recheck_errors):
+                    raise HTTPException(status_code=422, detail=[
+                        BulkItemError(index=index, errors=item_error).model_dump()
+                        for index, item_error in enumerate(recheck_errors) if item_error
+                    ])
+
+            await check_overlap_violation(error, session, recheck)
+
+        # аудит - по событию на бронь, одним INSERT
+        await audit_crud.create_many(
+            [
+                AuditCreate(
+                    description="Создано бронирование: {0}".format(reservation),
+                    user_id=user.id
+                )
+                for reservation in reservations
+            ],
+            session,
+            commit=False,
+        )
+
+        return {"reservations": reservations, "errors": errors}
+
+    return await write_queue.execute(session, write)
+
+
+@router.delete(
+    "/bulk",
+    response_model=ReservationBulkResult,
+    summary="Массовое удаление броней",
+    response_description="Удаленные брони и ошибки по элементам",
+)
+async def delete_reservations_bulk(
+    bulk: ReservationBulkDelete,
+    session: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_superuser),
+):
+    """
+    (Могут пользоваться только суперпользователи)
+    Удаление пачки броней одной транзакцией:
+
+    - **ids** = Список ID броней
+    - либо **from_reserve**, **to_reserve** и опционально **meetingroom_id** =
+      удалить все брони, пересекающиеся с этим временем
+    - **mode** = all_or_nothing (по умолчанию) - если какой-то брони нет,
+      ничего не удаляется и возвращается 422; best_effort - удаляются найденные
+    """
+    async def write(session: AsyncSession):
+        errors = []
+        if bulk.ids is not None:
+            found = {
+                reservation.id: reservation
+                for reservation in await reservation_crud.get_multi_by_ids(bulk.ids, session)
+            }
+            errors = [
+                BulkItemError(index=index, errors=["Бронь не найдена!"])
+                for index, reservation_id in enumerate(bulk.ids) if reservation_id not in found
+            ]
+            reservations = [found[reservation_id] for reservation_id in dict.fromkeys(bulk.ids) if reservation_id in found]
+        else:
+            reservations = await reservation_crud.get_reservations_at_the_same_time(
+                from_reserve=bulk.from_reserve,
+                to_reserve=bulk.to_reserve,
+                meetingroom_id=bulk.meetingroom_id,
+                session=session,
+            )
+        if errors and bulk.mode == BulkMode.all_or_nothing:
+            raise HTTPException(status_code=422, detail=[error.model_dump() for error in errors])
+
+        # Текст аудита - до удаления, пока брони загружены
+        events = [
+            AuditCreate(
+                description="Удалено бронирование: {0}".format(reservation),
+                user_id=user.id
+            )
+            for reservation in reservations
+        ]
+        reservations = await reservation_crud.remove_many(reservations, session, commit=False)
+        await audit_crud.create_many(events, session, commit=False)
+
+        return {"reservations": reservations, "errors": errors}
+
+    return await write_queue.execute(session, write)
 
 
 @router.get(
@@ -105,13 +367,48 @@ async def create_reservation(
     description="Получить список зарезервированных комнат",
 )
 async def get_all_reservation(
+    response: Response,
     current: bool = False,
-    session: AsyncSession = Depends(get_async_session),
+    limit: int = Query(settings.reservation_page_limit, ge=1, le=settings.reservation_page_max_limit),
+    cursor: Optional[str] = Query(None, description="Значение заголовка X-Next-Cursor предыдущей страницы"),
+    room_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    from_reserve: Optional[datetime] = Query(None, alias="from"),
+    to_reserve: Optional[datetime] = Query(None, alias="to"),
+    session: AsyncSession = Depends(get_async_read_session),
 ):
+    """
+    Брони по возрастанию времени начала, страницами по **limit** штук.
+    Если есть следующая страница, ее курсор возвращается в заголовке
+    X-Next-Cursor и передается в параметре **cursor**.
+
+    - **room_id**, **user_id** = Только брони комнаты или пользователя
+    - **from**, **to** = Только брони, пересекающиеся с этим интервалом
+    - **current** = Только идущие сейчас брони, без постраничной выдачи
+    """
     if current:
         reservations = await reservation_crud.get_reservations_current(session)
-    else:
-        reservations = await reservation_crud.get_multi(session)
+        return reservations
+
+    if from_reserve is not None and to_reserve is not None and from_reserve >= to_reserve:
+        raise HTTPException(
+            status_code=422,
+            detail="Время начала окна не может быть больше его окончания",
+        )
+    # Берем на одну бронь больше, чтобы узнать, есть ли следующая страница
+    reservations = await reservation_crud.get_page(
+        limit=limit + 1,
+        after=check_reservation_cursor(cursor),
+        meetingroom_id=room_id,
+        user_id=user_id,
+        from_reserve=from_reserve,
+        to_reserve=to_reserve,
+        session=session,
+    )
+    if len(reservations) > limit:
+        reservations = reservations[:limit]
+        last = reservations[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.from_reserve, last.id)
     return reservations
 
 
@@ -128,6 +425,8 @@ async def delete_reservation(
         title="ID резервирования",
         description="Любое положительное число",
     ),
+    if_match: Optional[str] = Header(None, description="Версия брони, например \"3\""),
+    version: Optional[int] = Query(None, ge=1, description="Версия брони, альтернатива If-Match"),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_user),
 ):
@@ -135,22 +434,32 @@ async def delete_reservation(
     Удаление резервирования комнаты:
 
     - **reservation_id** = ID резервирования для удаления
+    - **If-Match** / **version** = Опционально. Версия брони, которую видел клиент.
+      Если бронь с тех пор изменили - 409
     """
-    reservation = await check_reservation_before_edit(
-        reservation_id, session, user
-    )
-    reservation = await reservation_crud.remove(reservation, session)
-
-    # создаем аудит
-    event = AuditCreate(
-        description="Удалено бронирование: {0}".format(
-            reservation
-        ),
-        user_id=user.id
-    )
-    await audit_crud.create(event, session)
+    async def write(session: AsyncSession):
+        reservation = await check_reservation_before_edit(
+            reservation_id, session, user
+        )
+        expected_version = check_reservation_version(reservation, if_match, version)
+        reservation = await reservation_crud.remove_if_version(
+            reservation, expected_version, session, commit=False
+        )
+        if reservation is None:
+            raise reservation_version_conflict()
+
+        # создаем аудит
+        event = AuditCreate(
+            description="Удалено бронирование: {0}".format(
+                reservation
+            ),
+            user_id=user.id
+        )
+        await audit_crud.create(event, session, commit=False)
 
-    return reservation
+        return reservation
+
+    return await write_queue.execute(session, write)
 
 
 @router.patch(
@@ -168,6 +477,8 @@ async def update_reservation(
         description="Любое положительное число",
     ),
     reservation_edit: ReservationRoomUpdate,
+    if_match: Optional[str] = Header(None, description="Версия брони, например \"3\""),
+    version: Optional[int] = Query(None, ge=1, description="Версия брони, альтернатива If-Match"),
     session: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_user),
     user_manager = Depends(get_user_manager),
@@ -181,6 +492,8 @@ async def update_reservation(
     - **user_id** = Опциональное поле. ID пользователя, для которого изменяется бронь.
       Если указано, то пользователь должен быть суперпользователем.
       Если не указано, то бронь изменяется для текущего пользователя.
+    - **If-Match** / **version** = Опционально. Версия брони, которую видел клиент.
+      Если бронь с тех пор изменили - 409
     """
 
     if reservation_edit.user_id is not None:
@@ -189,46 +502,85 @@ async def update_reservation(
             detail="Редактирование не поддерживает смену пользователя"
         )
 
-    # Проверяем, что объект бронирования уже существует
-    reservation_before = await check_reservation_exist(
-        reservation_id, session
-    )
+    async def write(session: AsyncSession):
+        # Проверяем, что объект бронирования уже существует
+        reservation_before = await check_reservation_exist(
+            reservation_id, session
+        )
+        # Устаревшую версию отклоняем до проверок пересечений и прав
+        expected_version = check_reservation_version(reservation_before, if_match, version)
+        # Запоминаем, как бронь выглядела до изменения: дальше объект обновится
+        description_before = str(reservation_before)
 
-    if not user.is_superuser:
-        await check_reservation_permissions(
+        context = await check_reservation_context(
+            from_reserve=reservation_edit.from_reserve,
             to_reserve=reservation_edit.to_reserve,
-            meetingroom=reservation_before.meetingroom,
-            user=reservation_before.user,
-            session=session
+            meetingroom_id=reservation_before.meetingroom_id,
+            user_id=reservation_before.user_id,
+            reservation_id=reservation_id,
+            session=session,
         )
 
-    # Проверяем, что нет пересечений с другими бронированиями
-    await check_reservation_intersections(
-        # Новое время бронирования, распаковываем на ключевые аргументы
-        from_reserve=reservation_edit.from_reserve,
-        to_reserve=reservation_edit.to_reserve,
-        reservation_id=reservation_id,
-        meetingroom_id=reservation_before.meetingroom_id,
-        user_id=reservation_before.user_id,
-        session=session,
-    )
+        if not user.is_superuser:
+            await check_reservation_permissions(
+                to_reserve=reservation_edit.to_reserve,
+                meetingroom=reservation_before.meetingroom,
+                user=reservation_before.user,
+                session=session,
+                context=context,
+                occurrences=[(reservation_edit.from_reserve, reservation_edit.to_reserve)],
+                replaced=reservation_before,
+            )
 
-    reservation = await reservation_crud.update(
-        db_obj=reservation_before, obj_in=reservation_edit, session=session
-    )
+        # Проверяем, что нет пересечений с другими бронированиями
+        await check_reservation_intersections(
+            # Новое время бронирования, распаковываем на ключевые аргументы
+            from_reserve=reservation_edit.from_reserve,
+            to_reserve=reservation_edit.to_reserve,
+            reservation_id=reservation_id,
+            meetingroom_id=reservation_before.meetingroom_id,
+            user_id=reservation_before.user_id,
+            session=session,
+            context=context,
+        )
 
-    # создаем аудит
-    event = AuditCreate(
-        description="Изменено бронирование {0}, было: {1}, стало: {2}".format(
-            reservation.id,
-            reservation_before,
-            reservation
-        ),
-        user_id=user.id
-    )
-    await audit_crud.create(event, session)
+        # Откат точки сохранения сбросит загруженные значения брони
+        meetingroom_id, user_id = reservation_before.meetingroom_id, reservation_before.user_id
+        try:
+            async with overlap_savepoint(session):
+                reservation = await reservation_crud.update_if_version(
+                    db_obj=reservation_before,
+                    obj_in=reservation_edit,
+                    version=expected_version,
+                    session=session,
+                    commit=False,
+                )
+        except IntegrityError as error:
+            await check_overlap_violation(error, session, lambda: check_reservation_intersections(
+                from_reserve=reservation_edit.from_reserve,
+                to_reserve=reservation_edit.to_reserve,
+                reservation_id=reservation_id,
+                meetingroom_id=meetingroom_id,
+                user_id=user_id,
+                session=session,
+            ))
+        if reservation is None:
+            raise reservation_version_conflict()
+
+        # создаем аудит
+        event = AuditCreate(
+            description="Изменено бронирование {0}, было: {1}, стало: {2}".format(
+                reservation.id,
+                description_before,
+                reservation
+            ),
+            user_id=user.id
+        )
+        await audit_crud.create(event, session, commit=False)
+
+        return reservation
 
-    return reservation
+    return await write_queue.execute(session, write)
 
 
 @router.get(
@@ -238,15 +590,28 @@ async def update_reservation(
     response_model_exclude={"user_id"},
 )
 async def get_my_reservations(
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_async_read_session),
     user: User = Depends(current_user),
     history: bool = False,
+    from_reserve: Optional[datetime] = Query(None, alias="from", description="Начало окна. Формата 2022-12-14T00:00"),
+    to_reserve: Optional[datetime] = Query(None, alias="to", description="Конец окна. Формата 2022-12-21T00:00"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.reservation_page_max_limit),
 ):
     """
     Показывает список всех бронирований переговорных комнат для текущего пользователя
+
+    - **from**, **to** = Окно: все брони, пересекающиеся с [from, to), и прошедшие,
+      и будущие; history при этом не учитывается
+    - **limit** = Не больше limit броней
     """
+    check_schedule_window(from_reserve, to_reserve)
     reservations = await reservation_crud.get_reservations_for_user(
-        user_id=user.id, session=session, include_past=history
+        user_id=user.id,
+        session=session,
+        include_past=history,
+        from_reserve=from_reserve,
+        to_reserve=to_reserve,
+        limit=limit,
     )
     return reservations
 
@@ -267,10 +632,22 @@ async def get_reservations_for_user(
         description="Любое положительное число",
     ),
     history: bool = False,
-    session: AsyncSession = Depends(get_async_session),
+    from_reserve: Optional[datetime] = Query(None, alias="from", description="Начало окна. Формата 2022-12-14T00:00"),
+    to_reserve: Optional[datetime] = Query(None, alias="to", description="Конец окна. Формата 2022-12-21T00:00"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.reservation_page_max_limit),
+    session: AsyncSession = Depends(get_async_read_session),
 ):
+    """
+    Брони пользователя, параметры - как у /my_reservations
+    """
+    check_schedule_window(from_reserve, to_reserve)
     await check_user_exists(user_id=id, session=session)
     reservations = await reservation_crud.get_reservations_for_user(
-        user_id=id, session=session, include_past=history
+        user_id=id,
+        session=session,
+        include_past=history,
+        from_reserve=from_reserve,
+        to_reserve=to_reserve,
+        limit=limit,
     )
     return reservations
\ No newline at end of file
@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.authenticators.common import auth_type_internal
-from app.core.db import get_async_session
+from app.core.db import get_async_read_session
 from app.core.user import auth_backend, fastapi_users, current_user
 from app.crud.user import user_crud
 from app.schemas.user import UserRead, UserUpdate, UserCreate
@@ -56,7 +56,7 @@ router.include_router(
     tags=["users"],
 )
 async def list_users(
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_async_read_session),
 ):
     users = await user_crud.get_multi(session=session)
     return users
\ No newline at end of file
@@ -1,20 +1,32 @@
 # app/api/validators.py
 import logging
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, NoReturn, Optional
 
 from fastapi import HTTPException
+from sqlalchemy import Row
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.schedule import IntervalList, ScheduleEntry, schedule_store
 from app.crud.group import group_crud
 from app.crud.meeting_room import meeting_room_crud
-from app.crud.reservation import reservation_crud
+from app.crud.reservation import ROOM_OVERLAP_CONSTRAINT, overlap_constraint, reservation_crud
+from app.crud.reservation_quota import QuotaKey, quota_key, reservation_quota_crud, week_start
 from app.crud.timesheet_settings import timesheet_setting_crud
 from app.crud.user import user_crud
 from app.models import Group, TimesheetSetting
 from app.models import GroupRoomPermission
 from app.models import MeetingRoom, Reservation, User
+from app.schemas.reservation import (
+    ReservationBulkItem,
+    ReservationSlot,
+    ReservationSlotCheck,
+    decode_cursor,
+    from_reserve_error,
+    interval_error,
+)
 
 
 # Корутина, которая проверяет уникальность имени переговорной
@@ -81,58 +93,451 @@ async def check_timesheet_setting_exists(
 
 
 
-async def check_reservation_intersections(
+# Корутина, которая одним запросом получает все данные для проверок брони:
+# комнату, пользователя, право группы на комнату и флаги пересечений.
+# Результат передается в остальные валидаторы параметром context
+async def check_reservation_context(
         from_reserve: datetime,
         to_reserve: datetime,
         meetingroom_id: int,
         user_id: int,
         session: AsyncSession,
         reservation_id: Optional[int] = None,
-) -> None:
-    reservation = await reservation_crud.get_room_reservations_at_the_same_time(
-        from_reserve = from_reserve,
+) -> Row:
+    context = await reservation_crud.get_reservation_context(
+        from_reserve=from_reserve,
         to_reserve=to_reserve,
         meetingroom_id=meetingroom_id,
+        user_id=user_id,
+        reservation_id=reservation_id,
         session=session,
-        reservation_id=reservation_id
     )
-    if reservation:
-        raise HTTPException(status_code=422, detail="Двойное бронирование одной комнаты, уже есть бронь:"+str(reservation))
+    if context is None:
+        raise HTTPException(status_code=404, detail=f"Переговорка не найдена ID: {meetingroom_id}")
+    if context.User is None:
+        raise HTTPException(status_code=404, detail=f"Пользователь не найден ID: {user_id}")
+    return context
 
-    reservation = await reservation_crud.get_user_reservations_at_the_same_time(
-        from_reserve = from_reserve,
-        to_reserve=to_reserve,
-        user_id=user_id,
+
+def room_intersection_detail(reservations: list[Reservation]) -> str:
+    return "Двойное бронирование одной комнаты, уже есть бронь:"+str(reservations)
+
+
+def user_intersection_detail(reservations: list[Reservation]) -> str:
+    return "Двойное бронирование одним человеком, уже есть бронь:"+str(reservations)
+
+
+async def check_reservation_intersections(
+        from_reserve: datetime,
+        to_reserve: datetime,
+        meetingroom_id: int,
+        user_id: int,
+        session: AsyncSession,
+        reservation_id: Optional[int] = None,
+        context: Optional[Row] = None,
+) -> None:
+    # Сначала дешевая проверка EXISTS (или готовый флаг из context), брони
+    # для текста ошибки выбираем только если пересечение действительно есть
+    if context is not None:
+        room_busy = context.room_busy
+    else:
+        room_busy = await reservation_crud.room_has_reservations_at_the_same_time(
+            from_reserve=from_reserve,
+            to_reserve=to_reserve,
+            meetingroom_id=meetingroom_id,
+            session=session,
+            reservation_id=reservation_id
+        )
+    if room_busy:
+        reservation = await reservation_crud.get_room_reservations_at_the_same_time(
+            from_reserve = from_reserve,
+            to_reserve=to_reserve,
+            meetingroom_id=meetingroom_id,
+            session=session,
+            reservation_id=reservation_id
+        )
+        raise HTTPException(status_code=422, detail=room_intersection_detail(reservation))
+
+    if context is not None:
+        user_busy = context.user_busy
+    else:
+        user_busy = await reservation_crud.user_has_reservations_at_the_same_time(
+            from_reserve=from_reserve,
+            to_reserve=to_reserve,
+            user_id=user_id,
+            session=session,
+            reservation_id=reservation_id
+        )
+    if user_busy:
+        reservation = await reservation_crud.get_user_reservations_at_the_same_time(
+            from_reserve = from_reserve,
+            to_reserve=to_reserve,
+            user_id=user_id,
+            session=session,
+            reservation_id=reservation_id
+        )
+        raise HTTPException(status_code=422, detail=user_intersection_detail(reservation))
+
+async def check_overlap_violation(
+        error: IntegrityError,
+        session: AsyncSession,
+        recheck: Optional[Callable[[], Awaitable[None]]] = None,
+) -> NoReturn:
+    """
+    Запись отклонило EXCLUDE-ограничение PostgreSQL: бронь пересеклась с
+    записанной параллельно. Запись уже откачена до точки сохранения
+    (overlap_savepoint), повторяем проверку пересечений (recheck), чтобы
+    вернуть тот же 422, что и без гонки. Прочие ошибки целостности
+    пробрасываются как есть.
+    """
+    constraint = overlap_constraint(error)
+    if constraint is None:
+        raise error
+    # Чужой брони в расписании этого процесса нет - перечитаем его
+    schedule_store.invalidate()
+    if recheck is not None:
+        await recheck()
+    if constraint == ROOM_OVERLAP_CONSTRAINT:
+        detail = "Двойное бронирование одной комнаты: это время только что заняли"
+    else:
+        detail = "Двойное бронирование одним человеком: это время только что заняли"
+    raise HTTPException(status_code=422, detail=detail)
+
+
+# Корутина, которая проверяет пересечения сразу для всех броней серии:
+# один запрос на всю серию вместо проверки каждой брони
+async def check_series_intersections(
+        occurrences: list[tuple[datetime, datetime]],
+        meetingroom_id: int,
+        user_id: int,
+        session: AsyncSession,
+) -> None:
+    conflicts = await reservation_crud.get_slots_reservations_at_the_same_time(
+        slots=[
+            (meetingroom_id, user_id, from_reserve, to_reserve)
+            for from_reserve, to_reserve in occurrences
+        ],
         session=session,
-        reservation_id=reservation_id
     )
-    if reservation:
-        raise HTTPException(status_code=422, detail="Двойное бронирование одним человеком, уже есть бронь:"+str(reservation))
+    # Одна бронь может пересекаться с несколькими бронями серии
+    room_reservations = {}
+    user_reservations = {}
+    for room_conflicts, user_conflicts in conflicts:
+        room_reservations.update((reservation.id, reservation) for reservation in room_conflicts)
+        user_reservations.update((reservation.id, reservation) for reservation in user_conflicts)
+    if room_reservations:
+        raise HTTPException(status_code=422, detail=room_intersection_detail(list(room_reservations.values())))
+    if user_reservations:
+        raise HTTPException(status_code=422, detail=user_intersection_detail(list(user_reservations.values())))
 
 async def check_reservation_permissions(
         to_reserve: datetime,
         meetingroom: MeetingRoom,
         user: User,
         session: AsyncSession,
+        context: Optional[Row] = None,
+        occurrences: Optional[list[tuple[datetime, datetime]]] = None,
+        replaced: Optional[Reservation] = None,
 ) -> None:
+    """
+    Права группы пользователя на комнату. Если переданы интервалы
+    создаваемых броней (occurrences), проверяются и квоты группы; replaced -
+    бронь, которую они заменяют при изменении.
+    """
     if settings.bypass_group_perms:
         return
 
-    group: Group = await group_crud.get(obj_id=user.group_id, session=session)
-    if group is None:
-        raise HTTPException(status_code=422, detail="Вам не назначена ни одна группа, бронирование запрещено.")
+    if context is not None:
+        group_name = context.group_name
+        permissions_count = context.permissions_count
+        max_future_reservation = context.max_future_reservation
+        max_week_duration = context.max_week_duration
+        max_active_reservations = context.max_active_reservations
+    else:
+        group: Group = await group_crud.get(obj_id=user.group_id, session=session)
+        group_name = group.name if group is not None else None
+        perms: list[GroupRoomPermission] = [
+            perm for perm in group.permissions if perm.meetingroom_id == meetingroom.id
+        ] if group is not None else []
+        permissions_count = len(perms)
+        max_future_reservation = perms[0].max_future_reservation if perms else None
+        max_week_duration = perms[0].max_week_duration if perms else None
+        max_active_reservations = perms[0].max_active_reservations if perms else None
+
+    error = reservation_permission_error(
+        to_reserve, meetingroom, group_name, permissions_count, max_future_reservation
+    )
+    if error is not None:
+        raise error
+
+    if not occurrences or (max_week_duration is None and max_active_reservations is None):
+        return
+    # Недельная квота - по счетчикам reservation_quota_counter, без
+    # агрегации броней; активные брони считаются по reservation
+    usage, active = {}, 0
+    if max_week_duration is not None:
+        usage = (await reservation_quota_crud.get_usage(
+            user_id=user.id,
+            meetingroom_ids=[meetingroom.id],
+            from_day=quota_from_day(occurrences),
+            session=session,
+        ))[meetingroom.id]
+    if max_active_reservations is not None:
+        active = (await reservation_quota_crud.count_active(
+            user_id=user.id,
+            meetingroom_ids=[meetingroom.id],
+            session=session,
+        ))[meetingroom.id]
+    error = reservation_quota_error(
+        occurrences, usage, active, meetingroom, group_name,
+        max_week_duration, max_active_reservations,
+        replaced=quota_key(replaced) if replaced is not None else None,
+    )
+    if error is not None:
+        raise error
+
 
-    perms = [perm for perm in group.permissions if perm.meetingroom_id == meetingroom.id]
-    if len(perms) == 0:
-        raise HTTPException(status_code=422,
-                            detail=f"У группы {group.name} нет права на бронирование {meetingroom.name}")
-    if len(perms) > 1:
-        raise HTTPException(status_code=500, detail=f"Ошибка в данных, более 1 разрешения у одной группы {group.name} для {meetingroom.name}")
-    perm: GroupRoomPermission = perms[0]
+# Ошибка прав группы на бронь (None - бронировать можно); общая для
+# check_reservation_permissions и пакетной проверки слотов
+def reservation_permission_error(
+        to_reserve: datetime,
+        meetingroom: MeetingRoom,
+        group_name: Optional[str],
+        permissions_count: int,
+        max_future_reservation: Optional[timedelta],
+) -> Optional[HTTPException]:
+    if group_name is None:
+        return HTTPException(status_code=422, detail="Вам не назначена ни одна группа, бронирование запрещено.")
+
+    if permissions_count == 0:
+        return HTTPException(status_code=422,
+                             detail=f"У группы {group_name} нет права на бронирование {meetingroom.name}")
+    if permissions_count > 1:
+        return HTTPException(status_code=500, detail=f"Ошибка в данных, более 1 разрешения у одной группы {group_name} для {meetingroom.name}")
+
+    if to_reserve - datetime.now() > max_future_reservation:
+        return HTTPException(status_code=422,
+                             detail=f"Группа {group_name} не может бронировать {meetingroom.name} больше чем на {max_future_reservation} вперед")
+    return None
 
-    if to_reserve - datetime.now() > perm.max_future_reservation:
-        raise HTTPException(status_code=422,
-                            detail=f"Группа {group.name} не может бронировать {meetingroom.name} больше чем на {perm.max_future_reservation} вперед")
+
+# С какого дня нужны счетчики для проверки недельной квоты: недели всех
+# интервалов целиком
+def quota_from_day(occurrences: list[tuple[datetime, datetime]]) -> date:
+    return min(week_start(from_reserve.date()) for from_reserve, _ in occurrences)
+
+
+# Ошибка квот группы (None - квоты не превышены) после записи интервалов
+# occurrences вместо брони replaced: usage - счетчики (день -> (брони,
+# секунды)), active - сколько броней еще не закончилось (to_reserve > now)
+def reservation_quota_error(
+        occurrences: list[tuple[datetime, datetime]],
+        usage: dict[date, tuple[int, int]],
+        active: int,
+        meetingroom: MeetingRoom,
+        group_name: Optional[str],
+        max_week_duration: Optional[timedelta],
+        max_active_reservations: Optional[int],
+        replaced: Optional[QuotaKey] = None,
+) -> Optional[HTTPException]:
+    usage = dict(usage)
+
+    def shift(from_reserve: datetime, to_reserve: datetime, sign: int) -> None:
+        reservations, seconds = usage.get(from_reserve.date(), (0, 0))
+        usage[from_reserve.date()] = (
+            reservations + sign,
+            seconds + sign * int((to_reserve - from_reserve).total_seconds()),
+        )
+
+    if replaced is not None:
+        shift(replaced[2], replaced[3], -1)
+    for from_reserve, to_reserve in occurrences:
+        shift(from_reserve, to_reserve, 1)
+
+    if max_active_reservations is not None:
+        now = datetime.now()
+        active += sum(1 for _, to_reserve in occurrences if to_reserve > now)
+        if replaced is not None and replaced[3] > now:
+            active -= 1
+        if active > max_active_reservations:
+            return HTTPException(
+                status_code=422,
+                detail=f"Группа {group_name} не может иметь больше {max_active_reservations} "
+                       f"предстоящих броней {meetingroom.name}",
+            )
+
+    if max_week_duration is not None:
+        for week in sorted({week_start(from_reserve.date()) for from_reserve, _ in occurrences}):
+            seconds = sum(
+                day_seconds for day, (_, day_seconds) in usage.items()
+                if week <= day < week + timedelta(days=7)
+            )
+            if seconds > max_week_duration.total_seconds():
+                return HTTPException(
+                    status_code=422,
+                    detail=f"Группа {group_name} не может занимать {meetingroom.name} больше "
+                           f"{max_week_duration} в неделю (неделя с {week}: {timedelta(seconds=seconds)})",
+                )
+    return None
+
+
+# Корутина, которая проверяет список слотов так же, как бронирование,
+# но ничего не записывает и не прерывается на первой ошибке: для каждого
+# слота возвращается результат со всеми найденными ошибками. Квоты
+# проверяются для каждого слота отдельно, как если бы бронировался только он.
+# Запросов к БД не больше трех на весь список
+async def check_reservation_slots(
+        slots: list[ReservationSlot],
+        user: User,
+        session: AsyncSession,
+) -> list[ReservationSlotCheck]:
+    check_permissions = not user.is_superuser and not settings.bypass_group_perms
+    rooms = {}
+    if slots:
+        rows = await reservation_crud.get_rooms_permissions(
+            meetingroom_ids=list({slot.meetingroom_id for slot in slots}),
+            group_id=user.group_id,
+            session=session,
+        )
+        rooms = {row.MeetingRoom.id: row for row in rows}
+
+    usage, active = {}, {}
+    week_rooms = [
+        meetingroom_id for meetingroom_id, room in rooms.items() if room.max_week_duration is not None
+    ]
+    active_rooms = [
+        meetingroom_id for meetingroom_id, room in rooms.items() if room.max_active_reservations is not None
+    ]
+    if check_permissions and week_rooms:
+        usage = await reservation_quota_crud.get_usage(
+            user_id=user.id,
+            meetingroom_ids=week_rooms,
+            from_day=quota_from_day([(slot.from_reserve, slot.to_reserve) for slot in slots]),
+            session=session,
+        )
+    if check_permissions and active_rooms:
+        active = await reservation_quota_crud.count_active(
+            user_id=user.id,
+            meetingroom_ids=active_rooms,
+            session=session,
+        )
+
+    conflicts = await reservation_crud.get_slots_reservations_at_the_same_time(
+        slots=[
+            (slot.meetingroom_id, user.id, slot.from_reserve, slot.to_reserve)
+            for slot in slots
+        ],
+        session=session,
+    )
+
+    results = []
+    for slot, (room_reservations, user_reservations) in zip(slots, conflicts):
+        errors = [
+            error for error in (
+                from_reserve_error(slot.from_reserve),
+                interval_error(slot.from_reserve, slot.to_reserve),
+            ) if error is not None
+        ]
+        room = rooms.get(slot.meetingroom_id)
+        if room is None:
+            errors.append(f"Переговорка не найдена ID: {slot.meetingroom_id}")
+        elif check_permissions:
+            error = reservation_permission_error(
+                slot.to_reserve, room.MeetingRoom, room.group_name,
+                room.permissions_count, room.max_future_reservation,
+            )
+            if error is None and (slot.meetingroom_id in usage or slot.meetingroom_id in active):
+                error = reservation_quota_error(
+                    [(slot.from_reserve, slot.to_reserve)],
+                    usage.get(slot.meetingroom_id, {}), active.get(slot.meetingroom_id, 0),
+                    room.MeetingRoom, room.group_name,
+                    room.max_week_duration, room.max_active_reservations,
+                )
+            if error is not None:
+                errors.append(error.detail)
+        if room_reservations:
+            errors.append(room_intersection_detail(room_reservations))
+        if user_reservations:
+            errors.append(user_intersection_detail(user_reservations))
+
+        results.append(ReservationSlotCheck(
+            **slot.model_dump(),
+            available=not errors,
+            room_conflicts=[reservation.id for reservation in room_reservations],
+            user_conflicts=[reservation.id for reservation in user_reservations],
+            errors=errors,
+        ))
+    return results
+
+
+# Корутина, которая проверяет пачку броней для массового создания: время,
+# существование комнат и пользователей, пересечения с броней в БД и между
+# собой. Запросов к БД - три на всю пачку. Возвращает ошибки каждого
+# элемента (пустой список - элемент можно записать)
+async def check_reservations_bulk(
+        items: list[ReservationBulkItem],
+        user: User,
+        session: AsyncSession,
+) -> list[list[str]]:
+    user_ids = [item.user_id if item.user_id is not None else user.id for item in items]
+    rooms = await meeting_room_crud.get_multi_by_ids(
+        list({item.meetingroom_id for item in items}), session
+    )
+    room_ids = {room.id for room in rooms}
+    users = await user_crud.get_multi_by_ids(list(set(user_ids)), session)
+    known_user_ids = {known_user.id for known_user in users}
+    conflicts = await reservation_crud.get_slots_reservations_at_the_same_time(
+        slots=[
+            (item.meetingroom_id, user_id, item.from_reserve, item.to_reserve)
+            for item, user_id in zip(items, user_ids)
+        ],
+        session=session,
+    )
+
+    # Уже принятые элементы пачки, чтобы найти пересечения между ними
+    accepted_rooms: dict[int, IntervalList] = {}
+    accepted_users: dict[int, IntervalList] = {}
+    results = []
+    for index, (item, user_id, (room_reservations, user_reservations)) in enumerate(
+            zip(items, user_ids, conflicts)
+    ):
+        errors = [
+            error for error in (
+                from_reserve_error(item.from_reserve),
+                interval_error(item.from_reserve, item.to_reserve),
+            ) if error is not None
+        ]
+        if item.meetingroom_id not in room_ids:
+            errors.append(f"Переговорка не найдена ID: {item.meetingroom_id}")
+        if user_id not in known_user_ids:
+            errors.append(f"Пользователь не найден ID: {user_id}")
+        if room_reservations:
+            errors.append(room_intersection_detail(room_reservations))
+        if user_reservations:
+            errors.append(user_intersection_detail(user_reservations))
+        if not errors:
+            for accepted, key in ((accepted_rooms, item.meetingroom_id), (accepted_users, user_id)):
+                intervals = accepted.get(key)
+                if intervals is not None:
+                    errors.extend(
+                        f"Пересечение с элементом {entry.id} этого же запроса"
+                        for entry in intervals.overlapping(item.from_reserve, item.to_reserve)
+                    )
+            # Элемент может совпасть с другим и по комнате, и по пользователю
+            errors = list(dict.fromkeys(errors))
+        if not errors:
+            entry = ScheduleEntry(
+                id=index,
+                from_reserve=item.from_reserve,
+                to_reserve=item.to_reserve,
+                meetingroom_id=item.meetingroom_id,
+                user_id=user_id,
+                reservation=None,
+            )
+            accepted_rooms.setdefault(item.meetingroom_id, IntervalList()).add(entry)
+            accepted_users.setdefault(user_id, IntervalList()).add(entry)
+        results.append(errors)
+    return results
 
 
 async def check_reservation_exist(
@@ -174,3 +579,65 @@ async def check_reservation_before_edit(
             detail=f"Нельзя удалять/изменять бронь через {settings.deny_cancel_after_minutes_used} минут после ее начала, это может сделать только Администратор",
         )
     return reservation
+
+
+def check_reservation_version(
+    reservation: Reservation,
+    if_match: Optional[str] = None,
+    version: Optional[int] = None,
+) -> int:
+    """
+    Версия, с которой клиент читал бронь: заголовок If-Match ("3", W/"3"
+    или 3) либо параметр version. Без них - текущая версия брони, как
+    раньше. Устаревшая версия - 409 до каких-либо записей.
+    """
+    expected = version
+    if if_match is not None and if_match.strip() != "*":
+        tag = if_match.strip().removeprefix("W/").strip('"')
+        if not tag.isdigit():
+            raise HTTPException(
+                status_code=400,
+                detail="If-Match должен содержать версию брони",
+            )
+        if expected is not None and expected != int(tag):
+            raise HTTPException(
+                status_code=400,
+                detail="Версии в If-Match и version не совпадают",
+            )
+        expected = int(tag)
+    if expected is None:
+        return reservation.version
+    if expected != reservation.version:
+        raise reservation_version_conflict(reservation.version)
+    return expected
+
+
+def reservation_version_conflict(current_version: Optional[int] = None) -> HTTPException:
+    detail = "Бронь уже изменена другим запросом, загрузите ее заново и повторите"
+    if current_version is not None:
+        detail += f" (текущая версия: {current_version})"
+    return HTTPException(status_code=409, detail=detail)
+
+
+def check_reservation_cursor(cursor: Optional[str]) -> Optional[tuple[datetime, int]]:
+    if cursor is None:
+        return None
+    key = decode_cursor(cursor)
+    if key is None:
+        raise HTTPException(status_code=422, detail="Некорректный cursor")
+    return key
+
+
+def check_schedule_window(
+    from_reserve: Optional[datetime], to_reserve: Optional[datetime]
+) -> None:
+    if (from_reserve is None) != (to_reserve is None):
+        raise HTTPException(
+            status_code=422,
+            detail="Окно задается параметрами from и to вместе",
+        )
+    if from_reserve is not None and from_reserve >= to_reserve:
+        raise HTTPException(
+            status_code=422,
+            detail="Время начала окна не может быть больше его окончания",
+        )
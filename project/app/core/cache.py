@@ -0,0 +1,79 @@
+# app/core/cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from app.core.config import settings
+
+
+class ReadCache:
+    """
+    LRU-кэш чтения с временем жизни записей (CRUD_CACHE_TTL_SECONDS) для
+    редко меняющихся объектов: комнат, групп, пользователей. Записи CRUD
+    сбрасывают кэш целиком, записи других процессов - через
+    app.core.changes, а время жизни ограничивает устаревание из-за записей
+    в обход приложения.
+
+    generation растет при каждом сбросе: результат, прочитанный из БД до
+    сброса, в кэш уже не кладется. Кэшем пользуются и фоновые задачи
+    (app/job) из своего потока, поэтому изменения идут под блокировкой.
+    """
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self.generation = 0
+        # ключ -> (значение, момент устаревания)
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.crud_cache_enabled and self.size > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """(найдено, значение); устаревшая запись удаляется."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (value, time.monotonic() + settings.crud_cache_ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def as_dict(self) -> dict:
+        requests = self.hits + self.misses
+        return dict(
+            name=self.name,
+            size=len(self._entries),
+            capacity=self.size,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=round(self.hits / requests, 4) if requests else 0.0,
+            evictions=self.evictions,
+        )
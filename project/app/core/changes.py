@@ -0,0 +1,221 @@
+# app/core/changes.py
+import asyncio
+import logging
+import threading
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.core.config import settings
+from app.core.db import database_in_memory, read_engine
+from app.models import ChangeLog
+
+# Таблицы, которые изменила текущая транзакция сессии (session.info)
+TOUCHED_KEY = "change_feed_touched"
+# Версии таблиц, записанные транзакцией, до ее коммита
+BUMPED_KEY = "change_feed_bumped"
+# Таблицы подписчиков, которые меняет коммит транзакции
+COMMITTED_KEY = "change_feed_committed"
+
+# Получает имена таблиц, которые изменили другие процессы
+Subscriber = Callable[[set[str]], None]
+
+# Меняется, когда в базу закоммитило другое соединение (только SQLite)
+DATA_VERSION = text("PRAGMA data_version")
+VERSIONS = select(ChangeLog.table_name, ChangeLog.version)
+
+
+class ChangeFeed:
+    """
+    Изменения, сделанные другими процессами (воркеры uvicorn, контейнеры),
+    для кэшей процесса: кэшей чтения CRUD, расписания броней.
+
+    Транзакция, изменившая таблицы подписчиков, перед коммитом увеличивает
+    их версии в change_log - в той же транзакции. Задача-наблюдатель раз в
+    settings.change_feed_poll_seconds сверяет версии с известными процессу
+    и сообщает подписчикам таблицы с чужими изменениями: свои изменения
+    кэши процесса учитывают сами при записи, а подписчики с local узнают о
+    них после коммита. В SQLite change_log читается,
+    только если PRAGMA data_version показывает коммит другого соединения.
+    """
+
+    def __init__(self):
+        self._subscribers: list[tuple[frozenset[str], Subscriber, bool]] = []
+        # Таблицы подписчиков: версии ведутся только для них
+        self._tables: set[str] = set()
+        # Последние известные процессу версии таблиц
+        self._versions: dict[str, int] = {}
+        # Версии, записанные транзакциями процесса, еще не сверенные
+        # наблюдателем. Запоминаются до коммита: наблюдатель может увидеть
+        # коммит раньше, чем его сессия дойдет до after_commit
+        self._own: dict[str, set[int]] = {}
+        # Коммиты фоновых задач (app/job) идут из их потоков
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # Соединение SQLite, на котором сверяется PRAGMA data_version:
+        # значение сравнимо только между запросами одного соединения
+        self._connection: Optional[AsyncConnection] = None
+        self._data_version: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.change_feed_enabled
+
+    def subscribe(self, tables: Iterable[str], subscriber: Subscriber, local: bool = False) -> None:
+        """
+        subscriber получит те из tables, что изменили другие процессы, а с
+        local - и коммиты этого процесса: для кэшей, которые свои записи в
+        эти таблицы сами не учитывают.
+        """
+        tables = frozenset(tables)
+        self._tables.update(tables)
+        self._subscribers.append((tables, subscriber, local))
+
+    async def start(self) -> None:
+        # База в памяти доступна только этому процессу
+        if not self.enabled or database_in_memory or self._task is not None:
+            return
+        # Первая проверка только запоминает версии: кэши еще пустые
+        await self.poll(notify=False)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.change_feed_poll_seconds)
+            try:
+                await self.poll()
+            except Exception:
+                logging.exception("Change feed poll failed")
+                await self._close()
+
+    async def _close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+            self._data_version = None
+
+    async def poll(self, notify: bool = True) -> set[str]:
+        """Сверяет версии с change_log, возвращает таблицы с чужими изменениями."""
+        if read_engine.dialect.name == "sqlite":
+            if self._connection is None:
+                self._connection = await read_engine.connect()
+            async with self._connection.begin():
+                data_version = await self._connection.scalar(DATA_VERSION)
+                if data_version == self._data_version:
+                    return set()
+                self._data_version = data_version
+                rows = (await self._connection.execute(VERSIONS)).all()
+        else:
+            async with read_engine.connect() as connection:
+                rows = (await connection.execute(VERSIONS)).all()
+
+        changed = set()
+        with self._lock:
+            for table_name, version in rows:
+                seen = self._versions.get(table_name, 0)
+                own = self._own.get(table_name, set())
+                # Чужие изменения - если не все версии после известной свои
+                if sum(seen < own_version <= version for own_version in own) != version - seen:
+                    changed.add(table_name)
+                self._versions[table_name] = version
+                if own:
+                    self._own[table_name] = {own_version for own_version in own if own_version > version}
+        if changed and notify:
+            logging.info(f"Change feed: tables changed by other processes: {sorted(changed)}")
+            self._notify(changed)
+        return changed
+
+    def _notify(self, changed: set[str], local: bool = False) -> None:
+        for tables, subscriber, subscriber_local in self._subscribers:
+            if not tables & changed or (local and not subscriber_local):
+                continue
+            try:
+                subscriber(tables & changed)
+            except Exception:
+                logging.exception("Change feed subscriber failed")
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        # Списки в session.info очередь записи откатывает вместе с точкой
+        # сохранения (app.core.writer), поэтому список, а не множество
+        touched = session.info.setdefault(TOUCHED_KEY, [])
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            self._touch(touched, inspect(obj).mapper.local_table.name)
+
+    def _do_orm_execute(self, state: ORMExecuteState) -> None:
+        # INSERT/UPDATE/DELETE запросами, а не через объекты сессии
+        if state.is_insert or state.is_update or state.is_delete:
+            self._touch(state.session.info.setdefault(TOUCHED_KEY, []), state.statement.table.name)
+
+    def _touch(self, touched: list[str], table_name: str) -> None:
+        if table_name in self._tables and table_name not in touched:
+            touched.append(table_name)
+
+    def _before_commit(self, session: Session) -> None:
+        # Изменения, которые отправит сам коммит, тоже должны попасть в версии
+        session.flush()
+        touched = session.info.pop(TOUCHED_KEY, None)
+        if not touched:
+            return
+        session.info[COMMITTED_KEY] = touched
+        if not self.enabled:
+            return
+        dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(ChangeLog).values([
+            dict(table_name=table_name, version=1)
+            # Один порядок строк у всех транзакций: в PostgreSQL они
+            # не ждут блокировок друг друга по кругу
+            for table_name in sorted(touched)
+        ])
+        bumped = session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["table_name"],
+                set_=dict(version=ChangeLog.version + 1),
+            ).returning(ChangeLog.table_name, ChangeLog.version)
+        ).all()
+        # Без наблюдателя свои версии сверять некому
+        if self._task is None:
+            return
+        session.info[BUMPED_KEY] = bumped
+        with self._lock:
+            for table_name, version in bumped:
+                self._own.setdefault(table_name, set()).add(version)
+
+    def _after_commit(self, session: Session) -> None:
+        session.info.pop(BUMPED_KEY, None)
+        committed = session.info.pop(COMMITTED_KEY, None)
+        if committed:
+            self._notify(set(committed), local=True)
+
+    def _after_rollback(self, session: Session) -> None:
+        session.info.pop(TOUCHED_KEY, None)
+        session.info.pop(COMMITTED_KEY, None)
+        # Номер откаченной версии получит следующая транзакция, возможно чужая
+        bumped = session.info.pop(BUMPED_KEY, None)
+        if bumped:
+            with self._lock:
+                for table_name, version in bumped:
+                    self._own.get(table_name, set()).discard(version)
+
+
+change_feed = ChangeFeed()
+
+event.listen(Session, "after_flush", change_feed._after_flush)
+event.listen(Session, "do_orm_execute", change_feed._do_orm_execute)
+event.listen(Session, "before_commit", change_feed._before_commit)
+event.listen(Session, "after_commit", change_feed._after_commit)
+event.listen(Session, "after_rollback", change_feed._after_rollback)
@@ -2,8 +2,9 @@
 import secrets
 import os
 from enum import Enum
+from typing import Literal
 
-from pydantic.v1 import BaseSettings
+from pydantic.v1 import BaseSettings, validator
 
 
 class AuthType(Enum):
@@ -15,6 +16,51 @@ class Settings(BaseSettings):
     app_title: str = "..."
     app_description: str = "..."
     database_url: str = "sqlite+aiosqlite:///./fastapi.db"
+    # пул соединений движка записи (для SQLite в памяти не используется)
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout_seconds: int = 30
+    # пул движка только для чтения (get_async_read_session): ручки чтения
+    # не ждут соединений, занятых записью
+    database_read_pool_size: int = 10
+    database_read_max_overflow: int = 10
+    # общий для всех движков кэш скомпилированных запросов SQLAlchemy:
+    # сколько разных запросов в нем держать
+    database_query_cache_size: int = 1000
+
+    # записи в SQLite выполняет одна задача-писатель (app.core.writer):
+    # накопившиеся записи фиксируются одним коммитом, но не больше стольких
+    write_queue_enabled: bool = True
+    write_queue_max_batch: int = 100
+
+    # кэш чтения комнат, групп, пользователей и настроек табелей
+    # (app.core.cache): записи через CRUD сбрасывают его сразу, записи
+    # других процессов становятся видны не позже чем через TTL
+    crud_cache_enabled: bool = True
+    crud_cache_ttl_seconds: int = 60
+
+    # изменения других процессов (воркеры, контейнеры) через таблицу
+    # change_log (app.core.changes): как часто проверять, не было ли их.
+    # Кэши и расписание сбрасываются не позже чем через этот интервал
+    change_feed_enabled: bool = True
+    change_feed_poll_seconds: float = 1.0
+
+    # PRAGMA для каждого нового соединения SQLite (app.core.db)
+    # WAL: читатели не блокируют писателя и наоборот. Движок чтения и
+    # очередь записи включаются только в WAL, в других режимах чтение и
+    # запись идут через соединения одного движка без очереди
+    sqlite_journal_mode: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"] = "WAL"
+    # в режиме WAL NORMAL не теряет целостность, но не ждет fsync на коммит
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    # сколько ждать блокировку на запись, прежде чем вернуть "database is locked"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size_bytes: int = 268435456
+    sqlite_temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+    # проверять внешние ключи. Выключено: у части ключей схемы (права групп,
+    # activity, user.group_id) нет ondelete, и удаление комнаты или группы
+    # с зависимыми строками упало бы на IntegrityError
+    sqlite_foreign_keys: bool = False
     app_version: str = "2.0.0"
     secret_key: str = None
 
@@ -44,6 +90,12 @@ class Settings(BaseSettings):
 
     cron_timesheet_enabled: bool = True
     cron_autocancel_enabled: bool = True
+    cron_archive_enabled: bool = True
+
+    # через сколько дней после окончания бронь переносится в reservation_archive
+    reservation_archive_after_days: int = 45
+    # сколько броней переносится одной транзакцией
+    reservation_archive_chunk_size: int = 1000
 
     # за сколько секунд назад проверять что была активность
     autocancel_lookback_activity_seconds: int = 1200
@@ -53,6 +105,31 @@ class Settings(BaseSettings):
 
     bypass_group_perms: bool = False
 
+    # расписание броней в памяти процесса для проверок пересечений
+    schedule_store_enabled: bool = True
+    # как часто перечитывать расписание из БД, чтобы подхватить
+    # изменения, сделанные в обход приложения
+    schedule_store_resync_seconds: int = 60
+
+    # искать пересечения и текущие брони через R*Tree (reservation_rtree),
+    # а не через обычные индексы; только для SQLite
+    reservation_rtree_enabled: bool = False
+
+    # сколько слотов можно проверить одним запросом /api/reservations/check
+    reservation_check_max_slots: int = 200
+    # сколько броней может быть в одной серии (repeat при бронировании)
+    reservation_series_max_occurrences: int = 100
+    # сколько броней можно создать или удалить одним запросом /bulk
+    reservation_bulk_max_items: int = 1000
+    # размер страницы GET /api/reservations/ по умолчанию и максимальный
+    reservation_page_limit: int = 100
+    reservation_page_max_limit: int = 1000
+
+    # значения подставляются в PRAGMA как есть, поэтому только из списка
+    @validator("sqlite_journal_mode", "sqlite_synchronous", "sqlite_temp_store", pre=True)
+    def upper_pragma_value(cls, value):
+        return value.upper() if isinstance(value, str) else value
+
     class Config:
         env_file = ".env"
 
@@ -1,9 +1,14 @@
 # app/core/db.py
+from contextlib import nullcontext
 
 # Все классы и функции для асинхронной работы
 # находятся в модуле sqlalchemy.ext.asyncio
+from sqlalchemy import event
+from sqlalchemy.engine import default, make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlalchemy.orm import declarative_base, sessionmaker, declared_attr, Mapped, mapped_column
+from sqlalchemy.util import LRUCache
 
 from app.core.config import settings
 
@@ -18,13 +23,142 @@ class PreBase:
 
 Base = declarative_base(cls=PreBase)
 
-engine = create_async_engine(settings.database_url)
+
+def _in_memory() -> bool:
+    url = make_url(settings.database_url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _pool_options(pool_size: int, max_overflow: int) -> dict:
+    if _in_memory():
+        # База в памяти живет в единственном соединении, пула нет
+        return {}
+    return dict(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.database_pool_timeout_seconds,
+    )
+
+
+class StatementCache:
+    """
+    Кэш скомпилированных запросов SQLAlchemy, общий для всех движков: запрос,
+    скомпилированный для записи, не компилируется заново для чтения или
+    фоновых задач. Считает попадания и промахи по выполненным запросам.
+    """
+
+    def __init__(self, size: int):
+        self.compiled = LRUCache(size)
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, conn, clauseelement, multiparams, params, execution_options, result):
+        # Текстовые запросы через кэш не идут и не считаются
+        cache_hit = getattr(result.context, "cache_hit", None)
+        if cache_hit is default.CACHE_HIT:
+            self.hits += 1
+        elif cache_hit is default.CACHE_MISS:
+            self.misses += 1
+
+    def as_dict(self) -> dict:
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self.compiled),
+            capacity=self.compiled.capacity,
+        )
+
+
+statement_cache = StatementCache(settings.database_query_cache_size)
+
+engine = create_async_engine(
+    settings.database_url,
+    execution_options={"compiled_cache": statement_cache.compiled},
+    **_pool_options(settings.database_pool_size, settings.database_max_overflow),
+)
+
+# База в памяти живет в соединении этого процесса
+database_in_memory = _in_memory()
+
+# Отдельный движок чтения и очередь записи (app.core.writer) рассчитаны на
+# WAL: в других режимах журнала открытая транзакция чтения не дает
+# зафиксировать запись, и коммит ждет ее до busy_timeout
+sqlite_wal = engine.dialect.name == "sqlite" and settings.sqlite_journal_mode == "WAL"
+
+# Движок для ручек, которые только читают: свой пул, чтобы чтение не
+# занимало соединения записи. Соединения открываются только для чтения:
+# в SQLite (WAL) читатели не мешают писателю, запись через них - ошибка
+if database_in_memory:
+    # Другое соединение с базой в памяти - это другая, пустая база
+    read_engine = engine
+elif engine.dialect.name == "sqlite" and not sqlite_wal:
+    read_engine = engine
+else:
+    read_engine = create_async_engine(
+        settings.database_url,
+        # В SQLite только чтение включает PRAGMA query_only (ниже)
+        connect_args=(
+            {"server_settings": {"default_transaction_read_only": "on"}}
+            if engine.dialect.name == "postgresql" else {}
+        ),
+        execution_options={"compiled_cache": statement_cache.compiled},
+        **_pool_options(settings.database_read_pool_size, settings.database_read_max_overflow),
+    )
+
+# Фоновые задачи (app/job) работают в своем потоке со своим циклом событий,
+# а соединения asyncpg привязаны к циклу, в котором открыты. Поэтому у задач
+# отдельный движок без пула: соединение открывается в цикле задачи.
+job_engine = create_async_engine(
+    settings.database_url,
+    poolclass=NullPool,
+    execution_options={"compiled_cache": statement_cache.compiled},
+)
+
+for _engine in {engine, read_engine, job_engine}:
+    event.listen(_engine.sync_engine, "after_execute", statement_cache.count)
+
+if engine.dialect.name == "sqlite":
+    def _sqlite_connect(dbapi_connection, connection_record):
+        # Транзакциями управляет SQLAlchemy, а не драйвер: иначе pysqlite
+        # сам решает, когда отправить BEGIN, и BEGIN IMMEDIATE не задать
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in (
+            f"journal_mode = {settings.sqlite_journal_mode}",
+            f"synchronous = {settings.sqlite_synchronous}",
+            f"busy_timeout = {settings.sqlite_busy_timeout_ms}",
+            # Отрицательное значение - размер в КиБ, а не в страницах
+            f"cache_size = -{settings.sqlite_cache_size_kib}",
+            f"mmap_size = {settings.sqlite_mmap_size_bytes}",
+            f"temp_store = {settings.sqlite_temp_store}",
+            f"foreign_keys = {'ON' if settings.sqlite_foreign_keys else 'OFF'}",
+        ):
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+    def _sqlite_read_connect(dbapi_connection, connection_record):
+        _sqlite_connect(dbapi_connection, connection_record)
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+    def _sqlite_begin(conn):
+        conn.exec_driver_sql(conn.get_execution_options().get("sqlite_begin", "BEGIN"))
+
+    for _engine in (engine, job_engine):
+        event.listen(_engine.sync_engine, "connect", _sqlite_connect)
+        event.listen(_engine.sync_engine, "begin", _sqlite_begin)
+    if read_engine is not engine:
+        event.listen(read_engine.sync_engine, "connect", _sqlite_read_connect)
+        event.listen(read_engine.sync_engine, "begin", _sqlite_begin)
 
 # Создадим асинхронную сессии
 # Для работы, нужно постоянно открывать и закрывать
 # сессии (для каждого запроса), поэтому применим
 # функцию sessionmaker
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+JobSessionLocal = sessionmaker(job_engine, class_=AsyncSession, expire_on_commit=False)
+ReadSessionLocal = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
 
 # Асинхронный генератор сессий
 async def get_async_session():
@@ -35,3 +169,37 @@ async def get_async_session():
         yield async_session
         # Когда HTTP запрос отработает - выполнение кода вернётся сюда,
         # и при выходе из контекстного менеджера сессия будет закрыта
+
+
+# Сессия для ручек, которые ничего не пишут
+async def get_async_read_session():
+    async with ReadSessionLocal() as async_session:
+        yield async_session
+
+
+if read_engine is engine:
+    # Без движка чтения у запроса одна сессия (зависимость одна и та же):
+    # транзакция чтения другой сессии, например проверки токена, не дала бы
+    # зафиксировать запись этого же запроса
+    get_async_read_session = get_async_session  # noqa: F811
+
+
+# Начинает транзакцию на запись: в SQLite блокировка на запись берется
+# сразу (BEGIN IMMEDIATE), поэтому проверки и запись внутри транзакции
+# не пересекаются с другими писателями. В PostgreSQL это обычная
+# транзакция: от двойного бронирования защищают EXCLUDE-ограничения
+async def begin_immediate(session: AsyncSession) -> None:
+    if session.in_transaction():
+        # Транзакцию чтения уже открыли зависимости или проверки до записи
+        await session.commit()
+    await session.connection(execution_options={"sqlite_begin": "BEGIN IMMEDIATE"})
+
+
+# Точка сохранения вокруг записи брони в PostgreSQL: если запись отклонит
+# EXCLUDE-ограничение, откатывается только она, и в той же транзакции можно
+# заново проверить пересечения. В SQLite писатель один (BEGIN IMMEDIATE),
+# такой ошибки не бывает, и лишние SAVEPOINT/RELEASE не нужны
+def overlap_savepoint(session: AsyncSession):
+    if session.get_bind().dialect.name == "postgresql":
+        return session.begin_nested()
+    return nullcontext()
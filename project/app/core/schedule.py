@@ -0,0 +1,352 @@
+# app/core/schedule.py
+import logging
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.changes import change_feed
+from app.core.config import settings
+from app.crud.base import copy_loaded
+from app.models import Group, MeetingRoom, Reservation, User
+
+# Ключ в Session.info для изменений расписания, ждущих коммита
+PENDING_KEY = "schedule_store_pending"
+APPLIED_KEY = "schedule_store_applied"
+# Брони в расписании - вместе с комнатой и пользователем с группой.
+# Свои записи броней расписание применяет само, а после изменения
+# связанных строк перечитывается: копии в бронях устарели
+RELATED_TABLES = {
+    MeetingRoom.__tablename__,
+    User.__tablename__,
+    Group.__tablename__,
+}
+
+
+@dataclass(frozen=True)
+class ScheduleEntry:
+    """Снимок интервала брони, по которому построены индексы."""
+    id: int
+    from_reserve: datetime
+    to_reserve: datetime
+    meetingroom_id: int
+    user_id: int
+    # Отсоединенный ORM-объект брони со связями, отдается читающим ручкам
+    # без обращения к БД. Ни одной сессии не принадлежит: коммит или откат
+    # чужой транзакции его не истекает
+    reservation: Any
+
+    @property
+    def key(self) -> tuple[datetime, int]:
+        return self.from_reserve, self.id
+
+    @classmethod
+    def from_reservation(cls, reservation: Reservation) -> "ScheduleEntry":
+        return cls(
+            id=reservation.id,
+            from_reserve=reservation.from_reserve,
+            to_reserve=reservation.to_reserve,
+            meetingroom_id=reservation.meetingroom_id,
+            user_id=reservation.user_id,
+            reservation=reservation,
+        )
+
+
+class IntervalList:
+    """
+    Отсортированный по началу список интервалов одной комнаты или одного
+    пользователя. Поиск пересечений - бинарный поиск по началу и просмотр
+    назад не дальше самой длинной брони в списке: O(log n + k).
+    """
+
+    def __init__(self):
+        self._keys: list[tuple[datetime, int]] = []
+        self._entries: list[ScheduleEntry] = []
+        # Самая длинная бронь в списке, при удалении не уменьшается -
+        # это лишь расширяет окно просмотра, но не ломает поиск
+        self._max_span = timedelta(0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entry: ScheduleEntry) -> None:
+        index = bisect_left(self._keys, entry.key)
+        self._keys.insert(index, entry.key)
+        self._entries.insert(index, entry)
+        self._max_span = max(self._max_span, entry.to_reserve - entry.from_reserve)
+
+    def discard(self, entry: ScheduleEntry) -> None:
+        index = bisect_left(self._keys, entry.key)
+        if index < len(self._keys) and self._keys[index] == entry.key:
+            del self._keys[index]
+            del self._entries[index]
+
+    def overlapping(self, from_reserve: datetime, to_reserve: datetime) -> list[ScheduleEntry]:
+        # Интервалы полуоткрытые, как в SQL-проверке: [from_reserve, to_reserve)
+        end = bisect_left(self._keys, (to_reserve, -1))
+        horizon = from_reserve - self._max_span
+        found = []
+        for index in range(end - 1, -1, -1):
+            entry = self._entries[index]
+            if entry.from_reserve < horizon:
+                break
+            if entry.to_reserve > from_reserve:
+                found.append(entry)
+        found.reverse()
+        return found
+
+    def ending_after(self, moment: datetime) -> list[ScheduleEntry]:
+        start = bisect_left(self._keys, (moment - self._max_span, -1))
+        return [
+            entry for entry in self._entries[start:]
+            if entry.to_reserve > moment
+        ]
+
+
+def free_intervals(
+    busy: list[tuple[datetime, datetime]],
+    start: datetime,
+    end: datetime,
+    min_duration: timedelta = timedelta(0),
+) -> list[tuple[datetime, datetime]]:
+    """
+    Свободные промежутки окна [start, end) - один проход по занятым
+    интервалам, отсортированным по началу. Пересекающиеся занятые
+    интервалы сливаются, промежутки короче min_duration отбрасываются.
+    """
+    free = []
+    cursor = start
+    for from_reserve, to_reserve in busy:
+        if cursor >= end:
+            break
+        gap_end = min(from_reserve, end)
+        if gap_end > cursor and gap_end - cursor >= min_duration:
+            free.append((cursor, gap_end))
+        cursor = max(cursor, to_reserve)
+    if end > cursor and end - cursor >= min_duration:
+        free.append((cursor, end))
+    return free
+
+
+class ScheduleStore:
+    """
+    Расписание всех актуальных броней в памяти процесса: по списку
+    интервалов на каждую комнату и на каждого пользователя.
+
+    Загружается при старте приложения и обновляется CRUD-ом броней при
+    каждом создании, изменении и удалении. Записи других процессов
+    приложения перечитываются по сигналу app.core.changes, а сделанные в БД
+    в обход приложения - повторной загрузкой не реже, чем раз в
+    settings.schedule_store_resync_seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rooms: dict[int, IntervalList] = {}
+        self._users: dict[int, IntervalList] = {}
+        self._by_id: dict[int, ScheduleEntry] = {}
+        # Брони, закончившиеся раньше горизонта, в память не загружаются
+        self._horizon: Optional[datetime] = None
+        self._loaded_at: Optional[float] = None
+        # Растет при каждом сбросе: перезагрузка, начатая до сброса, могла
+        # прочитать старые строки и свежим расписание не делает
+        self._invalidations = 0
+        # Изменения, сделанные во время перезагрузки, чтобы не потерять их;
+        # журнал общий для одновременных перезагрузок, пока идет хотя бы одна
+        self._journal: Optional[list[tuple[str, Any]]] = None
+        self._loads = 0
+        # Номер последней начатой и последней примененной перезагрузки
+        self._load_started = 0
+        self._load_applied = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.schedule_store_enabled
+
+    def is_fresh(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < settings.schedule_store_resync_seconds
+        )
+
+    def covers(self, moment: datetime) -> bool:
+        return self._horizon is not None and moment >= self._horizon
+
+    async def load(self, session: AsyncSession) -> None:
+        """
+        Перечитывает расписание в своей сессии на движке session: сама
+        session (запроса или очереди записи) для чтения не используется.
+        """
+        horizon = datetime.now() - timedelta(seconds=settings.backdate_reservation_allowed_seconds)
+        with self._lock:
+            if self._journal is None:
+                self._journal = []
+            self._loads += 1
+            self._load_started += 1
+            generation, start = self._load_started, len(self._journal)
+            invalidations = self._invalidations
+        try:
+            # После закрытия сессии брони отсоединены вместе со связями
+            async with AsyncSession(session.bind, expire_on_commit=False) as own_session:
+                reservations = await own_session.execute(
+                    select(Reservation).where(Reservation.to_reserve >= horizon)
+                    # Брони отдаются из памяти как есть - со связями, как их
+                    # загружает reservation_crud
+                    .options(
+                        joinedload(Reservation.meetingroom),
+                        joinedload(Reservation.user).joinedload(User.group),
+                    )
+                )
+                reservations = reservations.scalars().all()
+        except Exception:
+            with self._lock:
+                self._finish_load()
+            raise
+
+        with self._lock:
+            journal = self._journal[start:]
+            self._finish_load()
+            if generation < self._load_applied:
+                # Более поздняя перезагрузка уже применена, наш снимок старее
+                return
+            self._load_applied = generation
+            self._rooms, self._users, self._by_id = {}, {}, {}
+            for reservation in reservations:
+                self._add(ScheduleEntry.from_reservation(reservation))
+            for operation, payload in journal:
+                if operation == "add":
+                    self._add(payload)
+                else:
+                    self._discard(payload)
+            self._horizon = horizon
+            if invalidations == self._invalidations:
+                self._loaded_at = time.monotonic()
+        logging.info(f"Schedule store loaded: {len(self._by_id)} reservations")
+
+    def _finish_load(self) -> None:
+        self._loads -= 1
+        if not self._loads:
+            self._journal = None
+
+    async def ensure_fresh(self, session: AsyncSession) -> bool:
+        """Перезагружает расписание, если оно устарело. False - хранилище выключено."""
+        if not self.enabled:
+            return False
+        if not self.is_fresh():
+            await self.load(session)
+        return True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._invalidations += 1
+            self._loaded_at = None
+
+    def add(self, reservation: Reservation, session: Optional[AsyncSession] = None) -> None:
+        """
+        С session изменение применяется при коммите ее транзакции. В
+        расписание попадает копия брони, а не объект сессии записи.
+        """
+        self._apply("add", ScheduleEntry.from_reservation(copy_loaded(reservation)), session)
+
+    def discard(self, reservation_id: int, session: Optional[AsyncSession] = None) -> None:
+        self._apply("discard", reservation_id, session)
+
+    def _apply(self, operation: str, payload: Any, session: Optional[AsyncSession]) -> None:
+        if session is not None:
+            session.info.setdefault(PENDING_KEY, []).append((operation, payload))
+            return
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((operation, payload))
+            if operation == "add":
+                self._add(payload)
+            else:
+                self._discard(payload)
+
+    def _before_commit(self, session: Session) -> None:
+        # Применяем до коммита, пока транзакция держит блокировку на запись:
+        # следующий писатель увидит в расписании уже нашу бронь
+        pending = session.info.pop(PENDING_KEY, None)
+        if not pending:
+            return
+        for operation, payload in pending:
+            self._apply(operation, payload, None)
+        session.info[APPLIED_KEY] = True
+
+    def _after_commit(self, session: Session) -> None:
+        session.info.pop(APPLIED_KEY, None)
+
+    def _after_rollback(self, session: Session) -> None:
+        session.info.pop(PENDING_KEY, None)
+        if session.info.pop(APPLIED_KEY, None):
+            # Коммит не прошел, а расписание уже изменено - перечитаем его
+            self.invalidate()
+
+    def room_conflicts(
+        self,
+        meetingroom_id: int,
+        from_reserve: datetime,
+        to_reserve: datetime,
+        reservation_id: Optional[int] = None,
+    ) -> list[Reservation]:
+        return self._conflicts(self._rooms, meetingroom_id, from_reserve, to_reserve, reservation_id)
+
+    def user_conflicts(
+        self,
+        user_id: int,
+        from_reserve: datetime,
+        to_reserve: datetime,
+        reservation_id: Optional[int] = None,
+    ) -> list[Reservation]:
+        return self._conflicts(self._users, user_id, from_reserve, to_reserve, reservation_id)
+
+    def room_upcoming(self, meetingroom_id: int, moment: datetime) -> list[Reservation]:
+        with self._lock:
+            intervals = self._rooms.get(meetingroom_id)
+            entries = intervals.ending_after(moment) if intervals else []
+        return [entry.reservation for entry in entries]
+
+    def _conflicts(
+        self,
+        index: dict[int, IntervalList],
+        key: int,
+        from_reserve: datetime,
+        to_reserve: datetime,
+        reservation_id: Optional[int],
+    ) -> list[Reservation]:
+        with self._lock:
+            intervals = index.get(key)
+            entries = intervals.overlapping(from_reserve, to_reserve) if intervals else []
+        return [entry.reservation for entry in entries if entry.id != reservation_id]
+
+    def _add(self, entry: ScheduleEntry) -> None:
+        self._discard(entry.id)
+        self._by_id[entry.id] = entry
+        self._rooms.setdefault(entry.meetingroom_id, IntervalList()).add(entry)
+        self._users.setdefault(entry.user_id, IntervalList()).add(entry)
+
+    def _discard(self, reservation_id: int) -> None:
+        entry = self._by_id.pop(reservation_id, None)
+        if entry is None:
+            return
+        for index, key in ((self._rooms, entry.meetingroom_id), (self._users, entry.user_id)):
+            intervals = index.get(key)
+            if intervals is not None:
+                intervals.discard(entry)
+                if not intervals:
+                    del index[key]
+
+
+schedule_store = ScheduleStore()
+
+event.listen(Session, "before_commit", schedule_store._before_commit)
+event.listen(Session, "after_commit", schedule_store._after_commit)
+event.listen(Session, "after_rollback", schedule_store._after_rollback)
+change_feed.subscribe({Reservation.__tablename__}, lambda tables: schedule_store.invalidate())
+change_feed.subscribe(RELATED_TABLES, lambda tables: schedule_store.invalidate(), local=True)
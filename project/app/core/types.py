@@ -0,0 +1,91 @@
+# app/core/types.py
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import BigInteger, DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import TypeDecorator
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch(value: datetime) -> int:
+    """
+    Микросекунды от эпохи для наивного времени. Часовой пояс не
+    учитывается, как и при хранении текстом: сохраняется время "как есть".
+    """
+    return (value.replace(tzinfo=None) - EPOCH) // MICROSECOND
+
+
+def from_epoch(value: int) -> datetime:
+    return EPOCH + value * MICROSECOND
+
+
+class EpochDateTime(TypeDecorator):
+    """
+    datetime, который в SQLite хранится целым числом микросекунд от эпохи
+    вместо ISO-строки: строки и индексы компактнее, а диапазоны сравниваются
+    как числа. В остальных СУБД - обычный DateTime.
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(BigInteger())
+        return dialect.type_descriptor(DateTime())
+
+    def process_bind_param(self, value: Optional[datetime], dialect):
+        if value is None or dialect.name != "sqlite":
+            return value
+        return to_epoch(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name != "sqlite":
+            return value
+        return from_epoch(value)
+
+
+class epoch_now(FunctionElement):
+    """Текущее время UTC для server_default колонок EpochDateTime."""
+    type = EpochDateTime()
+    inherit_cache = True
+
+
+@compiles(epoch_now)
+def _epoch_now(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(epoch_now, "sqlite")
+def _epoch_now_sqlite(element, compiler, **kw):
+    # %f - секунды с миллисекундами (SS.SSS), берем дробную часть
+    return (
+        "(CAST(strftime('%s', 'now') AS INTEGER) * 1000000 "
+        "+ CAST(substr(strftime('%f', 'now'), 4) AS INTEGER) * 1000)"
+    )
+
+
+class unindexed(FunctionElement):
+    """
+    Колонка, по которой SQLite не начинает поиск в индексе (унарный +):
+    планировщик берет другой индекс из равных для него по оценке.
+    В остальных СУБД - сама колонка.
+    """
+    inherit_cache = True
+
+    def __init__(self, column):
+        super().__init__(column)
+        self.type = column.type
+
+
+@compiles(unindexed)
+def _unindexed(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(unindexed, "sqlite")
+def _unindexed_sqlite(element, compiler, **kw):
+    return "+" + compiler.process(element.clauses, **kw)
@@ -9,8 +9,10 @@ from fastapi_users.password import PasswordHelperProtocol
 from app.core import authenticators, security
 from app.core.authenticators.common import AuthType
 from app.core.config import settings
-from app.core.db import get_async_session
+from app.core.db import get_async_read_session, get_async_session
+from app.crud.base import invalidate_cache
 from app.crud.group import group_crud
+from app.crud.user import user_crud
 from app.models.user import User
 from app.schemas.group import Group
 from app.schemas.user import UserCreate
@@ -29,11 +31,42 @@ from fastapi_users.authentication import (
 )
 from fastapi_users.exceptions import UserNotExists
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
+from sqlalchemy import Select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+class UserDatabase(SQLAlchemyUserDatabase):
+    """
+    Пользователь загружается вместе с группой: ее отдает UserRead.
+    Пользователь по id (текущий пользователь запроса) берется из кэша
+    чтения user_crud, записи fastapi-users этот кэш сбрасывают.
+    """
+
+    async def get(self, id: int) -> Optional[User]:
+        return await user_crud.get(id, self.session)
+
+    async def _get_user(self, statement: Select) -> Optional[User]:
+        return await super()._get_user(statement.options(*user_crud.load_options()))
+
+    async def create(self, create_dict: dict[str, Any]) -> User:
+        user = await super().create(create_dict)
+        invalidate_cache(User)
+        await self.session.refresh(user, ["group"])
+        return user
+
+    async def update(self, user: User, update_dict: dict[str, Any]) -> User:
+        user = await super().update(user, update_dict)
+        invalidate_cache(User)
+        await self.session.refresh(user, ["group"])
+        return user
+
+    async def delete(self, user: User) -> None:
+        await super().delete(user)
+        invalidate_cache(User)
+
+
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
-    yield SQLAlchemyUserDatabase(session, User)
+    yield UserDatabase(session, User)
 
 
 # Определяем транспорт. Передавать токен будем через заголовок
@@ -158,5 +191,24 @@ fastapi_users = FastAPIUsers[User, int](
     [auth_backend],
 )
 
-current_user = fastapi_users.current_user(active=True)
-current_superuser = fastapi_users.current_user(active=True, superuser=True)
\ No newline at end of file
+
+async def get_user_read_db(session: AsyncSession = Depends(get_async_read_session)):
+    yield UserDatabase(session, User)
+
+
+async def get_user_read_manager(
+    user_db=Depends(get_user_read_db), session: AsyncSession = Depends(get_async_read_session)
+):
+    yield UserManager(user_db, session)
+
+
+# Проверка токена только читает пользователя, поэтому зависимости
+# current_user/current_superuser берут его через сессию чтения и не
+# занимают соединение записи. Роутеры fastapi_users работают как раньше
+fastapi_users_read = FastAPIUsers[User, int](
+    get_user_read_manager,
+    [auth_backend],
+)
+
+current_user = fastapi_users_read.current_user(active=True)
+current_superuser = fastapi_users_read.current_user(active=True, superuser=True)
\ No newline at end of file
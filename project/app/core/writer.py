@@ -0,0 +1,155 @@
+# app/core/writer.py
+import asyncio
+import logging
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, Base, begin_immediate, sqlite_wal
+
+# Запись без коммита: получает сессию, в которой писать, и возвращает результат
+Operation = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class WriteQueue:
+    """
+    Единственный писатель SQLite внутри процесса. Записи ставятся в очередь,
+    задача-писатель выполняет накопившиеся за время прошлого коммита записи
+    в одной транзакции (BEGIN IMMEDIATE), каждую в своей точке сохранения,
+    и фиксирует их одним коммитом - один fsync на пачку (group commit).
+    Результат или ошибка записи возвращается ее вызывающему через future;
+    ошибка одной записи откатывает только ее точку сохранения.
+
+    Для PostgreSQL и до старта очереди запись выполняется сразу в сессии
+    вызывающего кода: там параллельные писатели не мешают друг другу. Так же
+    и для SQLite не в режиме WAL (settings.sqlite_journal_mode): там коммит
+    очереди ждал бы транзакций чтения запросов.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.write_queue_enabled and sqlite_wal
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if not self.enabled or self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Дописывает то, что уже в очереди, и останавливает писателя."""
+        if not self.running:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def execute(self, session: AsyncSession, operation: Operation, *objs) -> Any:
+        """
+        Выполняет operation и фиксирует ее. objs - объекты session, которые
+        operation изменяет: при записи через очередь они переносятся в сессию
+        писателя, а после коммита обратно. Транзакция чтения session закрывается до ожидания, иначе
+        без WAL она не дала бы писателю закоммитить.
+        """
+        if session.in_transaction():
+            await session.commit()
+        if not self.running:
+            await begin_immediate(session)
+            result = await operation(session)
+            await session.commit()
+            return result
+
+        objs = [obj for obj in objs if isinstance(obj, Base)]
+        for obj in objs:
+            if obj in session:
+                session.expunge(obj)
+        if asyncio.get_running_loop() is self._loop:
+            result = await self._submit(operation)
+        else:
+            # Фоновые задачи (app/job) работают в своем потоке со своим циклом
+            # событий: запись передается писателю в цикл приложения
+            result = await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(self._submit(operation), self._loop)
+            )
+        # Как и без очереди, записанные и возвращенные записью объекты
+        # оказываются в сессии вызывающего кода: связи, уже загруженные в
+        # нее, подтягиваются без запросов
+        returned = result if isinstance(result, (list, tuple)) else [result]
+        for obj in [*objs, *returned]:
+            if isinstance(obj, Base) and inspect(obj).has_identity and not inspect(obj).was_deleted:
+                session.add(obj)
+        return result
+
+    async def _submit(self, operation: Operation) -> Any:
+        future = self._loop.create_future()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [await self._queue.get()]
+            while len(batch) < settings.write_queue_max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if None in batch:
+                stopping = True
+                batch = [item for item in batch if item is not None]
+            if batch:
+                await self._write(batch)
+
+    async def _write(self, batch: list[tuple[Operation, asyncio.Future]]) -> None:
+        done = []
+        try:
+            async with AsyncSessionLocal() as session:
+                await begin_immediate(session)
+                for operation, future in batch:
+                    if future.cancelled():
+                        continue
+                    # То, что запись отложила до коммита в session.info
+                    # (например, изменения расписания), при ошибке отбрасывается
+                    info = {
+                        key: list(value) if isinstance(value, list) else value
+                        for key, value in session.info.items()
+                    }
+                    try:
+                        # Одной записи точка сохранения не нужна: при ошибке
+                        # откатывается вся транзакция
+                        async with session.begin_nested() if len(batch) > 1 else nullcontext():
+                            result = await operation(session)
+                    except Exception as error:
+                        session.info.clear()
+                        session.info.update(info)
+                        done.append((future, None, error))
+                    else:
+                        done.append((future, result, None))
+                if any(error is None for _, _, error in done):
+                    await session.commit()
+                else:
+                    await session.rollback()
+        except Exception as error:
+            logging.exception("Write queue batch failed")
+            # Коммит не удался - не записано ничего из пачки
+            done = [(future, None, error) for _, future in batch]
+        for future, result, error in done:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+write_queue = WriteQueue()
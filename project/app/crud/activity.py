@@ -1,10 +1,10 @@
 # app/crud/activity.py
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import Any, Coroutine, Sequence
 
-from sqlalchemy import select, Row, RowMapping
+from sqlalchemy import bindparam, select, Row, RowMapping, exists
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql.functions import now
+from sqlalchemy.orm import joinedload, load_only
 
 from app.crud.base import CRUDBase
 from app.models import User
@@ -12,6 +12,11 @@ from app.models.activity import Activity
 
 
 class CRUDActivity(CRUDBase):
+    # Комната и пользователь пинга выводятся в отчете по активности
+    loads = ((Activity.meetingroom,), (Activity.user,))
+    # Пинги пишутся пачками и после записи не читаются
+    returning_loads = ()
+
     async def get_active_user_for_meeting_room(
             self,
             meetingroom_id: int,
@@ -20,12 +25,14 @@ class CRUDActivity(CRUDBase):
     ) -> User:
         pings = await session.execute(
             select(Activity).where(
-                Activity.computer_time > now() - lookback_interval,
                 Activity.meetingroom_id == meetingroom_id,
                 Activity.user_id != None,
-            ).order_by(Activity.computer_time.desc())
+                Activity.computer_time > datetime.now() - lookback_interval,
+            ).order_by(Activity.computer_time.desc()).limit(1)
+            # Нужен только пользователь последнего пинга
+            .options(load_only(Activity.id), joinedload(Activity.user))
         )
-        ping = pings.unique().scalars().first()
+        ping = pings.scalars().first()
         return ping.user if ping else None
 
     async def get_latest_for_meeting_room(
@@ -35,12 +42,12 @@ class CRUDActivity(CRUDBase):
             session: AsyncSession,
     ) -> Sequence[Activity]:
         pings = await session.execute(
-            select(Activity).where(
-                Activity.computer_time > now() - lookback_interval,
-                Activity.meetingroom_id == meetingroom_id
+            select(Activity).options(*self.load_options()).where(
+                Activity.meetingroom_id == meetingroom_id,
+                Activity.computer_time > datetime.now() - lookback_interval,
             ).order_by(Activity.computer_time.desc())
         )
-        ping = pings.unique().scalars().all()
+        ping = pings.scalars().all()
         return ping
 
     async def confirm_activty(
@@ -50,13 +57,19 @@ class CRUDActivity(CRUDBase):
             lookback_interval: timedelta,
             session: AsyncSession,
     ) -> bool:
-        pings = await session.execute(
-            select(Activity).where(
-                Activity.computer_time >= now() - lookback_interval,
-                Activity.meetingroom_id == meetingroom_id,
-                Activity.user_id == user_id,
-            ).limit(1)
+        # Порог считаем в Python: сравнение колонки с параметром
+        # идет по индексу (meetingroom_id, user_id, computer_time)
+        ping_exists = await session.execute(
+            self.statement("confirm", lambda: select(exists().where(
+                Activity.meetingroom_id == bindparam("meetingroom_id"),
+                Activity.user_id == bindparam("user_id"),
+                Activity.computer_time >= bindparam("since"),
+            ))),
+            {
+                "meetingroom_id": meetingroom_id,
+                "user_id": user_id,
+                "since": datetime.now() - lookback_interval,
+            },
         )
-        ping = pings.unique().scalars().first()
-        return True if ping else False
+        return ping_exists.scalar()
 activity_crud = CRUDActivity(Activity)
@@ -2,36 +2,49 @@
 
 from datetime import datetime, timedelta
 
-from sqlalchemy import delete, select
+from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
+from app.models import User
 from app.models.audit import AuditEvent
+from app.schemas.audit import AuditCreate
 
 
 class CRUDAuditEvent(CRUDBase):
+    loads = ((AuditEvent.user, User.group),)
+    # Записанные события не читаются, автора после INSERT не загружаем
+    returning_loads = ()
+
+    # Пачка событий одним INSERT (executemany) - для массовых операций.
+    # Созданные события не нужны, поэтому без RETURNING
+    async def create_many(
+            self,
+            events: list[AuditCreate],
+            session: AsyncSession,
+            commit: bool = True,
+            returning: bool = False,
+    ) -> None:
+        return await super().create_many(events, session, commit, returning)
+
     async def get_all(self, session: AsyncSession):
         db_objs = await session.execute(
-            select(self.model).order_by(AuditEvent.time.desc())
+            select(self.model).options(*self.load_options()).order_by(AuditEvent.time.desc())
         )
-        return db_objs.unique().scalars().all()
+        return db_objs.scalars().all()
 
     async def remove_older(
             self,
             session: AsyncSession,
             days: int,
     ):
-         await session.execute(
-            delete(AuditEvent).where(
-                    AuditEvent.time <= datetime.now() - timedelta(days=days),
-            )
-         )
-         await session.execute(
-            delete(AuditEvent).where(
-                AuditEvent.time == None
-            )
-         )
-         await session.commit()
+        await self.delete_where(
+            [or_(
+                AuditEvent.time <= datetime.now() - timedelta(days=days),
+                AuditEvent.time == None,
+            )],
+            session,
+        )
 
 audit_crud = CRUDAuditEvent(AuditEvent)
 
@@ -1,54 +1,350 @@
 # app/crud/base.py
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from typing import Any, Callable, Hashable, Optional
+
+from sqlalchemy import delete, insert, inspect, orm, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import MANYTOONE, Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import Executable
+
+from app.core.cache import ReadCache
+from app.core.changes import change_feed
+from app.core.writer import write_queue
+
+# CRUD с кэшем чтения: их сбрасывает invalidate_cache
+cached_cruds: list["CRUDBase"] = []
+
+
+def loader_option(path: tuple, returning: bool = False, many: bool = False):
+    """
+    Загрузка связей по пути (Reservation.user, User.group): многие-к-одному -
+    JOIN (строки не размножаются), коллекции - отдельным SELECT ... IN на
+    все объекты. К INSERT/UPDATE ... RETURNING JOIN не присоединить: первая
+    связь многие-к-одному одного объекта берется из identity map сессии и
+    только при промахе - запросом по ключу, пачки (many) - SELECT ... IN.
+    """
+    option = None
+    for attribute in path:
+        first_returned = returning and option is None
+        if attribute.property.direction is not MANYTOONE or (first_returned and many):
+            strategy = "selectinload"
+        elif first_returned:
+            strategy = "immediateload"
+        else:
+            strategy = "joinedload"
+        option = getattr(orm if option is None else option, strategy)(attribute)
+    return option
+
+
+def merge_loaded(session: Session, obj, merged: dict):
+    """
+    Копия объекта в session без запросов к БД вместе с загруженными связями.
+    merged - уже скопированные объекты по id().
+    """
+    if id(obj) not in merged:
+        merged[id(obj)] = session.merge(obj, load=False)
+        merge_relationships(session, obj, merged)
+    return merged[id(obj)]
+
+
+def merge_relationships(session: Session, obj, merged: dict) -> None:
+    state = inspect(obj)
+    for relationship in state.mapper.relationships:
+        if relationship.key not in state.dict:
+            continue
+        value = state.dict[relationship.key]
+        items = value if relationship.uselist else [value] if value is not None else []
+        if relationship.cascade.merge:
+            # Связь уже скопировал merge(), но не связи ее объектов
+            for item in items:
+                if id(item) not in merged:
+                    merged[id(item)] = session.identity_map[inspect(item).key]
+                    merge_relationships(session, item, merged)
+            continue
+        # Связи viewonly (User.group) merge() не переносит
+        copies = [merge_loaded(session, item, merged) for item in items]
+        if not relationship.uselist:
+            copies = copies[0] if copies else None
+        set_committed_value(merged[id(obj)], relationship.key, copies)
+
+
+def copy_loaded(value, session: Optional[Session] = None):
+    """
+    Копия результата чтения (объект, список объектов или None) в session,
+    без session - отсоединенная копия для кэша.
+    """
+    if session is None:
+        # Сессия без подключения к БД: закрываясь, она отсоединяет копии
+        with Session() as copier:
+            return copy_loaded(value, copier)
+    merged = {}
+    if isinstance(value, list):
+        return [merge_loaded(session, obj, merged) for obj in value]
+    if value is not None:
+        return merge_loaded(session, value, merged)
+    return None
+
+
+def invalidate_cache(*models) -> None:
+    """Сбрасывает кэши чтения, в объекты которых входят записи models."""
+    tables = {model.__tablename__ for model in models}
+    for crud in cached_cruds:
+        if crud.cached_tables() & tables:
+            crud.cache.clear()
 
 
 class CRUDBase:
+    # Связи, которые загружаются вместе с объектами модели: пути от модели,
+    # например (Reservation.user, User.group). Сами связи не загружаются
+    # (lazy="raise_on_sql" в моделях), обращение к незагруженной - ошибка
+    loads: tuple = ()
+    # То же для объектов, которые возвращают записи (RETURNING),
+    # None - как loads
+    returning_loads: Optional[tuple] = None
+    # Кэш чтения get/get_multi и поиска по имени (app.core.cache): сколько
+    # результатов хранить, 0 - без кэша. Только для редко меняющихся объектов
+    cache_size: int = 0
+
     def __init__(self, model):
         self.model = model
+        self._load_options: dict[tuple[bool, bool], list] = {}
+        self._statements: dict[Hashable, Executable] = {}
+        self.cache = ReadCache(type(self).__name__, self.cache_size)
+        if self.cache_size:
+            cached_cruds.append(self)
+            # Записи тех же таблиц в других процессах (app.core.changes)
+            change_feed.subscribe(self.cached_tables(), lambda tables: self.cache.clear())
+
+    def cached_tables(self) -> set[str]:
+        """Таблицы, записи в которые меняют объекты этого CRUD вместе со связями."""
+        models = [self.model, *(attribute.property.mapper.class_ for path in self.loads for attribute in path)]
+        return {model.__tablename__ for model in models}
+
+    def invalidate(self) -> None:
+        invalidate_cache(self.model)
+
+    async def cached(self, key: Hashable, session: AsyncSession, load):
+        """
+        Результат load() через кэш чтения. Кэш хранит отсоединенные копии, а
+        вызывающий получает свою копию в session: объекты не делятся между
+        запросами, и их можно менять и удалять как загруженные из БД.
+        """
+        if not self.cache.enabled:
+            return await load()
+        found, value = self.cache.get(key)
+        if found:
+            return await session.run_sync(lambda sync_session: copy_loaded(value, sync_session))
+        generation = self.cache.generation
+        value = await load()
+        self.cache.put(key, copy_loaded(value), generation)
+        return value
 
     async def get(self, obj_id: int, session: AsyncSession):
-        db_obj = await session.execute(
-            select(self.model).where(self.model.id == obj_id)
-        )
-        return db_obj.scalars().first()
+        async def load():
+            db_obj = await session.execute(
+                select(self.model).where(self.model.id == obj_id).options(*self.load_options())
+            )
+            return db_obj.scalars().first()
+
+        return await self.cached(("id", obj_id), session, load)
 
     async def get_multi(self, session: AsyncSession):
-        db_objs = await session.execute(select(self.model))
-        return db_objs.unique().scalars().all()
+        async def load():
+            db_objs = await session.execute(select(self.model).options(*self.load_options()))
+            return db_objs.scalars().all()
+
+        return await self.cached(("all",), session, load)
+
+    async def get_multi_by_ids(self, obj_ids: list[int], session: AsyncSession):
+        db_objs = await session.execute(
+            select(self.model).where(self.model.id.in_(obj_ids)).options(*self.load_options())
+        )
+        return db_objs.scalars().all()
+
+    def load_options(self, returning: bool = False, many: bool = False) -> list:
+        """Опции загрузки связей из loads для SELECT или для RETURNING."""
+        key = (returning, returning and many)
+        if key not in self._load_options:
+            loads = self.loads
+            if returning and self.returning_loads is not None:
+                loads = self.returning_loads
+            self._load_options[key] = [loader_option(path, *key) for path in loads]
+        return self._load_options[key]
+
+    def statement(self, key: Hashable, build: Callable[[], Executable]) -> Executable:
+        """
+        Запрос, который build собирает один раз на ключ key; значения
+        передаются при выполнении параметрами (bindparam). Собранный запрос
+        не строится заново на каждый вызов, а его ключ в кэше компиляции
+        SQLAlchemy вычисляется только при первом выполнении.
+        """
+        if key not in self._statements:
+            self._statements[key] = build()
+        return self._statements[key]
 
+    def column_values(self, obj_in) -> dict[str, Any]:
+        """
+        Значения колонок модели из схемы, словаря или объекта модели.
+        Поля, которых нет среди колонок (связи, вложенные схемы), отбрасываются.
+        """
+        columns = inspect(self.model).column_attrs.keys()
+        if isinstance(obj_in, self.model):
+            # Только заданные поля: для остальных сработают default колонок
+            data = inspect(obj_in).dict
+        elif isinstance(obj_in, dict):
+            data = obj_in
+        else:
+            data = obj_in.model_dump()
+        return {field: value for field, value in data.items() if field in columns}
+
+    # commit=False - изменения только отправляются в БД, а фиксирует их
+    # вызывающий код одним коммитом вместе с остальными записями.
+    # commit=True - запись идет через очередь записи (app.core.writer)
+    async def _commit(self, session: AsyncSession, write, db_obj=None):
+        """
+        Выполняет write(сессия) - запись без коммита - и фиксирует ее. db_obj
+        переносится в сессию, где идет запись.
+        """
+        objs = () if db_obj is None else (db_obj,)
+        try:
+            return await write_queue.execute(session, write, *objs)
+        finally:
+            # Кэш сбрасывается и при записи (ниже), и после коммита: чтение
+            # между ними могло положить в кэш еще старые строки
+            self.invalidate()
+
+    # Запись - один INSERT/UPDATE/DELETE ... RETURNING: новые значения, в
+    # том числе заполненные БД (id, default), приходят в ответе на сам
+    # запрос, повторный SELECT (refresh) не нужен
     async def create(
         self,
         db_obj,
         session: AsyncSession,
+        commit: bool = True,
     ):
-        if not isinstance(db_obj, self.model):
-            obj_in_data = db_obj.dict()
-            db_obj = self.model(**obj_in_data)
-        session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
-        return db_obj
+        if commit:
+            return await self._commit(
+                session, lambda writer: self.create(db_obj, writer, commit=False)
+            )
+        created = await self._insert([db_obj], session)
+        return created[0]
+
+    async def create_many(
+        self,
+        objs_in: list,
+        session: AsyncSession,
+        commit: bool = True,
+        returning: bool = True,
+    ) -> Optional[list]:
+        """
+        Несколько объектов одним INSERT (executemany). returning=False -
+        созданные объекты не нужны, без RETURNING и загрузки связей.
+        """
+        if commit:
+            return await self._commit(
+                session, lambda writer: self.create_many(objs_in, writer, commit=False, returning=returning)
+            )
+        return await self._insert(objs_in, session, returning)
+
+    async def _insert(self, objs_in: list, session: AsyncSession, returning: bool = True) -> Optional[list]:
+        self.invalidate()
+        rows = [self.column_values(obj_in) for obj_in in objs_in]
+        if not returning:
+            if rows:
+                await session.execute(insert(self.model), rows)
+            return None
+        if not rows:
+            return []
+        # Строки передаются параметрами, а не через values(): текст запроса
+        # не зависит от их числа и берется из кэша компиляции SQLAlchemy
+        db_objs = await session.scalars(
+            insert(self.model).returning(self.model).options(
+                *self.load_options(returning=True, many=len(rows) > 1)
+            ),
+            rows,
+        )
+        return db_objs.all()
 
     async def update(
         self,
         db_obj,
         obj_in,
         session: AsyncSession,
+        commit: bool = True,
     ):
-        obj_data = jsonable_encoder(db_obj)
-        update_data = obj_in.dict(exclude_unset=True)
-
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        if commit:
+            return await self._commit(
+                session, lambda writer: self.update(db_obj, obj_in, writer, commit=False), db_obj
+            )
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=True)
+        # В identity map сессии db_obj получит новые значения из RETURNING
         session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
+        await self.update_where([self.model.id == db_obj.id], update_data, session, commit=False)
         return db_obj
 
-    async def remove(self, db_obj, session: AsyncSession):
+    async def update_where(
+        self,
+        where: list,
+        values: dict[str, Any],
+        session: AsyncSession,
+        commit: bool = True,
+    ) -> list:
+        """
+        UPDATE ... WHERE ... RETURNING. Загруженные в сессию объекты
+        обновляются значениями из ответа вместе со связями.
+        """
+        if commit:
+            return await self._commit(
+                session, lambda writer: self.update_where(where, values, writer, commit=False)
+            )
+        self.invalidate()
+        values = self.column_values(values)
+        if not values:
+            db_objs = await session.scalars(select(self.model).where(*where).options(*self.load_options()))
+            return db_objs.all()
+        db_objs = await session.scalars(
+            update(self.model)
+            .where(*where)
+            .values(**values)
+            .returning(self.model)
+            .options(*self.load_options(returning=True))
+            # Объекты сессии переписываются строками из ответа вместе со
+            # связями (например, комната брони после смены meetingroom_id),
+            # отдельная синхронизация не нужна
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        return db_objs.all()
+
+    async def remove(self, db_obj, session: AsyncSession, commit: bool = True):
+        if commit:
+            return await self._commit(
+                session, lambda writer: self.remove(db_obj, writer, commit=False), db_obj
+            )
+        self.invalidate()
+        # Удаление через сессию: каскады связей модели (брони комнаты,
+        # разрешения группы) выполняет ORM
         await session.delete(db_obj)
-        await session.commit()
+        await session.flush()
         return db_obj
+
+    async def delete_where(
+        self,
+        where: list,
+        session: AsyncSession,
+        commit: bool = True,
+    ) -> list[int]:
+        """
+        DELETE ... WHERE ... RETURNING id, возвращает id удаленных строк.
+        Каскады ORM не выполняются - только ondelete внешних ключей в БД.
+        """
+        if commit:
+            return await self._commit(
+                session, lambda writer: self.delete_where(where, writer, commit=False)
+            )
+        self.invalidate()
+        removed_ids = await session.scalars(
+            delete(self.model)
+            .where(*where)
+            .returning(self.model.id)
+        )
+        return removed_ids.all()
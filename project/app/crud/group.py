@@ -1,7 +1,7 @@
 # app/crud/reservation.py
 from typing import Union, Dict, Any
 
-from sqlalchemy import delete
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
@@ -10,50 +10,64 @@ from app.schemas.group import GroupUpdateWithPerms
 
 
 class CRUDGroup(CRUDBase):
+    # Права группы с комнатами - их отдает GroupWithPerms и выводит __repr__
+    loads = ((Group.permissions, GroupRoomPermission.meetingroom),)
+    # Группа с правами нужна каждой проверке брони
+    cache_size = 128
+
     async def update(
             self,
             db_obj: Group,
             obj_in: Union[GroupUpdateWithPerms, Dict[str, Any]],
             session: AsyncSession
     ) -> Group:
-        # Преобразование входных данных
-        if isinstance(obj_in, dict):
-            update_data = obj_in
-        else:
-            update_data = obj_in.model_dump(exclude_unset=True)
+        async def write(writer: AsyncSession) -> Group:
+            writer.add(db_obj)
 
-        if "permissions" in update_data:
+            # Преобразование входных данных
+            if isinstance(obj_in, dict):
+                update_data = obj_in
+            else:
+                update_data = obj_in.model_dump(exclude_unset=True)
 
-            permissions_data = update_data.pop("permissions")
+            if "permissions" in update_data:
 
-            await session.execute(
-                delete(GroupRoomPermission)
-                .where(GroupRoomPermission.group_id == db_obj.id)
-            )
-            db_obj.permissions.clear()
-            await session.flush()
-
-            new_permissions = []
-            for perm_data in permissions_data:
-                new_perm = GroupRoomPermission(
-                    max_future_reservation=perm_data["max_future_reservation"],
-                    meetingroom_id=perm_data["meetingroom_id"],
-                    group_id=db_obj.id  # Устанавливаем FK напрямую
+                permissions_data = update_data.pop("permissions")
+
+                await writer.execute(
+                    delete(GroupRoomPermission)
+                    .where(GroupRoomPermission.group_id == db_obj.id)
                 )
-                new_permissions.append(new_perm)
+                db_obj.permissions.clear()
+                await writer.flush()
 
-            db_obj.permissions = new_permissions
+                new_permissions = []
+                for perm_data in permissions_data:
+                    new_perm = GroupRoomPermission(
+                        max_future_reservation=perm_data["max_future_reservation"],
+                        max_week_duration=perm_data.get("max_week_duration"),
+                        max_active_reservations=perm_data.get("max_active_reservations"),
+                        meetingroom_id=perm_data["meetingroom_id"],
+                        group_id=db_obj.id  # Устанавливаем FK напрямую
+                    )
+                    new_permissions.append(new_perm)
 
-        for field, value in update_data.items():
-            setattr(db_obj, field, value)
+                db_obj.permissions = new_permissions
 
-        session.add(db_obj)
-        await session.commit()
-        await session.refresh(db_obj)
+            for field, value in update_data.items():
+                setattr(db_obj, field, value)
+
+            await writer.flush()
+
+            # Перечитываем группу вместе с новыми разрешениями и их комнатами
+            await writer.execute(
+                select(Group).where(Group.id == db_obj.id)
+                .options(*self.load_options())
+                .execution_options(populate_existing=True)
+            )
 
-        # Явно загружаем связанные разрешения
-        await session.refresh(db_obj, ["permissions"])
+            return db_obj
 
-        return db_obj
+        return await self._commit(session, write, db_obj)
 
 group_crud = CRUDGroup(Group)
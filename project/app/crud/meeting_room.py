@@ -1,14 +1,17 @@
 # app/crud/meeting_room.py
 from typing import Optional, List
-from sqlalchemy import select
+from sqlalchemy import bindparam, delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.schedule import schedule_store
 from app.crud.base import CRUDBase
-from app.models import GroupRoomPermission
+from app.models import GroupRoomPermission, ReservationQuotaCounter
 from app.models.meeting_room import MeetingRoom
 
 
 # Дополним CRUD класс, наследовав от CRUDBase
 class CRUDMeetingRoom(CRUDBase):
+    # Комнаты читают почти все запросы (проверки, пинги), меняют редко
+    cache_size = 256
 
     # Преобразуем функцию в методы класса
     async def get_room_by_name(
@@ -17,13 +20,18 @@ class CRUDMeetingRoom(CRUDBase):
         room_name: str,
         session: AsyncSession,
     ) -> Optional[MeetingRoom]:
-        # Получаем объект класса Result
-        db_room_id = await session.execute(
-            select(MeetingRoom).where(MeetingRoom.name == room_name)
-        )
-        # Извлекаем из него конкретное значение
-        db_room_id = db_room_id.scalars().first()
-        return db_room_id
+        async def load():
+            # Получаем объект класса Result
+            db_room_id = await session.execute(
+                self.statement("by_name", lambda: select(MeetingRoom).where(
+                    MeetingRoom.name == bindparam("room_name")
+                )),
+                {"room_name": room_name},
+            )
+            # Извлекаем из него конкретное значение
+            return db_room_id.scalars().first()
+
+        return await self.cached(("name", room_name), session, load)
 
     async def get_allowed_rooms(self,
                                 group_id: int,
@@ -34,9 +42,21 @@ class CRUDMeetingRoom(CRUDBase):
                       GroupRoomPermission.meetingroom_id == MeetingRoom.id)
                 .where(GroupRoomPermission.group_id == group_id)
         )
-        room_list = room_list.unique().scalars().all()
+        room_list = room_list.scalars().all()
         return room_list
 
+    async def remove(self, db_obj, session: AsyncSession, commit: bool = True):
+        if not commit:
+            # ondelete счетчиков квот срабатывает только с PRAGMA foreign_keys
+            await session.execute(
+                delete(ReservationQuotaCounter)
+                .where(ReservationQuotaCounter.meetingroom_id == db_obj.id)
+            )
+        db_obj = await super().remove(db_obj, session, commit)
+        # Брони комнаты удалены каскадом, расписание нужно перечитать
+        schedule_store.invalidate()
+        return db_obj
+
 
 # Объект CRUD наследуем уже не от CRUDBase, а от
 # CRUDMeetingRoom, чтобы был доступен дополнительный
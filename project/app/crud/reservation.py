@@ -2,14 +2,290 @@
 from datetime import datetime, timedelta
 from typing import Optional
 
-from sqlalchemy import and_, between, or_, select, delete, func, case
+from sqlalchemy import BindParameter, Integer, Row, and_, bindparam, column, or_, select, update, delete, func, case, exists, tuple_, values
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
+from app.core.config import settings
+from app.core.schedule import schedule_store
+from app.core.types import EpochDateTime, to_epoch, unindexed
 from app.crud.base import CRUDBase
-from app.models import Reservation
+from app.crud.reservation_archive import reservation_archive_crud
+from app.crud.reservation_quota import quota_key, reservation_quota_crud
+from app.models import Group, GroupRoomPermission, MeetingRoom, Reservation, User, reservation_rtree
+
+
+# EXCLUDE-ограничения PostgreSQL против пересечений (миграция e5c3a9f07b18)
+ROOM_OVERLAP_CONSTRAINT = "reservation_room_no_overlap"
+USER_OVERLAP_CONSTRAINT = "reservation_user_no_overlap"
+
+
+def overlap_constraint(error: IntegrityError) -> Optional[str]:
+    """Имя нарушенного EXCLUDE-ограничения, None - другая ошибка целостности."""
+    # error.orig - обертка SQLAlchemy над исключением asyncpg
+    cause = getattr(error.orig, "__cause__", None)
+    if getattr(cause, "sqlstate", None) != "23P01":
+        return None
+    return getattr(cause, "constraint_name", None)
+
+
+def same_time(
+    from_reserve: datetime,
+    to_reserve: datetime,
+    reservation_id: Optional[int] = None,
+) -> list:
+    """
+    Условия пересечения с интервалом [from_reserve, to_reserve).
+    Брони, которые стыкуются концом к началу, не пересекаются.
+    Поиск идет диапазоном to_reserve по индексам (..., to_reserve,
+    from_reserve) или по R*Tree. По from_reserve (индексы постраничной
+    выдачи (..., from_reserve, id)) SQLite просматривал бы всю историю до
+    конца интервала, поэтому это сравнение для индекса закрыто.
+    """
+    conditions = [
+        Reservation.to_reserve > from_reserve,
+        unindexed(Reservation.from_reserve) < to_reserve,
+    ]
+    # Если передан id бронирования, то исключим его самого
+    if reservation_id is not None:
+        conditions.append(Reservation.id != reservation_id)
+    return conditions
+
+
+def epoch(moment: datetime):
+    """Секунды от эпохи - так же считают триггеры, заполняющие R*Tree."""
+    if isinstance(moment, BindParameter):
+        # Собранный запрос: секунды передаются своим параметром, см. same_time_params
+        return bindparam(f"{moment.key}_epoch")
+    return to_epoch(moment) // 1_000_000
+
+
+def rtree_box(
+    from_reserve: datetime,
+    to_reserve: Optional[datetime] = None,
+    meetingroom_id: Optional[int] = None,
+) -> list:
+    """
+    Брони, чей прямоугольник в R*Tree задевает [from_reserve, to_reserve].
+    Секунды в R*Tree округлены вниз, поэтому границы включительные, а
+    точное сравнение делается по самой брони.
+    """
+    conditions = [
+        reservation_rtree.c.id == Reservation.id,
+        reservation_rtree.c.to_reserve >= epoch(from_reserve),
+    ]
+    if to_reserve is not None:
+        conditions.append(reservation_rtree.c.from_reserve <= epoch(to_reserve))
+    if meetingroom_id is not None:
+        conditions.append(reservation_rtree.c.min_room <= meetingroom_id)
+        conditions.append(reservation_rtree.c.max_room >= meetingroom_id)
+    return conditions
+
+
+def room_same_time(
+    meetingroom_id: int,
+    from_reserve: datetime,
+    to_reserve: datetime,
+    reservation_id: Optional[int] = None,
+) -> list:
+    conditions = same_time(from_reserve, to_reserve, reservation_id)
+    if settings.reservation_rtree_enabled:
+        # Без условия на meetingroom_id у reservation нет подходящего
+        # индекса, и SQLite начинает поиск с R*Tree
+        return [*rtree_box(from_reserve, to_reserve, meetingroom_id), *conditions]
+    return [Reservation.meetingroom_id == meetingroom_id, *conditions]
+
+
+def bound_same_time(by_room: bool, exclude: bool) -> list:
+    """
+    Условия room_same_time (by_room) или same_time по пользователю для
+    собранного один раз запроса: значения передаются параметрами из
+    same_time_params. exclude - с исключением брони reservation_id.
+    """
+    reservation_id = bindparam("reservation_id") if exclude else None
+    if by_room:
+        return room_same_time(
+            bindparam("meetingroom_id"), bindparam("from_reserve"), bindparam("to_reserve"), reservation_id
+        )
+    return [
+        Reservation.user_id == bindparam("user_id"),
+        *same_time(bindparam("from_reserve"), bindparam("to_reserve"), reservation_id),
+    ]
+
+
+def same_time_params(
+    from_reserve: datetime,
+    to_reserve: datetime,
+    reservation_id: Optional[int] = None,
+    **params,
+) -> dict:
+    return dict(
+        params,
+        from_reserve=from_reserve,
+        to_reserve=to_reserve,
+        from_reserve_epoch=epoch(from_reserve),
+        to_reserve_epoch=epoch(to_reserve),
+        reservation_id=reservation_id,
+    )
 
 
 class CRUDReservation(CRUDBase):
+    # Комната и пользователь с группой - их отдает ReservationRoomDB и
+    # выводит __repr__ брони (описания аудита, тексты ошибок пересечений)
+    loads = (
+        (Reservation.meetingroom,),
+        (Reservation.user, User.group),
+    )
+
+    # Изменение попадет в расписание вместе с коммитом сессии. Счетчики
+    # квот (reservation_quota_counter) обновляются до коммита, в одной
+    # транзакции с бронью. С commit запись идет через очередь записи
+    async def create(
+        self,
+        db_obj,
+        session: AsyncSession,
+        commit: bool = True,
+    ):
+        if commit:
+            return await self._commit(
+                session, lambda writer: self.create(db_obj, writer, commit=False)
+            )
+        reservation = await super().create(db_obj, session, commit=False)
+        await reservation_quota_crud.track(session, added=[quota_key(reservation)])
+        schedule_store.add(reservation, session=session)
+        return reservation
+
+    async def create_many(
+        self,
+        objs_in: list[dict],
+        session: AsyncSession,
+        commit: bool = True,
+    ) -> list[Reservation]:
+        """Несколько броней одним INSERT с RETURNING, по возрастанию начала."""
+        if commit:
+            return await self._commit(session, lambda writer: self.create_many(objs_in, writer, commit=False))
+        reservations = await super().create_many(objs_in, session, commit=False)
+        reservations = sorted(reservations, key=lambda item: (item.from_reserve, item.id))
+        await reservation_quota_crud.track(
+            session, added=[quota_key(reservation) for reservation in reservations]
+        )
+        for reservation in reservations:
+            schedule_store.add(reservation, session=session)
+        return reservations
+
+    async def update(
+        self,
+        db_obj,
+        obj_in,
+        session: AsyncSession,
+        commit: bool = True,
+    ):
+        if commit:
+            return await self._commit(
+                session, lambda writer: self.update(db_obj, obj_in, writer, commit=False), db_obj
+            )
+        before = quota_key(db_obj)
+        reservation = await super().update(db_obj, obj_in, session, commit=False)
+        await reservation_quota_crud.track(session, added=[quota_key(reservation)], removed=[before])
+        schedule_store.add(reservation, session=session)
+        return reservation
+
+    async def remove(self, db_obj, session: AsyncSession, commit: bool = True):
+        if commit:
+            return await self._commit(
+                session, lambda writer: self.remove(db_obj, writer, commit=False), db_obj
+            )
+        reservation = await super().remove(db_obj, session, commit=False)
+        await reservation_quota_crud.track(session, removed=[quota_key(reservation)])
+        schedule_store.discard(reservation.id, session=session)
+        return reservation
+
+    async def update_if_version(
+        self,
+        db_obj: Reservation,
+        obj_in,
+        version: int,
+        session: AsyncSession,
+        commit: bool = True,
+    ) -> Optional[Reservation]:
+        """
+        Изменяет бронь одним UPDATE ... WHERE id = :id AND version = :version
+        с увеличением версии. None - бронь уже изменена или удалена другим
+        запросом, ничего не записано.
+        """
+        if commit:
+            return await self._commit(
+                session,
+                lambda writer: self.update_if_version(db_obj, obj_in, version, writer, commit=False),
+                db_obj,
+            )
+        update_data = obj_in.model_dump(exclude_unset=True)
+        columns = Reservation.__table__.columns.keys()
+        before = quota_key(db_obj)
+        new_version = await session.scalar(
+            update(Reservation)
+            .where(Reservation.id == db_obj.id, Reservation.version == version)
+            .values(
+                **{field: value for field, value in update_data.items() if field in columns},
+                version=Reservation.version + 1,
+            )
+            # Новые значения переносятся в db_obj без повторного SELECT
+            .returning(Reservation.version)
+        )
+        if new_version is None:
+            return None
+        await reservation_quota_crud.track(session, added=[quota_key(db_obj)], removed=[before])
+        schedule_store.add(db_obj, session=session)
+        return db_obj
+
+    async def remove_if_version(
+        self,
+        db_obj: Reservation,
+        version: int,
+        session: AsyncSession,
+        commit: bool = True,
+    ) -> Optional[Reservation]:
+        """DELETE ... WHERE id = :id AND version = :version, None - версия устарела."""
+        if commit:
+            return await self._commit(
+                session, lambda writer: self.remove_if_version(db_obj, version, writer, commit=False), db_obj
+            )
+        removed_id = await session.scalar(
+            delete(Reservation)
+            .where(Reservation.id == db_obj.id, Reservation.version == version)
+            .returning(Reservation.id)
+        )
+        if removed_id is None:
+            return None
+        await reservation_quota_crud.track(session, removed=[quota_key(db_obj)])
+        schedule_store.discard(db_obj.id, session=session)
+        return db_obj
+
+    async def remove_many(
+        self,
+        reservations: list[Reservation],
+        session: AsyncSession,
+        commit: bool = True,
+    ) -> list[Reservation]:
+        """Удаляет брони одним DELETE ... WHERE id IN (...)."""
+        if commit:
+            return await self._commit(
+                session, lambda writer: self.remove_many(reservations, writer, commit=False)
+            )
+        if reservations:
+            await self.delete_where(
+                [Reservation.id.in_([reservation.id for reservation in reservations])],
+                session,
+                commit=False,
+            )
+        await reservation_quota_crud.track(
+            session, removed=[quota_key(reservation) for reservation in reservations]
+        )
+        for reservation in reservations:
+            schedule_store.discard(reservation.id, session=session)
+        return reservations
+
     async def get_room_reservations_at_the_same_time(
         self,
         # Через * обозначим что все дальнейшие параметры должны передаваться по
@@ -23,119 +299,459 @@ class CRUDReservation(CRUDBase):
         reservation_id: Optional[int] = None,
         session: AsyncSession,
     ) -> list[Reservation]:
+        # Расписание в памяти отвечает без запроса к БД, если покрывает интервал
+        if await schedule_store.ensure_fresh(session) and schedule_store.covers(from_reserve):
+            return schedule_store.room_conflicts(
+                meetingroom_id, from_reserve, to_reserve, reservation_id
+            )
 
-        select_stmt = select(Reservation).where(
-            Reservation.meetingroom_id == meetingroom_id,
-            or_(
-                between(
-                    from_reserve,
-                    Reservation.from_reserve,
-                    Reservation.to_reserve,
-                ),
-                between(
-                    to_reserve,
-                    Reservation.from_reserve,
-                    Reservation.to_reserve,
-                ),
-                and_(
-                    from_reserve <= Reservation.from_reserve,
-                    to_reserve >= Reservation.to_reserve,
+        exclude = reservation_id is not None
+        reservations = await session.execute(
+            self.statement(
+                ("room_same_time", exclude, settings.reservation_rtree_enabled),
+                lambda: select(Reservation).options(*self.load_options()).where(
+                    *bound_same_time(by_room=True, exclude=exclude),
                 ),
             ),
+            same_time_params(from_reserve, to_reserve, reservation_id, meetingroom_id=meetingroom_id),
         )
-        # Если передан id бронирования, то проверим условие
-        if reservation_id is not None:
-            select_stmt = select_stmt.where(Reservation.id != reservation_id)
-        reservations = await session.execute(select_stmt)
-        reservations = reservations.unique().scalars().all()
+        reservations = reservations.scalars().all()
         return reservations
 
     async def get_user_reservations_at_the_same_time(
         self,
-        # Через * обозначим что все дальнейшие параметры должны передаваться по
-        # ключу. И расположим параметры со значением по-умолчанию перед
-        # значениями без параметра по-умолчанию
         *,
         from_reserve: datetime,
         to_reserve: datetime,
         user_id: int,
-        # Опциональный параметр - id объекта бронирования
         reservation_id: Optional[int] = None,
         session: AsyncSession,
     ) -> list[Reservation]:
+        if await schedule_store.ensure_fresh(session) and schedule_store.covers(from_reserve):
+            return schedule_store.user_conflicts(
+                user_id, from_reserve, to_reserve, reservation_id
+            )
 
-        select_stmt = select(Reservation).where(
-            Reservation.user_id == user_id,
-            or_(
-                between(
-                    from_reserve,
-                    Reservation.from_reserve,
-                    Reservation.to_reserve,
-                ),
-                between(
-                    to_reserve,
-                    Reservation.from_reserve,
-                    Reservation.to_reserve,
-                ),
-                and_(
-                    from_reserve < Reservation.from_reserve,
-                    to_reserve > Reservation.to_reserve,
+        exclude = reservation_id is not None
+        reservations = await session.execute(
+            self.statement(
+                ("user_same_time", exclude),
+                lambda: select(Reservation).options(*self.load_options()).where(
+                    *bound_same_time(by_room=False, exclude=exclude),
                 ),
             ),
+            same_time_params(from_reserve, to_reserve, reservation_id, user_id=user_id),
         )
-        # Если передан id бронирования, то проверим условие
-        if reservation_id is not None:
-            select_stmt = select_stmt.where(Reservation.id != reservation_id)
-        reservations = await session.execute(select_stmt)
-        reservations = reservations.unique().scalars().all()
+        reservations = reservations.scalars().all()
         return reservations
 
+    async def room_has_reservations_at_the_same_time(
+        self,
+        *,
+        from_reserve: datetime,
+        to_reserve: datetime,
+        meetingroom_id: int,
+        reservation_id: Optional[int] = None,
+        session: AsyncSession,
+    ) -> bool:
+        # Только проверка: EXISTS по индексу, без выборки и join-ов
+        if await schedule_store.ensure_fresh(session) and schedule_store.covers(from_reserve):
+            return bool(schedule_store.room_conflicts(
+                meetingroom_id, from_reserve, to_reserve, reservation_id
+            ))
+
+        exclude = reservation_id is not None
+        result = await session.execute(
+            self.statement(
+                ("room_has_same_time", exclude, settings.reservation_rtree_enabled),
+                lambda: select(exists().where(*bound_same_time(by_room=True, exclude=exclude))),
+            ),
+            same_time_params(from_reserve, to_reserve, reservation_id, meetingroom_id=meetingroom_id),
+        )
+        return result.scalar()
+
+    async def user_has_reservations_at_the_same_time(
+        self,
+        *,
+        from_reserve: datetime,
+        to_reserve: datetime,
+        user_id: int,
+        reservation_id: Optional[int] = None,
+        session: AsyncSession,
+    ) -> bool:
+        if await schedule_store.ensure_fresh(session) and schedule_store.covers(from_reserve):
+            return bool(schedule_store.user_conflicts(
+                user_id, from_reserve, to_reserve, reservation_id
+            ))
+
+        exclude = reservation_id is not None
+        result = await session.execute(
+            self.statement(
+                ("user_has_same_time", exclude),
+                lambda: select(exists().where(*bound_same_time(by_room=False, exclude=exclude))),
+            ),
+            same_time_params(from_reserve, to_reserve, reservation_id, user_id=user_id),
+        )
+        return result.scalar()
+
+    async def get_reservation_context(
+        self,
+        *,
+        from_reserve: datetime,
+        to_reserve: datetime,
+        meetingroom_id: int,
+        user_id: int,
+        reservation_id: Optional[int] = None,
+        session: AsyncSession,
+    ) -> Optional[Row]:
+        """
+        Все, что нужно проверить перед записью брони, одним запросом:
+        комната (MeetingRoom), пользователь брони (User, None - не найден),
+        имя его группы и ее право на комнату с квотами, флаги пересечений
+        по комнате и по пользователю. None - комнаты не существует.
+        """
+        permissions = select(GroupRoomPermission).where(
+            GroupRoomPermission.group_id == User.group_id,
+            GroupRoomPermission.meetingroom_id == MeetingRoom.id,
+        )
+        result = await session.execute(
+            select(
+                MeetingRoom,
+                User,
+                select(Group.name).where(Group.id == User.group_id)
+                    .scalar_subquery().label("group_name"),
+                permissions.with_only_columns(GroupRoomPermission.max_future_reservation)
+                    .limit(1).scalar_subquery().label("max_future_reservation"),
+                permissions.with_only_columns(GroupRoomPermission.max_week_duration)
+                    .limit(1).scalar_subquery().label("max_week_duration"),
+                permissions.with_only_columns(GroupRoomPermission.max_active_reservations)
+                    .limit(1).scalar_subquery().label("max_active_reservations"),
+                permissions.with_only_columns(func.count())
+                    .scalar_subquery().label("permissions_count"),
+                exists().where(
+                    *room_same_time(meetingroom_id, from_reserve, to_reserve, reservation_id)
+                ).label("room_busy"),
+                exists().where(
+                    Reservation.user_id == user_id,
+                    *same_time(from_reserve, to_reserve, reservation_id),
+                ).label("user_busy"),
+            )
+            .outerjoin(User, User.id == user_id)
+            .where(MeetingRoom.id == meetingroom_id)
+            # Пользователь попадет в ответ вместе с новой бронью
+            .options(joinedload(User.group))
+        )
+        return result.first()
+
+    async def get_rooms_permissions(
+        self,
+        *,
+        meetingroom_ids: list[int],
+        group_id: Optional[int],
+        session: AsyncSession,
+    ) -> list[Row]:
+        """
+        Комнаты (MeetingRoom) с именем группы и ее правом на каждую из них,
+        одним запросом. Несуществующих комнат в результате нет.
+        """
+        permissions = select(GroupRoomPermission).where(
+            GroupRoomPermission.group_id == group_id,
+            GroupRoomPermission.meetingroom_id == MeetingRoom.id,
+        )
+        result = await session.execute(
+            select(
+                MeetingRoom,
+                select(Group.name).where(Group.id == group_id)
+                    .scalar_subquery().label("group_name"),
+                permissions.with_only_columns(GroupRoomPermission.max_future_reservation)
+                    .limit(1).scalar_subquery().label("max_future_reservation"),
+                permissions.with_only_columns(GroupRoomPermission.max_week_duration)
+                    .limit(1).scalar_subquery().label("max_week_duration"),
+                permissions.with_only_columns(GroupRoomPermission.max_active_reservations)
+                    .limit(1).scalar_subquery().label("max_active_reservations"),
+                permissions.with_only_columns(func.count())
+                    .scalar_subquery().label("permissions_count"),
+            ).where(MeetingRoom.id.in_(meetingroom_ids))
+        )
+        return result.all()
+
+    async def get_slots_reservations_at_the_same_time(
+        self,
+        *,
+        slots: list[tuple[int, int, datetime, datetime]],
+        session: AsyncSession,
+    ) -> list[tuple[list[Reservation], list[Reservation]]]:
+        """
+        Пересечения для списка слотов (комната, пользователь, начало, конец):
+        для каждого слота - брони этой комнаты и брони этого пользователя.
+        Не больше одного запроса на весь список.
+        """
+        if not slots:
+            return []
+        if await schedule_store.ensure_fresh(session) and all(
+            schedule_store.covers(from_reserve) for _, _, from_reserve, _ in slots
+        ):
+            return [
+                (
+                    schedule_store.room_conflicts(meetingroom_id, from_reserve, to_reserve),
+                    schedule_store.user_conflicts(user_id, from_reserve, to_reserve),
+                )
+                for meetingroom_id, user_id, from_reserve, to_reserve in slots
+            ]
+
+        # Слоты передаются в запрос CTE из VALUES и соединяются с бронями
+        slots_table = values(
+            column("idx", Integer),
+            column("meetingroom_id", Integer),
+            column("user_id", Integer),
+            column("from_reserve", EpochDateTime()),
+            column("to_reserve", EpochDateTime()),
+            name="slots",
+        ).data([
+            (idx, *slot) for idx, slot in enumerate(slots)
+        ]).cte("slots")
+        rows = await session.execute(
+            select(slots_table.c.idx, Reservation)
+            .options(*self.load_options())
+            .select_from(slots_table)
+            .join(Reservation, and_(
+                or_(
+                    Reservation.meetingroom_id == slots_table.c.meetingroom_id,
+                    Reservation.user_id == slots_table.c.user_id,
+                ),
+                Reservation.to_reserve > slots_table.c.from_reserve,
+                unindexed(Reservation.from_reserve) < slots_table.c.to_reserve,
+            ))
+            .order_by(slots_table.c.idx, unindexed(Reservation.from_reserve))
+        )
+        conflicts = [([], []) for _ in slots]
+        for idx, reservation in rows.all():
+            meetingroom_id, user_id, _, _ = slots[idx]
+            room_conflicts, user_conflicts = conflicts[idx]
+            if reservation.meetingroom_id == meetingroom_id:
+                room_conflicts.append(reservation)
+            if reservation.user_id == user_id:
+                user_conflicts.append(reservation)
+        return conflicts
+
+    async def get_rooms_busy_intervals(
+        self,
+        *,
+        meetingroom_ids: list[int],
+        from_reserve: datetime,
+        to_reserve: datetime,
+        session: AsyncSession,
+    ) -> dict[int, list[tuple[datetime, datetime]]]:
+        """
+        Занятые интервалы каждой комнаты в окне [from_reserve, to_reserve),
+        по возрастанию начала. Один запрос на все комнаты.
+        """
+        busy = {meetingroom_id: [] for meetingroom_id in meetingroom_ids}
+        if not busy:
+            return busy
+        if await schedule_store.ensure_fresh(session) and schedule_store.covers(from_reserve):
+            for meetingroom_id in busy:
+                busy[meetingroom_id] = [
+                    (reservation.from_reserve, reservation.to_reserve)
+                    for reservation in schedule_store.room_conflicts(
+                        meetingroom_id, from_reserve, to_reserve
+                    )
+                ]
+            return busy
+
+        rows = await session.execute(
+            select(Reservation.meetingroom_id, Reservation.from_reserve, Reservation.to_reserve)
+            .where(
+                Reservation.meetingroom_id.in_(list(busy)),
+                *same_time(from_reserve, to_reserve),
+            )
+            .order_by(Reservation.meetingroom_id, unindexed(Reservation.from_reserve))
+        )
+        for meetingroom_id, reservation_from, reservation_to in rows:
+            busy[meetingroom_id].append((reservation_from, reservation_to))
+        return busy
+
+    async def get_reservations_at_the_same_time(
+        self,
+        *,
+        from_reserve: datetime,
+        to_reserve: datetime,
+        meetingroom_id: Optional[int] = None,
+        session: AsyncSession,
+    ) -> list[Reservation]:
+        """Брони, пересекающиеся с [from_reserve, to_reserve), во всех комнатах или в одной."""
+        if meetingroom_id is not None:
+            conditions = room_same_time(meetingroom_id, from_reserve, to_reserve)
+        else:
+            conditions = same_time(from_reserve, to_reserve)
+        # Порядок - сортировкой найденного, как в get_reservations_for_room
+        reservations = await session.execute(
+            select(Reservation).options(*self.load_options()).where(*conditions)
+            .order_by(unindexed(Reservation.from_reserve))
+        )
+        return reservations.scalars().all()
+
+    async def with_archive(
+        self,
+        reservations: list[Reservation],
+        *,
+        meetingroom_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        from_reserve: Optional[datetime] = None,
+        to_reserve: Optional[datetime] = None,
+        newest_first: bool = False,
+        limit: Optional[int] = None,
+        session: AsyncSession,
+    ) -> list:
+        """
+        Дополняет брони из reservation архивными. В архиве только
+        закончившиеся брони, поэтому он запрашивается, лишь если окно
+        начинается в прошлом.
+        """
+        if from_reserve is not None and from_reserve >= datetime.now():
+            return reservations
+        archived = await reservation_archive_crud.get_window(
+            meetingroom_id=meetingroom_id,
+            user_id=user_id,
+            from_reserve=from_reserve,
+            to_reserve=to_reserve,
+            newest_first=newest_first,
+            limit=limit,
+            session=session,
+        )
+        if not archived:
+            return reservations
+        reservations = sorted(
+            [*reservations, *archived],
+            key=lambda reservation: (reservation.from_reserve, reservation.id),
+            reverse=newest_first,
+        )
+        return reservations[:limit]
+
     async def get_reservations_for_room(
-        self, room_id: int, include_past: bool, session: AsyncSession
+        self,
+        room_id: int,
+        include_past: bool,
+        session: AsyncSession,
+        from_reserve: Optional[datetime] = None,
+        to_reserve: Optional[datetime] = None,
+        limit: Optional[int] = None,
     ):
-        if include_past:
+        """
+        С окном [from_reserve, to_reserve) - все брони комнаты, которые с
+        ним пересекаются, и прошедшие, и будущие; include_past не
+        учитывается. Без окна - будущие или (include_past) прошедшие брони.
+        """
+        if from_reserve is not None:
+            if await schedule_store.ensure_fresh(session) and schedule_store.covers(from_reserve):
+                return schedule_store.room_conflicts(room_id, from_reserve, to_reserve)[:limit]
+            # Порядок - сортировкой найденного: ради готового порядка SQLite
+            # выбрал бы индекс (meetingroom_id, from_reserve, id) и прошел бы
+            # всю историю комнаты
+            reservations = await session.execute(
+                select(Reservation).options(*self.load_options()).where(
+                    *room_same_time(room_id, from_reserve, to_reserve),
+                ).order_by(unindexed(Reservation.from_reserve)).limit(limit)
+            )
+            return await self.with_archive(
+                reservations.scalars().all(),
+                meetingroom_id=room_id,
+                from_reserve=from_reserve,
+                to_reserve=to_reserve,
+                limit=limit,
+                session=session,
+            )
+        elif include_past:
             reservations = await session.execute(
                 # Получим все объекты Reservation
-                select(Reservation).where(
+                select(Reservation).options(*self.load_options()).where(
                     # где id равен запрашиваему room_id
                     Reservation.meetingroom_id == room_id,
-
-                    Reservation.to_reserve < datetime.now()
-                ).order_by(Reservation.from_reserve.desc())
+                    # Бронь в прошлом, если уже закончилась
+                    Reservation.to_reserve <= datetime.now()
+                ).order_by(Reservation.from_reserve.desc()).limit(limit)
+            )
+            return await self.with_archive(
+                reservations.scalars().all(),
+                meetingroom_id=room_id,
+                newest_first=True,
+                limit=limit,
+                session=session,
+            )
+        elif await schedule_store.ensure_fresh(session):
+            return schedule_store.room_upcoming(room_id, datetime.now())[:limit]
+        elif settings.reservation_rtree_enabled:
+            now = datetime.now()
+            reservations = await session.execute(
+                select(Reservation).options(*self.load_options()).where(
+                    *rtree_box(now, meetingroom_id=room_id),
+                    Reservation.to_reserve > now
+                ).order_by(unindexed(Reservation.from_reserve)).limit(limit)
             )
         else:
             reservations = await session.execute(
                 # Получим все объекты Reservation
-                select(Reservation).where(
+                select(Reservation).options(*self.load_options()).where(
                     # где id равен запрашиваему room_id
                     Reservation.meetingroom_id == room_id,
                     #  И время окончания бронирования больше текущего времени
-                    Reservation.to_reserve >= datetime.now()
-                ).order_by(Reservation.from_reserve)
+                    Reservation.to_reserve > datetime.now()
+                ).order_by(unindexed(Reservation.from_reserve)).limit(limit)
             )
-        reservations = reservations.unique().scalars().all()
+        reservations = reservations.scalars().all()
         return reservations
 
     async def get_reservations_for_user(
-        self, user_id: int, include_past: bool, session: AsyncSession,
+        self,
+        user_id: int,
+        include_past: bool,
+        session: AsyncSession,
+        from_reserve: Optional[datetime] = None,
+        to_reserve: Optional[datetime] = None,
+        limit: Optional[int] = None,
     ):
-        if include_past:
+        """Окно и limit - как в get_reservations_for_room."""
+        if from_reserve is not None:
+            if await schedule_store.ensure_fresh(session) and schedule_store.covers(from_reserve):
+                return schedule_store.user_conflicts(user_id, from_reserve, to_reserve)[:limit]
             reservations = await session.execute(
-                select(Reservation).where(
-                Reservation.user_id == user_id,
-                    #  И время окончания бронирования больше текущего времени
-                    Reservation.to_reserve < datetime.now()
-                ).order_by(Reservation.from_reserve.desc())
+                select(Reservation).options(*self.load_options()).where(
+                    Reservation.user_id == user_id,
+                    *same_time(from_reserve, to_reserve),
+                ).order_by(unindexed(Reservation.from_reserve)).limit(limit)
+            )
+            return await self.with_archive(
+                reservations.scalars().all(),
+                user_id=user_id,
+                from_reserve=from_reserve,
+                to_reserve=to_reserve,
+                limit=limit,
+                session=session,
+            )
+        elif include_past:
+            reservations = await session.execute(
+                select(Reservation).options(*self.load_options()).where(
+                    Reservation.user_id == user_id,
+                    # Бронь в прошлом, если уже закончилась
+                    Reservation.to_reserve <= datetime.now()
+                ).order_by(Reservation.from_reserve.desc()).limit(limit)
+            )
+            return await self.with_archive(
+                reservations.scalars().all(),
+                user_id=user_id,
+                newest_first=True,
+                limit=limit,
+                session=session,
             )
         else:
             reservations = await session.execute(
-                select(Reservation).where(
+                select(Reservation).options(*self.load_options()).where(
                     Reservation.user_id == user_id,
                     #  И время окончания бронирования больше текущего времени
-                    Reservation.to_reserve >= datetime.now()
-                ).order_by(Reservation.from_reserve)
+                    Reservation.to_reserve > datetime.now()
+                ).order_by(unindexed(Reservation.from_reserve)).limit(limit)
             )
-        reservations = reservations.unique().scalars().all()
+        reservations = reservations.scalars().all()
         return reservations
 
     async def get_reservations_interval_for_user_today(
@@ -206,29 +822,65 @@ class CRUDReservation(CRUDBase):
         )
         return result.first()
 
+    async def get_page(
+        self,
+        *,
+        limit: int,
+        after: Optional[tuple[datetime, int]] = None,
+        meetingroom_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        from_reserve: Optional[datetime] = None,
+        to_reserve: Optional[datetime] = None,
+        session: AsyncSession,
+    ) -> list[Reservation]:
+        """
+        Страница броней по возрастанию (from_reserve, id), начиная после
+        ключа after. Окно [from_reserve, to_reserve) отбирает брони,
+        которые с ним пересекаются.
+        """
+        select_stmt = select(Reservation).options(*self.load_options())
+        if after is not None:
+            # Сравнение пар идет диапазоном по индексам (..., from_reserve, id)
+            select_stmt = select_stmt.where(
+                tuple_(Reservation.from_reserve, Reservation.id) > after
+            )
+        if meetingroom_id is not None:
+            select_stmt = select_stmt.where(Reservation.meetingroom_id == meetingroom_id)
+        if user_id is not None:
+            select_stmt = select_stmt.where(Reservation.user_id == user_id)
+        if from_reserve is not None:
+            select_stmt = select_stmt.where(Reservation.to_reserve > from_reserve)
+        if to_reserve is not None:
+            select_stmt = select_stmt.where(Reservation.from_reserve < to_reserve)
+        reservations = await session.execute(
+            select_stmt.order_by(Reservation.from_reserve, Reservation.id).limit(limit)
+        )
+        return reservations.scalars().all()
+
     async def get_reservations_current(
         self, session: AsyncSession,
     ):
+        now = datetime.now()
         reservations = await session.execute(
-            select(Reservation).where(
-                #  И время окончания бронирования больше текущего времени
-                Reservation.to_reserve >= datetime.now(),
-                Reservation.from_reserve <= datetime.now()
-            ).order_by(Reservation.from_reserve.desc())
+            self.statement(
+                ("current", settings.reservation_rtree_enabled),
+                self._current_statement,
+            ),
+            {"now": now, "now_epoch": epoch(now)},
         )
-        reservations = reservations.unique().scalars().all()
+        reservations = reservations.scalars().all()
         return reservations
 
-    async def remove_older(
-            self,
-            session: AsyncSession,
-            days: int,
-    ):
-         await session.execute(
-            delete(Reservation).where(
-                    Reservation.to_reserve <= datetime.now() - timedelta(days=days),
-            )
-         )
-         await session.commit()
+    def _current_statement(self):
+        now = bindparam("now")
+        select_stmt = select(Reservation).options(*self.load_options()).where(
+            # Бронь идет сейчас: from_reserve <= now < to_reserve. Поиск - по
+            # to_reserve или R*Tree, как в same_time
+            Reservation.to_reserve > now,
+            unindexed(Reservation.from_reserve) <= now
+        ).order_by(unindexed(Reservation.from_reserve).desc())
+        if settings.reservation_rtree_enabled:
+            select_stmt = select_stmt.where(*rtree_box(now, now))
+        return select_stmt
 
 reservation_crud = CRUDReservation(Reservation)
@@ -0,0 +1,100 @@
+# app/crud/reservation_archive.py
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.schedule import schedule_store
+from app.crud.base import CRUDBase
+from app.models import Reservation, ReservationArchive, User
+
+# Колонки, которые переносятся из reservation в reservation_archive как есть
+ARCHIVE_COLUMNS = [
+    "id", "from_reserve", "to_reserve", "meetingroom_id", "user_id",
+    "confirmed_activity", "version",
+]
+
+
+class CRUDReservationArchive(CRUDBase):
+    # Архивные брони отдаются вперемешку с обычными (with_archive)
+    loads = (
+        (ReservationArchive.meetingroom,),
+        (ReservationArchive.user, User.group),
+    )
+
+    async def archive_finished(
+        self,
+        *,
+        before: datetime,
+        chunk_size: int,
+        session: AsyncSession,
+    ) -> int:
+        """
+        Переносит брони, закончившиеся не позже before, пачками по
+        chunk_size: INSERT ... SELECT в архив и DELETE из reservation.
+        Каждая пачка - отдельная запись через очередь записи, как и брони:
+        фоновая задача сама не берет блокировку на запись и не конкурирует
+        за нее с писателем приложения. Возвращает количество перенесенных
+        броней.
+        """
+        async def move_chunk(writer: AsyncSession) -> int:
+            ids = await writer.scalars(
+                select(Reservation.id)
+                .where(Reservation.to_reserve <= before)
+                .order_by(Reservation.id)
+                .limit(chunk_size)
+            )
+            ids = ids.all()
+            if not ids:
+                return 0
+            await writer.execute(
+                insert(ReservationArchive).from_select(
+                    ARCHIVE_COLUMNS,
+                    select(*[getattr(Reservation, name) for name in ARCHIVE_COLUMNS])
+                    .where(Reservation.id.in_(ids)),
+                )
+            )
+            await writer.execute(
+                delete(Reservation)
+                .where(Reservation.id.in_(ids))
+                .execution_options(synchronize_session=False)
+            )
+            for reservation_id in ids:
+                schedule_store.discard(reservation_id, writer)
+            return len(ids)
+
+        moved = 0
+        while chunk := await self._commit(session, move_chunk):
+            moved += chunk
+        logging.info(f"Archived {moved} reservations finished before {before}")
+        return moved
+
+    async def get_window(
+        self,
+        *,
+        meetingroom_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        from_reserve: Optional[datetime] = None,
+        to_reserve: Optional[datetime] = None,
+        newest_first: bool = False,
+        limit: Optional[int] = None,
+        session: AsyncSession,
+    ) -> list[ReservationArchive]:
+        """Архивные брони комнаты или пользователя, пересекающиеся с окном."""
+        select_stmt = select(ReservationArchive).options(*self.load_options())
+        if meetingroom_id is not None:
+            select_stmt = select_stmt.where(ReservationArchive.meetingroom_id == meetingroom_id)
+        if user_id is not None:
+            select_stmt = select_stmt.where(ReservationArchive.user_id == user_id)
+        if from_reserve is not None:
+            select_stmt = select_stmt.where(ReservationArchive.to_reserve > from_reserve)
+        if to_reserve is not None:
+            select_stmt = select_stmt.where(ReservationArchive.from_reserve < to_reserve)
+        order = ReservationArchive.from_reserve.desc() if newest_first else ReservationArchive.from_reserve
+        reservations = await session.execute(select_stmt.order_by(order).limit(limit))
+        return reservations.scalars().all()
+
+
+reservation_archive_crud = CRUDReservationArchive(ReservationArchive)
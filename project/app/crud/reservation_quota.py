@@ -0,0 +1,174 @@
+# app/crud/reservation_quota.py
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import CRUDBase
+from app.models import Reservation, ReservationQuotaCounter
+
+# (пользователь, комната, начало, конец) брони, по которым ведутся счетчики
+QuotaKey = tuple[int, int, datetime, datetime]
+
+
+def quota_key(reservation) -> QuotaKey:
+    """Снимок полей брони до изменения: сам объект после UPDATE уже новый."""
+    return (
+        reservation.user_id,
+        reservation.meetingroom_id,
+        reservation.from_reserve,
+        reservation.to_reserve,
+    )
+
+
+def week_start(day: date) -> date:
+    """Понедельник календарной недели."""
+    return day - timedelta(days=day.weekday())
+
+
+def upsert(session: AsyncSession):
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(ReservationQuotaCounter)
+
+
+class CRUDReservationQuota(CRUDBase):
+    async def track(
+        self,
+        session: AsyncSession,
+        added: Iterable[QuotaKey] = (),
+        removed: Iterable[QuotaKey] = (),
+    ) -> None:
+        """
+        Прибавляет к счетчикам added и вычитает removed одним
+        INSERT ... ON CONFLICT DO UPDATE. Вызывается CRUD-ом броней до
+        коммита, в транзакции самой брони.
+        """
+        deltas = defaultdict(lambda: [0, 0])
+        for sign, keys in ((1, added), (-1, removed)):
+            for user_id, meetingroom_id, from_reserve, to_reserve in keys:
+                delta = deltas[(user_id, meetingroom_id, from_reserve.date())]
+                delta[0] += sign
+                delta[1] += sign * int((to_reserve - from_reserve).total_seconds())
+        rows = [
+            dict(user_id=user_id, meetingroom_id=meetingroom_id, day=day, reservations=count, seconds=seconds)
+            for (user_id, meetingroom_id, day), (count, seconds) in deltas.items()
+            # Изменение, не сдвинувшее бронь, счетчики не трогает
+            if count or seconds
+        ]
+        if not rows:
+            return
+        # Строки передаются параметрами, а не через values(): текст запроса
+        # не зависит от их числа и берется из кэша компиляции SQLAlchemy
+        stmt = upsert(session)
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=["user_id", "meetingroom_id", "day"],
+            set_=dict(
+                reservations=ReservationQuotaCounter.reservations + stmt.excluded.reservations,
+                seconds=ReservationQuotaCounter.seconds + stmt.excluded.seconds,
+            ),
+        ), rows)
+
+    async def get_usage(
+        self,
+        *,
+        user_id: int,
+        meetingroom_ids: list[int],
+        from_day: date,
+        session: AsyncSession,
+    ) -> dict[int, dict[date, tuple[int, int]]]:
+        """
+        Счетчики пользователя по комнатам начиная с from_day: комната ->
+        день -> (брони, секунды). Один диапазонный запрос по уникальному
+        индексу (user_id, meetingroom_id, day).
+        """
+        rows = await session.execute(
+            select(
+                ReservationQuotaCounter.meetingroom_id,
+                ReservationQuotaCounter.day,
+                ReservationQuotaCounter.reservations,
+                ReservationQuotaCounter.seconds,
+            ).where(
+                ReservationQuotaCounter.user_id == user_id,
+                ReservationQuotaCounter.meetingroom_id.in_(meetingroom_ids),
+                ReservationQuotaCounter.day >= from_day,
+            )
+        )
+        usage = {meetingroom_id: {} for meetingroom_id in meetingroom_ids}
+        for meetingroom_id, day, reservations, seconds in rows:
+            usage[meetingroom_id][day] = (reservations, seconds)
+        return usage
+
+    async def count_active(
+        self,
+        *,
+        user_id: int,
+        meetingroom_ids: list[int],
+        session: AsyncSession,
+    ) -> dict[int, int]:
+        """
+        Сколько у пользователя еще не закончившихся броней (to_reserve > now)
+        в каждой комнате. Дневные счетчики этого не знают: бронь,
+        закончившаяся сегодня, уже не активна. Диапазон по индексу
+        (user_id, to_reserve, from_reserve) - только будущие и текущие брони.
+        """
+        rows = await session.execute(
+            select(Reservation.meetingroom_id, func.count())
+            .where(
+                Reservation.user_id == user_id,
+                Reservation.to_reserve > datetime.now(),
+                Reservation.meetingroom_id.in_(meetingroom_ids),
+            )
+            .group_by(Reservation.meetingroom_id)
+        )
+        active = {meetingroom_id: 0 for meetingroom_id in meetingroom_ids}
+        active.update(rows.tuples().all())
+        return active
+
+    async def rebuild(self, session: AsyncSession, from_day: Optional[date] = None) -> int:
+        """
+        Пересчитывает счетчики по reservation с начала прошлой недели: более
+        ранние дни проверки квот не читают, их счетчики удаляются. Исправляет
+        расхождения после записей в обход приложения. Возвращает число строк.
+        """
+        if from_day is None:
+            from_day = week_start(date.today()) - timedelta(days=7)
+
+        async def write(writer: AsyncSession) -> int:
+            if writer.get_bind().dialect.name == "postgresql":
+                # Параллельные брони дождутся пересчета и прибавят свое после него
+                await writer.execute(text(
+                    f"LOCK TABLE {ReservationQuotaCounter.__tablename__} IN SHARE ROW EXCLUSIVE MODE"
+                ))
+            reservations = await writer.execute(
+                select(
+                    Reservation.user_id,
+                    Reservation.meetingroom_id,
+                    Reservation.from_reserve,
+                    Reservation.to_reserve,
+                ).where(Reservation.from_reserve >= datetime.combine(from_day, datetime.min.time()))
+            )
+            await writer.execute(delete(ReservationQuotaCounter))
+            counters = defaultdict(lambda: [0, 0])
+            for user_id, meetingroom_id, from_reserve, to_reserve in reservations:
+                counter = counters[(user_id, meetingroom_id, from_reserve.date())]
+                counter[0] += 1
+                counter[1] += int((to_reserve - from_reserve).total_seconds())
+            if counters:
+                await writer.execute(upsert(writer), [
+                    dict(user_id=user_id, meetingroom_id=meetingroom_id, day=day, reservations=count, seconds=seconds)
+                    for (user_id, meetingroom_id, day), (count, seconds) in counters.items()
+                ])
+            return len(counters)
+
+        # Через очередь записи: пересчет из фоновой задачи не пересекается
+        # с записью броней приложения
+        rows = await self._commit(session, write)
+        logging.info(f"Reservation quota counters rebuilt: {rows} rows")
+        return rows
+
+
+reservation_quota_crud = CRUDReservationQuota(ReservationQuotaCounter)
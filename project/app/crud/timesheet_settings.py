@@ -5,6 +5,6 @@ from app.models.timesheet_settings import TimesheetSetting
 
 
 class CRUDTimesheetSettings(CRUDBase):
-    pass
+    cache_size = 32
 
 timesheet_setting_crud = CRUDTimesheetSettings(TimesheetSetting)
@@ -1,7 +1,7 @@
 # app/crud/reservation.py
 from typing import Optional, Sequence
 
-from sqlalchemy import select, func
+from sqlalchemy import bindparam, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
@@ -9,6 +9,11 @@ from app.models import User
 
 
 class CRUDUser(CRUDBase):
+    # Группа пользователя входит в UserRead
+    loads = ((User.group,),)
+    # Текущего пользователя читает каждый запрос с авторизацией
+    cache_size = 1024
+
     # Преобразуем функцию в методы класса
     async def get_user_by_email(
             # указываем параметр self, либо декоратор @staticmethod
@@ -17,15 +22,19 @@ class CRUDUser(CRUDBase):
             session: AsyncSession,
     ) -> Optional[User]:
         normalized_email = email.strip().lower()
-        # Получаем объект класса Result
-        db_user_id = await session.execute(
-            select(User).where(
-                func.lower(func.trim(User.email)) == normalized_email
+
+        async def load():
+            # Получаем объект класса Result
+            db_user_id = await session.execute(
+                self.statement("by_email", lambda: select(User).options(*self.load_options()).where(
+                    func.lower(func.trim(User.email)) == bindparam("email")
+                )),
+                {"email": normalized_email},
             )
-        )
-        # Извлекаем из него конкретное значение
-        db_user_id = db_user_id.scalars().first()
-        return db_user_id
+            # Извлекаем из него конкретное значение
+            return db_user_id.scalars().first()
+
+        return await self.cached(("email", normalized_email), session, load)
 
     async def get_user_by_fio(
             self,
@@ -36,10 +45,10 @@ class CRUDUser(CRUDBase):
         #normalized_fio = fio.strip().lower()
         # Сравниваем с нормализованными данными в БД
         db_user = await session.execute(
-            select(User).where(
+            select(User).options(*self.load_options()).where(
                 User.fio == fio
             )
         )
-        db_user = db_user.unique().scalars().all()
+        db_user = db_user.scalars().all()
         return db_user
 user_crud = CRUDUser(User)
@@ -0,0 +1,36 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from fastapi_utilities import repeat_at
+
+from app.core.config import settings
+from app.core.db import JobSessionLocal
+from app.crud.reservation_archive import reservation_archive_crud
+from app.crud.reservation_quota import reservation_quota_crud
+
+
+async def archive_finished_reservations(days: int) -> int:
+    async with JobSessionLocal() as session:
+        moved = await reservation_archive_crud.archive_finished(
+            before=datetime.now() - timedelta(days=days),
+            chunk_size=settings.reservation_archive_chunk_size,
+            session=session,
+        )
+        # Заодно пересчитываем счетчики квот и удаляем счетчики прошедших недель
+        await reservation_quota_crud.rebuild(session)
+        return moved
+
+
+@repeat_at(cron="30 3 * * *")
+def run_archive():
+    if not settings.cron_archive_enabled:
+        logging.info("Cron to archive finished reservations is DISABLED")
+        return
+
+    try:
+        logging.info("Starting cron to archive finished reservations")
+        asyncio.run(archive_finished_reservations(settings.reservation_archive_after_days))
+        logging.info("Finished cron to archive finished reservations")
+    except Exception as e:
+        logging.error(f"error in cron {e}")
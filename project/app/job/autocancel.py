@@ -6,7 +6,7 @@ from typing import Sequence
 from fastapi_utilities import repeat_at
 
 from app.core.config import settings
-from app.core.db import AsyncSessionLocal
+from app.core.db import JobSessionLocal
 from app.crud.activity import activity_crud
 from app.crud.audit import audit_crud
 from app.crud.reservation import reservation_crud
@@ -21,10 +21,15 @@ def run_autocancel():
         logging.info("Cron to cancel unused reservations is DISABLED")
         return
 
-    session = AsyncSessionLocal()
+    # Вся задача - один цикл событий: соединение сессии к нему привязано
+    asyncio.run(autocancel())
+
+
+async def autocancel():
+    session = JobSessionLocal()
     try:
         logging.info("Starting cron to cancel unused reservations")
-        current_reservations: Sequence[Reservation] = asyncio.run(reservation_crud.get_reservations_current(session=session))
+        current_reservations: Sequence[Reservation] = await reservation_crud.get_reservations_current(session=session)
         for current_reservation in current_reservations:
             try:
                 if current_reservation.confirmed_activity:
@@ -37,22 +42,22 @@ def run_autocancel():
                     logging.info(f"Skipping processing reservation {current_reservation} as time from start is not enough to trigger autocancel")
                     continue
 
-                is_active = asyncio.run(activity_crud.confirm_activty(user_id=current_reservation.user_id,
-                                                                      meetingroom_id=current_reservation.meetingroom_id,
-                                                                      lookback_interval=timedelta(days=1),
-                                                                      session=session))
+                is_active = await activity_crud.confirm_activty(user_id=current_reservation.user_id,
+                                                                meetingroom_id=current_reservation.meetingroom_id,
+                                                                lookback_interval=timedelta(days=1),
+                                                                session=session)
                 if not is_active:
                     logging.info(f"Reservation {current_reservation} has no activity detected, cancelling...")
-                    reservation = asyncio.run(reservation_crud.remove(db_obj=current_reservation, session=session))
+                    reservation = await reservation_crud.remove(db_obj=current_reservation, session=session)
                     event = AuditCreate(
                         description="Отмена резервирования по основаниям autocancel: {0}".format(
                             reservation
                         ),
                         user_id=None,
                     )
-                    asyncio.run(audit_crud.create(event, session))
+                    await audit_crud.create(event, session)
                 else:
-                    reservation = reservation_crud.update(db_obj=current_reservation, obj_in=ReservationRoomDBUpdateInternal(
+                    reservation = await reservation_crud.update(db_obj=current_reservation, obj_in=ReservationRoomDBUpdateInternal(
                         confirmed_activity = True
                     ), session=session)
                     event = AuditCreate(
@@ -61,7 +66,7 @@ def run_autocancel():
                         ),
                         user_id=None,
                     )
-                    asyncio.run(audit_crud.create(event, session))
+                    await audit_crud.create(event, session)
                     logging.info(f"Reservation {current_reservation} has activity detected, skipping...")
             except Exception as e:
                 logging.error(f"error in reservation {current_reservation} canceling {e}")
@@ -69,4 +74,4 @@ def run_autocancel():
     except Exception as e:
         logging.error(f"error in cron {e}")
     finally:
-        asyncio.run(session.close())
+        await session.close()
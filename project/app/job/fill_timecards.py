@@ -6,7 +6,7 @@ from fastapi_utilities import repeat_at
 from sqlalchemy import Sequence
 
 from app.core.config import settings
-from app.core.db import AsyncSessionLocal
+from app.core.db import JobSessionLocal
 from app.crud.reservation import reservation_crud
 from app.crud.timesheet_settings import timesheet_setting_crud
 from app.crud.user import user_crud
@@ -22,11 +22,16 @@ def run_fill_timecards():
         logging.info("Cron to fill timecards is DISABLED")
         return
 
+    # Вся задача - один цикл событий: соединение сессии к нему привязано
+    asyncio.run(fill_timecards())
+
+
+async def fill_timecards():
     editor = configured_get_google_sheets_editor()
-    session = AsyncSessionLocal()
+    session = JobSessionLocal()
     try:
         logging.info("Starting cron to fill timecards")
-        configured_timesheets: list[TimesheetSetting] = asyncio.run(timesheet_setting_crud.get_multi(session))
+        configured_timesheets: list[TimesheetSetting] = await timesheet_setting_crud.get_multi(session)
 
         today_start = datetime.now().date()
         today_end = today_start + timedelta(days=1)
@@ -48,16 +53,16 @@ def run_fill_timecards():
                 for user_header, user_col in users.items():
                     user = None
                     if user_header.login is None:
-                        db_users: Sequence[User] = asyncio.run(user_crud.get_user_by_fio(
-                                user_header.fio,
-                                session))
+                        db_users: Sequence[User] = await user_crud.get_user_by_fio(
+                            user_header.fio,
+                            session)
                         logging.info(f"Found {len(db_users)} candidate users for {user_header}")
                         for candidate_user in db_users:
                             if candidate_user.email not in seen_logins:
                                 user = candidate_user
                                 break
                     else:
-                        user = asyncio.run(user_crud.get_user_by_email(user_header.login, session))
+                        user = await user_crud.get_user_by_email(user_header.login, session)
 
                     if user is None:
                         logging.warn(
@@ -73,11 +78,11 @@ def run_fill_timecards():
                     logging.info(f"Processing user {user.fio}")
                     try:
                         interval: tuple[
-                            datetime | None, datetime | None] = asyncio.run(reservation_crud.get_reservations_interval_for_user_today(
+                            datetime | None, datetime | None] = await reservation_crud.get_reservations_interval_for_user_today(
                             user_id=user.id,
                             from_time=today_start,
                             to_time=today_end,
-                            session=session))
+                            session=session)
                         if interval[0] is None:
                             filler.fill_schedule(user_col,
                                                  date_row,
@@ -97,4 +102,4 @@ def run_fill_timecards():
     except Exception as e:
         logging.error(f"error in cron {e}")
     finally:
-        asyncio.run(session.close())
+        await session.close()
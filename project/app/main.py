@@ -7,8 +7,14 @@ from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.api.routers import main_router
+from app.job.archive import run_archive
 from app.job.autocancel import run_autocancel
+from app.core.changes import change_feed
 from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.core.schedule import schedule_store
+from app.core.writer import write_queue
+from app.crud.reservation_quota import reservation_quota_crud
 from app.job.fill_timecards import run_fill_timecards
 
 
@@ -16,10 +22,20 @@ from app.job.fill_timecards import run_fill_timecards
 async def lifespan(_: FastAPI):
     # --- startup ---
     print("Starting lifespan")
+    async with AsyncSessionLocal() as session:
+        # Счетчики квот пересчитываются из броней: вдруг их меняли в обход приложения
+        await reservation_quota_crud.rebuild(session)
+        if schedule_store.enabled:
+            await schedule_store.load(session)
+    await write_queue.start()
+    await change_feed.start()
     run_fill_timecards()
     run_autocancel()
+    run_archive()
     yield
     # --- shutdown ---
+    await change_feed.stop()
+    await write_queue.stop()
 
 app = FastAPI(
     title=settings.app_title,
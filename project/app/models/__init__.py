@@ -2,8 +2,12 @@
 from .user import User
 from .meeting_room import MeetingRoom
 from .reservation import Reservation
+from .reservation_archive import ReservationArchive
+from .reservation_quota import ReservationQuotaCounter
 from .audit import AuditEvent
 from .group import Group
 from .group_room_permissions import GroupRoomPermission
 from .activity import Activity
 from .timesheet_settings import TimesheetSetting
+from .reservation_rtree import reservation_rtree
+from .change_log import ChangeLog
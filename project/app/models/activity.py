@@ -2,10 +2,11 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey, Integer, Text, func
+from sqlalchemy import ForeignKey, Index, Integer
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.core.db import Base
+from app.core.types import EpochDateTime, epoch_now
 from app.models import User, MeetingRoom
 
 
@@ -13,15 +14,20 @@ class Activity(Base):
     __tablename__ = "activity_log"  # Ensure table name is defined
 
     #id: Mapped[int] = mapped_column(primary_key=True)
-    received_at_time: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
-    computer_time: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    received_at_time: Mapped[datetime] = mapped_column(EpochDateTime, server_default=epoch_now())
+    computer_time: Mapped[datetime] = mapped_column(EpochDateTime, nullable=False)
 
     meetingroom_id: Mapped[int] = mapped_column(Integer, ForeignKey("meetingroom.id"))
     user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("user.id"))
 
     # Corrected relationships with Mapped[]
-    meetingroom: Mapped["MeetingRoom"] = relationship("MeetingRoom", viewonly=True, lazy="joined")
-    user: Mapped[Optional["User"]] = relationship("User", viewonly=True, lazy="joined")
+    meetingroom: Mapped["MeetingRoom"] = relationship("MeetingRoom", viewonly=True, lazy="raise_on_sql")
+    user: Mapped[Optional["User"]] = relationship("User", viewonly=True, lazy="raise_on_sql")
+
+    __table_args__ = (
+        Index("ix_activity_log_room_user_time", "meetingroom_id", "user_id", "computer_time"),
+    )
+
     def __repr__(self) -> str:
         user_info = self.user.fio if self.user else "Unknown"
         return f"{self.time} (user: '{user_info}') {self.description}"
\ No newline at end of file
@@ -2,10 +2,11 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey, Integer, Text, func
+from sqlalchemy import ForeignKey, Integer, Text
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.core.db import Base
+from app.core.types import EpochDateTime, epoch_now
 from app.models import User
 
 
@@ -14,12 +15,12 @@ class AuditEvent(Base):
 
     # Convert all columns to SQLAlchemy 2.x style
     #id: Mapped[int] = mapped_column(primary_key=True)
-    time: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
-    description: Mapped[str] = mapped_column(Text(1000))
+    time: Mapped[datetime] = mapped_column(EpochDateTime, server_default=epoch_now(), index=True)
+    description: Mapped[str] = mapped_column(Text)
     user_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("user.id"), nullable=True)
 
     # Corrected relationship using Mapped[]
-    user: Mapped[Optional["User"]] = relationship("User", viewonly=True, lazy="joined")
+    user: Mapped[Optional["User"]] = relationship("User", viewonly=True, lazy="raise_on_sql")
 
     def __repr__(self) -> str:
         # Added safety check for missing user
@@ -0,0 +1,17 @@
+# app/models/change_log.py
+from sqlalchemy import BigInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+
+class ChangeLog(Base):
+    """
+    Версия таблицы, которую кэшируют процессы приложения: растет на единицу
+    в каждой транзакции, которая таблицу меняла (app.core.changes). По ней процессы узнают о чужих
+    изменениях и сбрасывают свои кэши.
+    """
+    __tablename__ = "change_log"
+
+    table_name: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
@@ -8,14 +8,14 @@ from sqlalchemy.orm import relationship
 class Group(Base):
     # nullable = Значит, что не должно быть пустым
     name = Column(String(100), unique=True, nullable=False)
-    adGroupDN = Column(Text(500), unique=True, nullable=False)
+    adGroupDN = Column(Text, unique=True, nullable=False)
 
     #permissions = relationship("GroupRoomPermission", cascade="delete", lazy="joined")
     permissions = relationship(
         "GroupRoomPermission",
         back_populates="group",
         cascade="all, delete-orphan",  # Добавьте эту строку
-        lazy = "joined",
+        lazy = "raise_on_sql",
         passive_deletes=True
     )
     def __repr__(self) -> str:
@@ -1,6 +1,6 @@
 # app/models/group_room_permissions.py
 from datetime import timedelta
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from sqlalchemy import ForeignKey, Integer, Interval, UniqueConstraint
 from sqlalchemy.orm import relationship, Mapped, mapped_column
@@ -17,13 +17,18 @@ class GroupRoomPermission(Base):
     # Convert all columns to SQLAlchemy 2.x style
     #id: Mapped[int] = mapped_column(primary_key=True)
     max_future_reservation: Mapped[timedelta] = mapped_column(Interval)
+    # Квоты на пользователя в комнате, None - без ограничения:
+    # суммарная длительность броней за календарную неделю
+    max_week_duration: Mapped[Optional[timedelta]] = mapped_column(Interval, nullable=True)
+    # и количество броней, которые еще не прошли
+    max_active_reservations: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     meetingroom_id: Mapped[int] = mapped_column(Integer, ForeignKey("meetingroom.id"))
     group_id: Mapped[int] = mapped_column(Integer, ForeignKey("group.id", ondelete="CASCADE"))
 
     # Corrected relationships using Mapped[]
-    meetingroom: Mapped["MeetingRoom"] = relationship("MeetingRoom", viewonly=True, lazy="joined")
-    group: Mapped["Group"] = relationship("Group", back_populates="permissions")
+    meetingroom: Mapped["MeetingRoom"] = relationship("MeetingRoom", viewonly=True, lazy="raise_on_sql")
+    group: Mapped["Group"] = relationship("Group", back_populates="permissions", lazy="raise_on_sql")
 
     __table_args__ = (UniqueConstraint('group_id', 'meetingroom_id', name='_group_to_room_uc'),)
 
@@ -1,9 +1,10 @@
 # app/models/reservation.py
 
-from sqlalchemy import DateTime, ForeignKey, Integer, Boolean
+from sqlalchemy import DateTime, ForeignKey, Integer, Boolean, Index
 from sqlalchemy.orm import relationship, mapped_column, Mapped
 
 from app.core.db import Base
+from app.core.types import EpochDateTime
 from app.models import MeetingRoom, User
 
 
@@ -12,16 +13,32 @@ class Reservation(Base):
 
     # Corrected column definitions using Annotated style
     #id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    from_reserve: Mapped[DateTime] = mapped_column(DateTime)
-    to_reserve: Mapped[DateTime] = mapped_column(DateTime)
+    from_reserve: Mapped[DateTime] = mapped_column(EpochDateTime)
+    to_reserve: Mapped[DateTime] = mapped_column(EpochDateTime)
     meetingroom_id: Mapped[int] = mapped_column(Integer, ForeignKey("meetingroom.id"))
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"))
 
     # Corrected relationships with Mapped[]
-    meetingroom: Mapped["MeetingRoom"] = relationship("MeetingRoom", viewonly=True, lazy="joined")
-    user: Mapped["User"] = relationship("User", viewonly=True, lazy="joined")
+    # Связи загружает только запрос, который их явно указывает (loads в CRUD)
+    meetingroom: Mapped["MeetingRoom"] = relationship("MeetingRoom", viewonly=True, lazy="raise_on_sql")
+    user: Mapped["User"] = relationship("User", viewonly=True, lazy="raise_on_sql")
 
     confirmed_activity: Mapped[Boolean] = mapped_column(Boolean, nullable=False, default=False)
+    # Версия для оптимистичной блокировки: растет при каждом изменении брони
+    # через API, PATCH/DELETE с устаревшей версией получают 409
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+
+    # Поиск пересечений: равенство по комнате/пользователю и диапазон по
+    # to_reserve, from_reserve проверяется по тому же индексу
+    __table_args__ = (
+        Index("ix_reservation_room_interval", "meetingroom_id", "to_reserve", "from_reserve"),
+        Index("ix_reservation_user_interval", "user_id", "to_reserve", "from_reserve"),
+        # Постраничная выдача по ключу (from_reserve, id), в том числе с
+        # фильтром по комнате или пользователю
+        Index("ix_reservation_from_id", "from_reserve", "id"),
+        Index("ix_reservation_room_from_id", "meetingroom_id", "from_reserve", "id"),
+        Index("ix_reservation_user_from_id", "user_id", "from_reserve", "id"),
+    )
 
     def __repr__(self) -> str:
         return f"(id: {self.id}) компьютер '{self.meetingroom.name}' с {self.from_reserve} по {self.to_reserve} для пользователя '{self.user.fio}'"
@@ -0,0 +1,52 @@
+# app/models/reservation_archive.py
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Boolean, Index, Integer
+from sqlalchemy.orm import relationship, mapped_column, Mapped
+
+from app.core.db import Base
+from app.core.types import EpochDateTime, epoch_now
+from app.models import MeetingRoom, User
+
+
+class ReservationArchive(Base):
+    """
+    Завершившиеся брони, перенесенные из reservation задачей архивации.
+    id сохраняется прежним. Внешних ключей на комнату и пользователя нет:
+    их удаление архив не трогает, история остается для отчетов, а
+    meetingroom и user у таких записей будут None.
+    """
+    __tablename__ = "reservation_archive"
+
+    from_reserve: Mapped[Optional[datetime]] = mapped_column(EpochDateTime)
+    to_reserve: Mapped[Optional[datetime]] = mapped_column(EpochDateTime)
+    meetingroom_id: Mapped[Optional[int]] = mapped_column(Integer)
+    user_id: Mapped[Optional[int]] = mapped_column(Integer)
+    confirmed_activity: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    archived_at: Mapped[Optional[datetime]] = mapped_column(EpochDateTime, server_default=epoch_now())
+
+    meetingroom: Mapped[Optional["MeetingRoom"]] = relationship(
+        "MeetingRoom",
+        primaryjoin="foreign(ReservationArchive.meetingroom_id) == MeetingRoom.id",
+        viewonly=True,
+        lazy="raise_on_sql",
+    )
+    user: Mapped[Optional["User"]] = relationship(
+        "User",
+        primaryjoin="foreign(ReservationArchive.user_id) == User.id",
+        viewonly=True,
+        lazy="raise_on_sql",
+    )
+
+    # Те же диапазонные индексы, что и у reservation
+    __table_args__ = (
+        Index("ix_reservation_archive_room_interval", "meetingroom_id", "to_reserve", "from_reserve"),
+        Index("ix_reservation_archive_user_interval", "user_id", "to_reserve", "from_reserve"),
+    )
+
+    def __repr__(self) -> str:
+        room = self.meetingroom.name if self.meetingroom else self.meetingroom_id
+        user = self.user.fio if self.user else self.user_id
+        return f"(id: {self.id}, архив) компьютер '{room}' с {self.from_reserve} по {self.to_reserve} для пользователя '{user}'"
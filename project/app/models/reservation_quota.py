@@ -0,0 +1,28 @@
+# app/models/reservation_quota.py
+from datetime import date
+
+from sqlalchemy import Date, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.db import Base
+
+
+class ReservationQuotaCounter(Base):
+    """
+    Сколько броней и секунд брони у пользователя в комнате за день (по
+    дню начала брони). Обновляется CRUD-ом броней в той же транзакции,
+    что и сама бронь, чтобы проверка недельной квоты группы не агрегировала
+    reservation.
+    """
+    __tablename__ = "reservation_quota_counter"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    meetingroom_id: Mapped[int] = mapped_column(Integer, ForeignKey("meetingroom.id", ondelete="CASCADE"), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    reservations: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    seconds: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Ключ upsert-а и индекс для выборки дней пользователя в комнате
+    __table_args__ = (
+        UniqueConstraint("user_id", "meetingroom_id", "day", name="_quota_user_room_day_uc"),
+    )
@@ -0,0 +1,16 @@
+# app/models/reservation_rtree.py
+from sqlalchemy import Column, Integer, MetaData, Table
+
+# Виртуальная таблица SQLite R*Tree (rtree_i32) с интервалами броней:
+# комната - вырожденный отрезок [room, room], время - [from, to] в секундах
+# от эпохи. Создается миграцией и заполняется триггерами на reservation,
+# поэтому описана вне Base.metadata и не попадает в create_all/autogenerate.
+reservation_rtree = Table(
+    "reservation_rtree",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("min_room", Integer),
+    Column("max_room", Integer),
+    Column("from_reserve", Integer),
+    Column("to_reserve", Integer),
+)
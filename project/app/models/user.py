@@ -10,7 +10,7 @@ class User(SQLAlchemyBaseUserTable[int], Base):
     fio = Column(String, nullable=False)
     # Поле с указанием внешнего ключа пользователей
     group_id = Column(Integer, ForeignKey("group.id"))
-    group = relationship("Group", viewonly=True, lazy="joined")
+    group = relationship("Group", viewonly=True, lazy="raise_on_sql")
 
     def __repr__(self) -> str:
         return f"(id: {self.id}) {self.fio}"
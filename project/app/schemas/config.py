@@ -4,4 +4,25 @@ from pydantic import BaseModel
 
 class FirstInit(BaseModel):
     login: str
-    password: str
\ No newline at end of file
+    password: str
+
+
+class StatementCacheStats(BaseModel):
+    # Выполнения запросов, скомпилированные заново (misses) и взятые из кэша (hits)
+    hits: int
+    misses: int
+    # Запросов в кэше и его вместимость (DATABASE_QUERY_CACHE_SIZE)
+    size: int
+    capacity: int
+
+
+class ReadCacheStats(BaseModel):
+    # CRUD, чьи объекты кэшируются
+    name: str
+    size: int
+    capacity: int
+    hits: int
+    misses: int
+    hit_rate: float
+    # Записи, вытесненные из-за размера кэша
+    evictions: int
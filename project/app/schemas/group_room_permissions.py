@@ -1,5 +1,6 @@
 # app/schemas/reservation.py
 from datetime import timedelta
+from typing import Optional
 
 from pydantic import BaseModel, Extra, Field, field_serializer, field_validator
 from pytimeparse.timeparse import timeparse
@@ -11,10 +12,22 @@ from app import models
 class GroupRoomPermission(BaseModel):
     max_future_reservation: timedelta = Field(...)
     meetingroom_id: int = Field(...)
-
-    @field_validator("max_future_reservation", mode="before")
+    max_week_duration: Optional[timedelta] = Field(
+        None,
+        description="Сколько времени пользователь группы может занимать комнату за неделю, например 10h",
+    )
+    max_active_reservations: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Сколько еще не прошедших броней комнаты может быть у пользователя группы",
+    )
+
+    @field_validator("max_future_reservation", "max_week_duration", mode="before")
     @classmethod
-    def parse_duration(cls, v: object) -> timedelta:
+    def parse_duration(cls, v: object) -> Optional[timedelta]:
+        if v is None:
+            return v
+
         if isinstance(v, int):
             return timedelta(seconds=v)
 
@@ -36,8 +49,8 @@ class GroupRoomPermission(BaseModel):
 
 
 class GroupRoomPermissionRepr(GroupRoomPermission):
-    @field_serializer('max_future_reservation')
-    def serialize_duration(self, max_future_reservation: timedelta) -> str:
-        return str(max_future_reservation)
+    @field_serializer('max_future_reservation', 'max_week_duration')
+    def serialize_duration(self, duration: Optional[timedelta]) -> Optional[str]:
+        return str(duration) if duration is not None else None
 
 
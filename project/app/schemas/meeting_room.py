@@ -1,5 +1,6 @@
 # app/schemas/meeting_room.py
 
+from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, Field, field_validator
@@ -44,3 +45,14 @@ class MeetingRoomUpdate(MeetingRoom):
         if value is None:
             raise ValueError("Имя переговорки не может быть пустым")
         return value
+
+
+class FreeInterval(BaseModel):
+    from_reserve: datetime
+    to_reserve: datetime
+
+
+# Свободное время комнаты в запрошенном окне
+class MeetingRoomAvailability(BaseModel):
+    meetingroom: MeetingRoomDB
+    free: list[FreeInterval]
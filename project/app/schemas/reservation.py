@@ -1,10 +1,13 @@
 # app/schemas/reservation.py
-from datetime import datetime, timedelta
+import base64
+from datetime import date, datetime, timedelta
+from enum import Enum
 from typing import Optional
 
 from pydantic import BaseModel, Extra, Field, field_validator, model_validator
 
 from app.core.config import settings
+from app.core.types import from_epoch, to_epoch
 from app.schemas.meeting_room import MeetingRoomDB
 from app.schemas.user import UserRead
 
@@ -14,6 +17,28 @@ FROM_TIME = (datetime.now() + timedelta(minutes=10)).isoformat(
 TO_TIME = (datetime.now() + timedelta(hours=10)).isoformat(timespec="minutes")
 
 
+# Проверки времени брони возвращают текст ошибки (None - все в порядке):
+# их используют валидаторы схем и пакетная проверка слотов
+def from_reserve_error(from_reserve: datetime) -> Optional[str]:
+    if from_reserve <= datetime.now() - timedelta(seconds=settings.backdate_reservation_allowed_seconds):
+        return (
+            "Время начала бронирования не "
+            "может быть меньше текущего времени"
+        )
+    return None
+
+
+def interval_error(from_reserve: datetime, to_reserve: datetime) -> Optional[str]:
+    if from_reserve >= to_reserve:
+        return (
+            "Время начала бронирования, "
+            "не может быть больше его окончания"
+        )
+    if to_reserve - from_reserve > timedelta(minutes=settings.max_reservation_duration_minutes):
+        return f"Бронирование не может быть дольше {settings.max_reservation_duration_minutes} минут"
+    return None
+
+
 # Базовый класс, от которого будем наследоваться
 class ReservationRoomBase(BaseModel):
     from_reserve: datetime = Field(..., example=FROM_TIME)
@@ -32,11 +57,9 @@ class ReservationRoomBase(BaseModel):
 class ReservationRoomUpdate(ReservationRoomBase):
     @field_validator("from_reserve")
     def check_from_reserve_later_than_now(cls, value):
-        if value <= datetime.now() - timedelta(seconds=settings.backdate_reservation_allowed_seconds):
-            raise ValueError(
-                "Время начала бронирования не "
-                "может быть меньше текущего времени"
-            )
+        error = from_reserve_error(value)
+        if error is not None:
+            raise ValueError(error)
         return value
 
     @field_validator("user_id")
@@ -47,24 +70,82 @@ class ReservationRoomUpdate(ReservationRoomBase):
 
     @model_validator(mode='after')
     def check_from_reserve_before_to_reserve(cls, values):
-        if values.from_reserve >= values.to_reserve:
-            raise ValueError(
-                "Время начала бронирования, "
-                "не может быть больше его окончания"
-            )
-        if values.to_reserve - values.from_reserve > timedelta(minutes=settings.max_reservation_duration_minutes):
-            raise ValueError(
-                f"Бронирование не может быть дольше {settings.max_reservation_duration_minutes} минут"
-            )
+        error = interval_error(values.from_reserve, values.to_reserve)
+        if error is not None:
+            raise ValueError(error)
         return values
 
     def __repr__(self) -> str:
         return f"(id: {self.id}) тот-же компьютер с {self.from_reserve} по {self.to_reserve} для пользователя {self.user_id} "
 
 
+class RepeatFrequency(str, Enum):
+    daily = "daily"
+    weekly = "weekly"
+
+
+# Правило повторения серии броней (похоже на RRULE): каждые interval
+# дней или недель, до даты until включительно или count раз
+class ReservationRepeat(BaseModel):
+    frequency: RepeatFrequency
+    interval: int = Field(1, ge=1, description="Повторять каждый N-й день или неделю")
+    until: Optional[date] = Field(None, description="Дата начала последней брони серии")
+    count: Optional[int] = Field(None, ge=1, description="Количество броней в серии")
+
+    class Config:
+        extra = Extra.forbid
+
+    @model_validator(mode='after')
+    def check_until_or_count(cls, values):
+        if (values.until is None) == (values.count is None):
+            raise ValueError("Для серии нужно указать либо until, либо count")
+        return values
+
+    @property
+    def step(self) -> timedelta:
+        days = 7 if self.frequency == RepeatFrequency.weekly else 1
+        return timedelta(days=days * self.interval)
+
+
 # наследуемся от ReservationRoomUpdate с его валидаторами
 class ReservationRoomCreate(ReservationRoomUpdate):
     meetingroom_id: int
+    # В модель брони не передается (exclude), разворачивается в occurrences()
+    repeat: Optional[ReservationRepeat] = Field(
+        None,
+        description="Повторение брони. Если указано - создается серия броней",
+        exclude=True,
+    )
+
+    @model_validator(mode='after')
+    def check_series_length(cls, values):
+        if values.repeat is not None:
+            count = len(values.occurrences())
+            if count == 0:
+                raise ValueError("Дата окончания серии раньше начала бронирования")
+            if count > settings.reservation_series_max_occurrences:
+                raise ValueError(
+                    f"Серия не может содержать больше {settings.reservation_series_max_occurrences} броней"
+                )
+        return values
+
+    def occurrences(self) -> list[tuple[datetime, datetime]]:
+        """Интервалы всех броней серии по порядку; без repeat - одна бронь."""
+        if self.repeat is None:
+            return [(self.from_reserve, self.to_reserve)]
+        duration = self.to_reserve - self.from_reserve
+        # Лишний интервал сверх лимита нужен только чтобы обнаружить превышение
+        limit = settings.reservation_series_max_occurrences + 1
+        if self.repeat.count is not None:
+            limit = min(limit, self.repeat.count)
+        occurrences = []
+        from_reserve = self.from_reserve
+        while len(occurrences) < limit and (
+            self.repeat.until is None or from_reserve.date() <= self.repeat.until
+        ):
+            occurrences.append((from_reserve, from_reserve + duration))
+            from_reserve += self.repeat.step
+        return occurrences
 
 
 # Pydantic-схема для валидации объектов из БД,
@@ -81,6 +162,10 @@ class ReservationRoomDB(ReservationRoomBase):
         description="пользователь",
         nullable=True
     )
+    version: int = Field(
+        ...,
+        description="Версия брони, передается в If-Match или version при изменении и удалении",
+    )
 
     # разрешим сериализацию объектов из БД
     class Config:
@@ -98,3 +183,108 @@ class ReservationRoomDBUpdateInternal(ReservationRoomBase):
     user_id: Optional[int]
     confirmed_activity: bool
 
+
+# Слот-кандидат для пакетной проверки без записи
+class ReservationSlot(BaseModel):
+    meetingroom_id: int
+    from_reserve: datetime = Field(..., example=FROM_TIME)
+    to_reserve: datetime = Field(..., example=TO_TIME)
+
+    class Config:
+        extra = Extra.forbid
+
+
+class ReservationSlotCheck(ReservationSlot):
+    available: bool = Field(..., description="Слот можно забронировать")
+    room_conflicts: list[int] = Field([], description="ID броней этой комнаты, пересекающихся со слотом")
+    user_conflicts: list[int] = Field([], description="ID броней пользователя, пересекающихся со слотом")
+    errors: list[str] = Field([], description="Тексты ошибок, которые вернуло бы бронирование")
+
+
+class BulkMode(str, Enum):
+    # Хотя бы одна ошибка - не записывается ничего
+    all_or_nothing = "all_or_nothing"
+    # Записываются все элементы без ошибок, об остальных возвращаются ошибки
+    best_effort = "best_effort"
+
+
+class ReservationBulkItem(ReservationSlot):
+    user_id: Optional[int] = Field(
+        None,
+        description="ID пользователя, для которого создается бронь. По умолчанию - текущий",
+    )
+
+
+class ReservationBulkCreate(BaseModel):
+    items: list[ReservationBulkItem] = Field(..., max_length=settings.reservation_bulk_max_items)
+    mode: BulkMode = BulkMode.all_or_nothing
+
+    class Config:
+        extra = Extra.forbid
+
+
+# Удаление по списку ID, либо всех броней, пересекающихся с окном
+# [from_reserve, to_reserve) - во всех комнатах или в одной
+class ReservationBulkDelete(BaseModel):
+    ids: Optional[list[int]] = Field(None, max_length=settings.reservation_bulk_max_items)
+    meetingroom_id: Optional[int] = None
+    from_reserve: Optional[datetime] = Field(None, example=FROM_TIME)
+    to_reserve: Optional[datetime] = Field(None, example=TO_TIME)
+    mode: BulkMode = BulkMode.all_or_nothing
+
+    class Config:
+        extra = Extra.forbid
+
+    @model_validator(mode='after')
+    def check_ids_or_window(cls, values):
+        window = (values.from_reserve, values.to_reserve)
+        if values.ids is not None:
+            if values.meetingroom_id is not None or window != (None, None):
+                raise ValueError("Укажите либо ids, либо комнату и время, но не оба варианта")
+        elif None in window:
+            raise ValueError("Укажите ids или from_reserve и to_reserve")
+        elif values.from_reserve >= values.to_reserve:
+            raise ValueError(
+                "Время начала бронирования, "
+                "не может быть больше его окончания"
+            )
+        return values
+
+
+class BulkItemError(BaseModel):
+    index: int = Field(..., description="Номер элемента в запросе (items или ids), с нуля")
+    errors: list[str]
+
+
+class ReservationBulkResult(BaseModel):
+    reservations: list[ReservationRoomDB] = Field(..., description="Созданные или удаленные брони")
+    errors: list[BulkItemError] = []
+
+
+# Курсор постраничной выдачи - непрозрачная строка с ключом последней
+# брони страницы (from_reserve, id)
+def encode_cursor(from_reserve: datetime, reservation_id: int) -> str:
+    key = f"{to_epoch(from_reserve)}:{reservation_id}".encode()
+    return base64.urlsafe_b64encode(key).decode().rstrip("=")
+
+
+# Допустимые значения ключа курсора: время - в пределах datetime, id - в
+# пределах колонки Integer (в PostgreSQL - int4)
+CURSOR_EPOCH_RANGE = (to_epoch(datetime.min), to_epoch(datetime.max))
+CURSOR_MAX_ID = 2 ** 31 - 1
+
+
+def decode_cursor(cursor: str) -> Optional[tuple[datetime, int]]:
+    """None - курсор поврежден."""
+    try:
+        key = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        from_reserve, reservation_id = map(int, key.split(":"))
+    except ValueError:
+        return None
+    epoch_min, epoch_max = CURSOR_EPOCH_RANGE
+    if not (epoch_min <= from_reserve <= epoch_max and 0 < reservation_id <= CURSOR_MAX_ID):
+        return None
+    try:
+        return from_epoch(from_reserve), reservation_id
+    except OverflowError:
+        return None
@@ -0,0 +1,247 @@
+# bench/common.py
+"""
+Общее для замеров: временная база SQLite или PostgreSQL со схемой
+alembic head, заполнение броней, время запроса, клиенты API. Скрипты
+запускаются из каталога project: python bench/<скрипт>.py --help
+"""
+import asyncio
+import atexit
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+
+def use_temp_database(**env) -> str:
+    """
+    Настройки app читаются при импорте, поэтому окружение задается до него.
+    Рабочий каталог временный: туда пишутся config/, data/ и база.
+    """
+    directory = tempfile.mkdtemp(prefix="bronyka-bench-")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    path = os.path.join(directory, "bench.db")
+    os.environ.update(
+        DATABASE_URL=f"sqlite+aiosqlite:///{path}",
+        CRON_TIMESHEET_ENABLED="false",
+        CRON_AUTOCANCEL_ENABLED="false",
+        AUTH_REQURE_STRONGPASS="false",
+        **env,
+    )
+    os.chdir(directory)
+    return path
+
+
+def use_postgres_database(server_url: str, **env) -> str:
+    """
+    Отдельная база на сервере PostgreSQL (server_url - любая база на нем,
+    postgresql+asyncpg://...), удаляется при выходе. Возвращает ее адрес.
+    """
+    from sqlalchemy.engine import make_url
+
+    use_temp_database(**env)
+    server = make_url(server_url)
+    name = f"bronyka_bench_{uuid.uuid4().hex[:8]}"
+    asyncio.run(_execute_autocommit(server, f"CREATE DATABASE {name}"))
+    atexit.register(lambda: asyncio.run(_execute_autocommit(server, f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")))
+    url = server.set(database=name).render_as_string(hide_password=False)
+    os.environ["DATABASE_URL"] = url
+    return url
+
+
+async def _execute_autocommit(url, statement: str) -> None:
+    # CREATE/DROP DATABASE не выполняются внутри транзакции
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    engine = create_async_engine(url, poolclass=NullPool, isolation_level="AUTOCOMMIT")
+    async with engine.connect() as connection:
+        await connection.execute(text(statement))
+    await engine.dispose()
+
+
+def migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(PROJECT_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PROJECT_DIR, "alembic"))
+    command.upgrade(config, "head")
+
+
+def seed_reservations(
+    connection: sqlite3.Connection,
+    rows: int,
+    rooms: int = 50,
+    users: int = 2000,
+    end: datetime = None,
+    encode: Callable[[datetime], object] = None,
+) -> None:
+    """
+    История броней, заканчивающаяся в end: в каждой комнате брони по часу
+    через час, пользователи случайные. encode - представление времени в
+    колонке, по умолчанию то, что хранит EpochDateTime.
+    """
+    from app.core.types import to_epoch
+
+    end = end or datetime.now().replace(second=0, microsecond=0)
+    encode = encode or to_epoch
+    per_room = rows // rooms
+    rng = random.Random(rows)
+
+    def generate():
+        for index in range(per_room * rooms):
+            room, slot = divmod(index, per_room)
+            from_reserve = end - timedelta(hours=2 * (per_room - slot))
+            yield (
+                encode(from_reserve),
+                encode(from_reserve + timedelta(hours=1)),
+                room + 1,
+                rng.randint(1, users),
+            )
+
+    with connection:
+        connection.executemany(
+            "INSERT INTO reservation (from_reserve, to_reserve, meetingroom_id, user_id, confirmed_activity, version) "
+            "VALUES (?, ?, ?, ?, 0, 1)",
+            generate(),
+        )
+    connection.execute("ANALYZE")
+
+
+def best_ms(call: Callable[[], object], number: int = 200, repeat: int = 3) -> float:
+    """Лучшее из repeat среднее время вызова, мс."""
+    call()
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            call()
+        elapsed = (time.perf_counter() - started) / number * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def query_ms(connection: sqlite3.Connection, sql: str, params=(), number: int = 200) -> float:
+    return best_ms(lambda: connection.execute(sql, params).fetchall(), number)
+
+
+def compile_sqlite(statement) -> tuple[str, list]:
+    """SQL и параметры запроса SQLAlchemy для sqlite3: время - как в EpochDateTime."""
+    from sqlalchemy.dialects import sqlite
+
+    from app.core.types import to_epoch
+
+    compiled = statement.compile(dialect=sqlite.dialect())
+    params = compiled.params
+    return str(compiled), [
+        to_epoch(value) if isinstance(value, datetime) else value
+        for value in (params[name] for name in compiled.positiontup)
+    ]
+
+
+ADMIN = ("admin@example.com", "admin")
+
+
+async def create_users(count: int) -> None:
+    """Администратор ADMIN и count пользователей user<n>@example.com без пароля."""
+    from sqlalchemy import insert
+
+    from app.core.db import AsyncSessionLocal, engine
+    from app.core.init_db import create_user
+    from app.models import User
+
+    await create_user(*ADMIN, "Администратор", is_superuser=True)
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(User), [
+            dict(
+                email=f"user{index}@example.com",
+                hashed_password="-",
+                fio=f"Пользователь {index}",
+                is_active=True,
+                is_superuser=False,
+                is_verified=False,
+            )
+            for index in range(count)
+        ])
+        await session.commit()
+    await engine.dispose()
+
+
+def prepare_api(client, rooms: int) -> tuple[dict, list[dict], list[int]]:
+    """
+    Комнаты и группа с правами на все (бронь на 7 дней вперед), в группе -
+    все пользователи. Возвращает заголовки администратора, комнаты и id
+    пользователей.
+    """
+    response = client.post("/auth/jwt/login", data={"username": ADMIN[0], "password": ADMIN[1]})
+    admin = {"Authorization": "Bearer " + response.json()["access_token"]}
+    created = [
+        client.post("/api/meeting_rooms/", json={"name": f"Комната {index}", "description": "-"}, headers=admin).json()
+        for index in range(rooms)
+    ]
+    group = client.post("/api/groups/", json={"name": "Группа", "adGroupDN": "CN=group"}, headers=admin).json()
+    client.patch(f"/api/groups/{group['id']}", json={
+        "name": "Группа",
+        "adGroupDN": "CN=group",
+        "permissions": [{"meetingroom_id": room["id"], "max_future_reservation": "7d"} for room in created],
+    }, headers=admin)
+    users = [user for user in client.get("/users", headers=admin).json() if not user["is_superuser"]]
+    for user in users:
+        client.patch(f"/users/{user['id']}", json={"group_id": group["id"]}, headers=admin)
+    return admin, created, [user["id"] for user in users]
+
+
+async def run_clients(
+    app,
+    clients: int,
+    requests: int,
+    request: Callable[[object, random.Random], Awaitable[object]],
+) -> tuple[float, Counter]:
+    """
+    clients параллельных клиентов API через ASGI, каждый делает requests
+    запросов request(http, rng) подряд. Возвращает время и коды ответов.
+    """
+    import httpx
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as http:
+        async def client(index: int) -> list[int]:
+            rng = random.Random(index)
+            return [(await request(http, rng)).status_code for _ in range(requests)]
+
+        started = time.perf_counter()
+        codes = await asyncio.gather(*(client(index) for index in range(clients)))
+        return time.perf_counter() - started, Counter(code for client_codes in codes for code in client_codes)
+
+
+# Пары броней одной комнаты (одного пользователя), пересекающиеся по
+# [from_reserve, to_reserve)
+OVERLAPS = (
+    "SELECT count(*) FROM reservation a JOIN reservation b "
+    "ON a.id < b.id AND a.{column} = b.{column} "
+    "AND a.from_reserve < b.to_reserve AND b.from_reserve < a.to_reserve"
+)
+
+
+async def count_overlaps() -> dict:
+    """Двойные брони в базе приложения: {"meetingroom_id": n, "user_id": n}."""
+    from sqlalchemy import text
+
+    from app.core.db import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as session:
+        return {
+            column: (await session.execute(text(OVERLAPS.format(column=column)))).scalar()
+            for column in ("meetingroom_id", "user_id")
+        }
@@ -0,0 +1,84 @@
+# bench/double_booking.py
+"""
+Двойные брони под нагрузкой: параллельные клиенты бронируют через API
+случайные пересекающиеся интервалы одной комнаты (за разных
+пользователей), одного пользователя (в разных комнатах) и одной комнаты
+за одного пользователя. После прогона в reservation не должно быть
+пересекающихся [from_reserve, to_reserve) ни по meetingroom_id, ни по
+user_id - иначе скрипт завершается ошибкой. От двойных броней защищает
+БД: очередь записи и BEGIN IMMEDIATE в SQLite, EXCLUDE в PostgreSQL.
+
+    python bench/double_booking.py --clients 50 --requests 20
+    python bench/double_booking.py --postgres-url postgresql+asyncpg://postgres@127.0.0.1:5433/postgres
+"""
+import argparse
+import asyncio
+import logging
+import warnings
+from datetime import datetime, timedelta
+
+from common import count_overlaps, create_users, migrate, prepare_api, run_clients, use_postgres_database, use_temp_database
+
+ROOMS = 10
+USERS = 40
+# Начала броней - 40 получасовых слотов дня, длительность - 30-90 минут
+SLOTS = 40
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="запросов на клиента")
+    parser.add_argument("--postgres-url")
+    args = parser.parse_args()
+
+    if args.postgres_url:
+        use_postgres_database(args.postgres_url, SCHEDULE_STORE_ENABLED="false")
+    else:
+        use_temp_database(SCHEDULE_STORE_ENABLED="false")
+    migrate()
+    asyncio.run(create_users(USERS))
+
+    from fastapi.testclient import TestClient
+
+    from app.core.db import engine
+    from app.main import app
+
+    logging.disable(logging.INFO)
+    # Схемы ответа предупреждают о user_id числом на каждую бронь
+    warnings.simplefilter("ignore")
+    with TestClient(app) as client:
+        admin, rooms, user_ids = prepare_api(client, ROOMS)
+        tomorrow = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+        def booker(day: int, room, user):
+            # room(rng) и user(rng) - комната и пользователь брони; каждый
+            # сценарий бронирует свой день
+            async def book(http, rng):
+                from_reserve = tomorrow + timedelta(days=day, minutes=30 * rng.randrange(SLOTS))
+                return await http.post("/api/reservations/", headers=admin, json={
+                    "from_reserve": from_reserve.isoformat(timespec="minutes"),
+                    "to_reserve": (from_reserve + timedelta(minutes=30 * rng.choice([1, 2, 3]))).isoformat(timespec="minutes"),
+                    "meetingroom_id": room(rng)["id"],
+                    "user_id": str(user(rng)),
+                })
+            return book
+
+        scenarios = [
+            ("one room", booker(0, lambda rng: rooms[0], lambda rng: rng.choice(user_ids))),
+            ("one user", booker(1, lambda rng: rng.choice(rooms), lambda rng: user_ids[0])),
+            ("one room and user", booker(2, lambda rng: rooms[0], lambda rng: user_ids[0])),
+        ]
+
+        print(f"{engine.dialect.name}, {args.clients} clients x {args.requests} requests")
+        for name, book in scenarios:
+            elapsed, codes = client.portal.call(run_clients, app, args.clients, args.requests, book)
+            print(f"  {name:20s} {sum(codes.values()) / elapsed:6.0f} req/s  codes {dict(sorted(codes.items()))}")
+
+        overlaps = client.portal.call(count_overlaps)
+        print(f"overlapping reservations: {overlaps}")
+        assert not any(overlaps.values()), overlaps
+
+
+if __name__ == "__main__":
+    main()
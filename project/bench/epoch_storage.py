@@ -0,0 +1,113 @@
+# bench/epoch_storage.py
+"""
+Время броней и пингов текстом ISO (как хранил DateTime SQLAlchemy) и
+целым числом микросекунд (EpochDateTime): размер таблиц и индексов и
+время запросов. Обе базы - схема alembic head, в текстовую значения
+пишутся строками: колонки BIGINT в SQLite принимают и их. Триггеры
+R*Tree удаляются в обеих - они считают секунды только из чисел.
+
+    python bench/epoch_storage.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+from common import migrate, query_ms, seed_reservations, use_temp_database
+
+ROOMS = 50
+USERS = 2000
+OBJECTS = [
+    "reservation",
+    "ix_reservation_room_interval",
+    "ix_reservation_user_interval",
+    "activity_log",
+    "ix_activity_log_room_user_time",
+]
+QUERIES = {
+    "overlap EXISTS (room)": (
+        "SELECT EXISTS (SELECT 1 FROM reservation "
+        "WHERE meetingroom_id = ? AND to_reserve > ? AND +from_reserve < ?)"
+    ),
+    "30-day window count (room)": (
+        "SELECT count(*) FROM reservation "
+        "WHERE meetingroom_id = ? AND to_reserve > ? AND +from_reserve < ?"
+    ),
+    "upcoming for user (to > now)": (
+        "SELECT * FROM reservation WHERE user_id = ? AND to_reserve > ? ORDER BY +from_reserve"
+    ),
+    "activity lookback EXISTS": (
+        "SELECT EXISTS (SELECT 1 FROM activity_log "
+        "WHERE meetingroom_id = ? AND user_id = ? AND computer_time >= ?)"
+    ),
+}
+
+
+def as_text(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def seed_activity(connection: sqlite3.Connection, rows: int, end: datetime, encode) -> None:
+    # Пинги раз в минуту, комнаты и пользователи случайные
+    rng = random.Random(rows)
+    with connection:
+        connection.executemany(
+            "INSERT INTO activity_log (received_at_time, computer_time, meetingroom_id, user_id) VALUES (?, ?, ?, ?)",
+            (
+                (encode(moment), encode(moment), rng.randint(1, ROOMS), rng.randint(1, USERS))
+                for moment in (end - timedelta(minutes=rows - index) for index in range(rows))
+            ),
+        )
+    connection.execute("ANALYZE")
+
+
+def measure(rows: int, encode) -> dict:
+    path = use_temp_database()
+    migrate()
+    connection = sqlite3.connect(path)
+    for (name,) in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'reservation'"
+    ).fetchall():
+        connection.execute(f"DROP TRIGGER {name}")
+    now = datetime.now().replace(second=0, microsecond=0)
+    seed_reservations(connection, rows, rooms=ROOMS, users=USERS, end=now, encode=encode)
+    seed_activity(connection, rows, now, encode)
+    connection.execute("VACUUM")
+
+    sizes = dict(connection.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+    result = {name: sizes[name] / 2 ** 20 for name in OBJECTS}
+    result["database file"] = os.path.getsize(path) / 2 ** 20
+
+    middle = now - timedelta(hours=rows // ROOMS)
+    params = {
+        "overlap EXISTS (room)": (7, encode(now - timedelta(minutes=90)), encode(now - timedelta(minutes=30))),
+        "30-day window count (room)": (7, encode(middle), encode(middle + timedelta(days=30))),
+        "upcoming for user (to > now)": (7, encode(now - timedelta(hours=12))),
+        "activity lookback EXISTS": (7, 7, encode(now - timedelta(minutes=5))),
+    }
+    for name, sql in QUERIES.items():
+        result[name] = query_ms(connection, sql, params[name])
+    connection.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="броней и пингов")
+    args = parser.parse_args()
+
+    from app.core.types import to_epoch
+
+    text = measure(args.rows, as_text)
+    integer = measure(args.rows, to_epoch)
+
+    print(f"{args.rows} reservations and {args.rows} activity rows")
+    print(f"  {'':32s} {'text':>10s} {'integer':>10s}")
+    for name in text:
+        unit = "ms" if name in QUERIES else "MB"
+        print(f"  {name:32s} {text[name]:7.3f} {unit} {integer[name]:7.3f} {unit}")
+
+
+if __name__ == "__main__":
+    main()
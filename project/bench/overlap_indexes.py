@@ -0,0 +1,78 @@
+# bench/overlap_indexes.py
+"""
+Запросы пересечений броней: прежнее условие OR/BETWEEN и полуоткрытое
+to_reserve > :from AND from_reserve < :to, с составными индексами
+(..., to_reserve, from_reserve) и без индексов на reservation, как до
+миграции 3c9e1f4b7a20. Пробы - рядом с концом истории.
+
+    python bench/overlap_indexes.py --rows 1000000
+"""
+import argparse
+import sqlite3
+from datetime import datetime, timedelta
+
+from common import migrate, query_ms, seed_reservations, use_temp_database
+
+OLD_OVERLAP = (
+    "SELECT * FROM reservation WHERE {column} = :key AND ("
+    ":from_reserve BETWEEN from_reserve AND to_reserve "
+    "OR :to_reserve BETWEEN from_reserve AND to_reserve "
+    "OR (:from_reserve <= from_reserve AND :to_reserve >= to_reserve))"
+)
+# Как в app.crud.reservation: + не дает SQLite искать и сортировать по
+# from_reserve через индексы постраничной выдачи (app.core.types.unindexed)
+OVERLAP = "SELECT * FROM reservation WHERE {column} = :key AND to_reserve > :from_reserve AND +from_reserve < :to_reserve"
+EXISTS = f"SELECT EXISTS ({OVERLAP})"
+UPCOMING = "SELECT * FROM reservation WHERE {column} = :key AND to_reserve > :from_reserve ORDER BY +from_reserve"
+
+QUERIES = [
+    ("room overlap, OR/BETWEEN", OLD_OVERLAP, "meetingroom_id"),
+    ("room overlap, half-open", OVERLAP, "meetingroom_id"),
+    ("room overlap, EXISTS", EXISTS, "meetingroom_id"),
+    ("user overlap, OR/BETWEEN", OLD_OVERLAP, "user_id"),
+    ("user overlap, half-open", OVERLAP, "user_id"),
+    ("room upcoming list", UPCOMING, "meetingroom_id"),
+]
+
+
+def measure(connection: sqlite3.Connection, now: datetime) -> dict:
+    from app.core.types import to_epoch
+
+    params = dict(
+        key=7,
+        from_reserve=to_epoch(now - timedelta(minutes=90)),
+        to_reserve=to_epoch(now - timedelta(minutes=30)),
+    )
+    return {
+        name: query_ms(connection, sql.format(column=column), params, number=20)
+        for name, sql, column in QUERIES
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    migrate()
+    connection = sqlite3.connect(path)
+    now = datetime.now().replace(second=0, microsecond=0)
+    seed_reservations(connection, args.rows, end=now)
+
+    indexed = measure(connection, now)
+    for (name,) in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'reservation' AND sql IS NOT NULL"
+    ).fetchall():
+        connection.execute(f"DROP INDEX {name}")
+    connection.execute("ANALYZE")
+    plain = measure(connection, now)
+
+    print(f"{args.rows} reservations, ms per query")
+    print(f"  {'':28s} {'no index':>10s} {'indexed':>10s}")
+    for name in indexed:
+        print(f"  {name:28s} {plain[name]:10.3f} {indexed[name]:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
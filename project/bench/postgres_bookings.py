@@ -0,0 +1,95 @@
+# bench/postgres_bookings.py
+"""
+Бронирования через API на SQLite и на PostgreSQL (EXCLUDE-ограничения,
+миграция e5c3a9f07b18): подряд одним клиентом, параллельно без конфликтов,
+параллельно по contention запросов на один слот и гонка за один слот.
+После прогона в базе не должно быть пересекающихся броней.
+
+По умолчанию - временная база SQLite. С --postgres-url на сервере
+создается отдельная база и удаляется после замера:
+
+    python bench/postgres_bookings.py --bookings 300
+    python bench/postgres_bookings.py --bookings 300 --postgres-url postgresql+asyncpg://postgres@127.0.0.1:5433/postgres
+"""
+import argparse
+import asyncio
+import logging
+import warnings
+from datetime import datetime, timedelta
+
+from common import count_overlaps, create_users, migrate, prepare_api, run_clients, use_postgres_database, use_temp_database
+
+# Слоты по 15 минут: серия из --bookings броней укладывается в 7 дней,
+# на которые группа может бронировать
+SLOT = timedelta(minutes=15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=300, help="броней на сценарий")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--contention", type=int, default=10, help="запросов на один слот")
+    parser.add_argument("--race", type=int, default=20, help="параллельных запросов в гонке за слот")
+    parser.add_argument("--postgres-url")
+    args = parser.parse_args()
+
+    if args.postgres_url:
+        use_postgres_database(args.postgres_url, SCHEDULE_STORE_ENABLED="false")
+    else:
+        use_temp_database(SCHEDULE_STORE_ENABLED="false")
+    migrate()
+    asyncio.run(create_users(4))
+
+    from fastapi.testclient import TestClient
+
+    from app.core.db import engine
+    from app.main import app
+
+    logging.disable(logging.INFO)
+    # Схемы ответа предупреждают о user_id числом на каждую бронь
+    warnings.simplefilter("ignore")
+    with TestClient(app) as client:
+        admin, rooms, user_ids = prepare_api(client, rooms=4)
+        start = datetime.now().replace(second=0, microsecond=0) + timedelta(hours=1)
+
+        def booker(scenario: int, slot_of):
+            # Сценарий бронирует свою комнату за своего пользователя:
+            # конфликтуют только запросы на один слот
+            async def book(http, rng):
+                index = slot_of(rng)
+                from_reserve = start + SLOT * index
+                return await http.post("/api/reservations/", headers=admin, json={
+                    "from_reserve": from_reserve.isoformat(timespec="minutes"),
+                    "to_reserve": (from_reserve + SLOT).isoformat(timespec="minutes"),
+                    "meetingroom_id": rooms[scenario]["id"],
+                    "user_id": str(user_ids[scenario]),
+                })
+            return book
+
+        def sequence():
+            # Следующий слот при каждом вызове
+            counter = iter(range(args.bookings))
+            return lambda rng: next(counter)
+
+        contended = iter(range(args.bookings))
+        scenarios = [
+            ("sequential", 1, args.bookings, booker(0, sequence())),
+            (f"{args.concurrency} concurrent", args.concurrency, args.bookings // args.concurrency,
+             booker(1, sequence())),
+            (f"contended, {args.contention} per slot", args.bookings, 1,
+             booker(2, lambda rng: next(contended) // args.contention)),
+            (f"race, {args.race} for one slot", args.race, 1, booker(3, lambda rng: 0)),
+        ]
+
+        print(f"{engine.dialect.name}, {args.bookings} bookings per scenario")
+        for name, clients, requests, book in scenarios:
+            elapsed, codes = client.portal.call(run_clients, app, clients, requests, book)
+            print(f"  {name:28s} {sum(codes.values()) / elapsed:6.0f} req/s  codes {dict(sorted(codes.items()))}")
+
+        overlaps = client.portal.call(count_overlaps)
+        print(f"overlapping reservations: {overlaps}")
+        assert not any(overlaps.values()), overlaps
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# bench/relationship_loads.py
+"""
+Загрузка связей на чтениях API: сколько SELECT выполняет запрос, сколько
+строк они возвращают и время ответа. 20 комнат в правах группы, брони
+двух пользователей и события аудита. Расписание в памяти и кэш чтения
+выключены - все читается из БД.
+
+Строки считаются повторным выполнением каждого SELECT через sqlite3.
+Для сравнения со связями lazy="joined" скрипт запускается в рабочей
+копии коммита до перехода на loads (каталог bench/ копируется туда).
+
+    python bench/relationship_loads.py --reservations 3000 --events 2000
+"""
+import argparse
+import asyncio
+import logging
+import sqlite3
+import time
+import warnings
+from datetime import datetime, timedelta
+
+from common import migrate, use_temp_database
+
+ADMIN = ("admin@example.com", "admin")
+USERS = [("user1@example.com", "user1"), ("user2@example.com", "user2")]
+ROOMS = 20
+
+
+async def prepare_db():
+    from app.core.db import engine
+    from app.core.init_db import create_user
+
+    await create_user(*ADMIN, "Администратор", is_superuser=True)
+    for index, (email, password) in enumerate(USERS):
+        await create_user(email, password, f"Пользователь {index}")
+    await engine.dispose()
+
+
+def login(client, email: str, password: str) -> dict:
+    response = client.post("/auth/jwt/login", data={"username": email, "password": password})
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+def prepare_api(client) -> tuple[dict, dict, list[dict]]:
+    admin = login(client, *ADMIN)
+    rooms = [
+        client.post("/api/meeting_rooms/", json={"name": f"Комната {index}", "description": "-"}, headers=admin).json()
+        for index in range(ROOMS)
+    ]
+    group = client.post("/api/groups/", json={"name": "Группа", "adGroupDN": "CN=group"}, headers=admin).json()
+    client.patch(f"/api/groups/{group['id']}", json={
+        "name": "Группа",
+        "adGroupDN": "CN=group",
+        "permissions": [{"meetingroom_id": room["id"], "max_future_reservation": "30d"} for room in rooms],
+    }, headers=admin)
+    for user in client.get("/users", headers=admin).json():
+        client.patch(f"/users/{user['id']}", json={"group_id": group["id"]}, headers=admin)
+    return admin, login(client, *USERS[0]), rooms
+
+
+def seed(path: str, rooms: list[dict], user_ids: list[int], reservations: int, events: int) -> None:
+    from app.core.types import to_epoch
+
+    # Брони по полчаса каждый час с завтрашнего дня, комнаты и
+    # пользователи по кругу
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(
+            "INSERT INTO reservation (from_reserve, to_reserve, meetingroom_id, user_id, confirmed_activity, version) "
+            "VALUES (?, ?, ?, ?, 0, 1)",
+            (
+                (
+                    to_epoch(start + timedelta(hours=index)),
+                    to_epoch(start + timedelta(hours=index, minutes=30)),
+                    rooms[index % len(rooms)]["id"],
+                    user_ids[index % len(user_ids)],
+                )
+                for index in range(reservations)
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO auditevent (description, user_id) VALUES (?, ?)",
+            ((f"Событие {index}", user_ids[index % len(user_ids)]) for index in range(events)),
+        )
+    connection.execute("ANALYZE")
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reservations", type=int, default=3000)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--number", type=int, default=20, help="запросов на эндпоинт")
+    args = parser.parse_args()
+
+    path = use_temp_database(SCHEDULE_STORE_ENABLED="false", CRUD_CACHE_ENABLED="false")
+    migrate()
+    asyncio.run(prepare_db())
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from app.core import db
+    from app.main import app
+
+    logging.disable(logging.INFO)
+    warnings.simplefilter("ignore")
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    with TestClient(app) as client:
+        admin, user, rooms = prepare_api(client)
+        user_ids = [item["id"] for item in client.get("/users", headers=admin).json() if not item["is_superuser"]]
+        seed(path, rooms, user_ids, args.reservations, args.events)
+
+        engines = {db.engine.sync_engine, db.read_engine.sync_engine}
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", capture)
+        connection = sqlite3.connect(path)
+
+        print(f"{args.reservations} reservations, {args.events} audit events, {ROOMS} rooms in group permissions")
+        print(f"  {'':24s} {'selects':>8s} {'rows':>8s} {'bytes':>9s} {'ms':>8s}")
+        for name, url, headers in (
+            ("reservations page 500", "/api/reservations/?limit=500", admin),
+            ("reservations all", "/api/reservations/", admin),
+            ("my reservations", "/api/reservations/my_reservations", user),
+            ("room reservations", f"/api/meeting_rooms/{rooms[0]['id']}/reservations", user),
+            ("audit events", "/api/audit/events", admin),
+            ("users", "/users", admin),
+            ("groups", "/api/groups/", admin),
+            ("users/me", "/users/me", user),
+        ):
+            client.get(url, headers=headers)
+            statements.clear()
+            response = client.get(url, headers=headers)
+            rows = sum(len(connection.execute(sql, parameters).fetchall()) for sql, parameters in statements)
+            selects = len(statements)
+
+            started = time.perf_counter()
+            for _ in range(args.number):
+                client.get(url, headers=headers)
+            elapsed = (time.perf_counter() - started) / args.number * 1000
+            assert response.status_code == 200, (url, response.text)
+            print(f"  {name:24s} {selects:8d} {rows:8d} {len(response.content):9d} {elapsed:8.1f}")
+
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", capture)
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
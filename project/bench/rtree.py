@@ -0,0 +1,72 @@
+# bench/rtree.py
+"""
+Поиск броней по индексам (..., to_reserve, from_reserve) и по R*Tree
+(reservation_rtree_enabled): условия берутся из app.crud.reservation
+для обоих значений настройки. История 50 комнат заканчивается сейчас.
+
+    python bench/rtree.py --rows 10000,100000,1000000,3000000
+"""
+import argparse
+import sqlite3
+from datetime import datetime, timedelta
+
+from common import compile_sqlite, migrate, query_ms, seed_reservations, use_temp_database
+
+ROOMS = 50
+
+
+def statements(now: datetime, history: timedelta) -> dict:
+    from sqlalchemy import exists, func, select
+
+    from app.crud.reservation import epoch, reservation_crud, room_same_time
+    from app.models import Reservation
+
+    middle = now - history / 2
+    return {
+        "overlap EXISTS": select(exists().where(
+            *room_same_time(7, now - timedelta(minutes=90), now - timedelta(minutes=30))
+        )),
+        "30-day window mid-history": select(func.count()).select_from(Reservation).where(
+            *room_same_time(7, middle, middle + timedelta(days=30))
+        ),
+        "current, all rooms": reservation_crud._current_statement()
+            .with_only_columns(Reservation.id)
+            .params(now=now, now_epoch=epoch(now)),
+    }
+
+
+def measure(rows: int) -> dict:
+    path = use_temp_database()
+    migrate()
+    from app.core.config import settings
+
+    connection = sqlite3.connect(path)
+    now = datetime.now().replace(second=0, microsecond=0)
+    seed_reservations(connection, rows, rooms=ROOMS, end=now)
+    history = timedelta(hours=2 * (rows // ROOMS))
+
+    result = {}
+    for rtree in (False, True):
+        settings.reservation_rtree_enabled = rtree
+        for name, statement in statements(now, history).items():
+            sql, params = compile_sqlite(statement)
+            result.setdefault(name, []).append(query_ms(connection, sql, params, number=20))
+    connection.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000", help="размеры истории через запятую")
+    args = parser.parse_args()
+
+    print(f"{ROOMS} rooms, ms per query, B-tree / R*Tree")
+    for rows in (int(value) for value in args.rows.split(",")):
+        result = measure(rows)
+        print(f"  {rows:>8d} rows")
+        for name, (btree, rtree) in result.items():
+            print(f"    {name:28s} {btree:8.3f} / {rtree:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
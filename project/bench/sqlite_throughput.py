@@ -0,0 +1,89 @@
+# bench/sqlite_throughput.py
+"""
+Пропускная способность записи в SQLite: пинги (/api/reporters/ping) и
+бронирования (/api/reservations/) от параллельных клиентов через ASGI в
+одном процессе. С --old-defaults соединения получают значения SQLite
+по умолчанию вместо PRAGMA из Settings (journal_mode DELETE,
+synchronous FULL и т.д.), для сравнения.
+
+Движок чтения и очередь записи (app.core.writer) работают только в WAL,
+поэтому с --old-defaults (журнал DELETE) приложение пишет и читает через
+соединения одного движка без очереди - как до их появления.
+
+    python bench/sqlite_throughput.py --clients 50 --requests 20
+    python bench/sqlite_throughput.py --clients 50 --requests 20 --old-defaults
+"""
+import argparse
+import asyncio
+import logging
+import warnings
+from datetime import datetime, timedelta
+
+from common import create_users, migrate, prepare_api, run_clients, use_temp_database
+
+# Значения SQLite без PRAGMA приложения
+OLD_DEFAULTS = dict(
+    SQLITE_JOURNAL_MODE="DELETE",
+    SQLITE_SYNCHRONOUS="FULL",
+    SQLITE_CACHE_SIZE_KIB="2000",
+    SQLITE_MMAP_SIZE_BYTES="0",
+    SQLITE_TEMP_STORE="DEFAULT",
+)
+ROOMS = 10
+USERS = 40
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="запросов на клиента")
+    parser.add_argument("--old-defaults", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database(SCHEDULE_STORE_ENABLED="false", **(OLD_DEFAULTS if args.old_defaults else {}))
+    migrate()
+    asyncio.run(create_users(USERS))
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    logging.disable(logging.INFO)
+    # Схемы ответа предупреждают о user_id числом на каждую бронь
+    warnings.simplefilter("ignore")
+    with TestClient(app) as client:
+        admin, rooms, user_ids = prepare_api(client, ROOMS)
+        tomorrow = datetime.now().replace(second=0, microsecond=0) + timedelta(days=1)
+        runs = []
+
+        async def ping(http, rng):
+            return await http.post("/api/reporters/ping", json={
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "computer": rng.choice(rooms)["name"],
+                "activeUser": f"user{rng.randrange(USERS)}@example.com",
+                "eventType": "bench",
+            })
+
+        async def book(http, rng):
+            # 40 получасовых слотов на 10 комнат: часть броней пересекается.
+            # Каждый прогон бронирует свой день
+            from_reserve = tomorrow + timedelta(days=len(runs), minutes=30 * rng.randrange(40))
+            return await http.post("/api/reservations/", headers=admin, json={
+                "from_reserve": from_reserve.isoformat(timespec="minutes"),
+                "to_reserve": (from_reserve + timedelta(minutes=30 * rng.choice([1, 2]))).isoformat(timespec="minutes"),
+                "meetingroom_id": rng.choice(rooms)["id"],
+                "user_id": str(rng.choice(user_ids)),
+            })
+
+        mode = "old defaults" if args.old_defaults else "settings pragmas"
+        print(f"{mode}, {args.clients} clients x {args.requests} requests")
+        for name, request in (("ping", ping), ("booking", book)):
+            for clients in (args.clients, 1):
+                elapsed, codes = client.portal.call(run_clients, app, clients, args.requests, request)
+                runs.append(name)
+                total = sum(codes.values())
+                print(f"  {name:8s} {clients:3d} clients {total / elapsed:7.0f} req/s  codes {dict(codes)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# bench/statement_cache.py
+"""
+Частые запросы CRUD: время вызова в микросекундах (aiosqlite в том же
+процессе, лучшее из трех), счетчики общего кэша компиляции и цена сборки
+запроса с вычислением его ключа в кэше - то, что вызов платил до
+выполнения, когда select() строился заново каждый раз. Расписание в
+памяти и кэш чтения выключены.
+
+Для сравнения со сборкой на каждый вызов скрипт запускается в рабочей
+копии коммита до CRUDBase.statement (каталог bench/ копируется туда).
+
+    python bench/statement_cache.py --calls 3000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from common import migrate, use_temp_database
+
+ROOMS = 20
+RESERVATIONS = 500
+
+
+async def seed(now: datetime) -> None:
+    from app.core.db import AsyncSessionLocal
+    from app.models import Activity, MeetingRoom, Reservation, User
+
+    async with AsyncSessionLocal() as session:
+        session.add_all([MeetingRoom(name=f"Комната {index}", description="-") for index in range(ROOMS)])
+        session.add_all([
+            User(email=f"user{index}@example.com", hashed_password="-", fio=f"Пользователь {index}")
+            for index in range(ROOMS)
+        ])
+        await session.flush()
+        # Брони по полчаса каждый час, комнаты и пользователи по кругу
+        session.add_all([
+            Reservation(
+                meetingroom_id=1 + index % ROOMS,
+                user_id=1 + index % ROOMS,
+                from_reserve=now + timedelta(hours=index),
+                to_reserve=now + timedelta(hours=index, minutes=30),
+            )
+            for index in range(RESERVATIONS)
+        ])
+        session.add_all([Activity(meetingroom_id=1, user_id=1, computer_time=now) for _ in range(50)])
+        await session.commit()
+
+
+def crud_calls(now: datetime) -> dict:
+    from app.crud.activity import activity_crud
+    from app.crud.meeting_room import meeting_room_crud
+    from app.crud.reservation import reservation_crud
+    from app.crud.user import user_crud
+
+    def interval(index: int) -> dict:
+        start = now + timedelta(hours=index % RESERVATIONS)
+        return dict(from_reserve=start, to_reserve=start + timedelta(minutes=10))
+
+    return {
+        "get_room_by_name": lambda session, index: meeting_room_crud.get_room_by_name(
+            f"Комната {index % ROOMS}", session),
+        "get_user_by_email": lambda session, index: user_crud.get_user_by_email(
+            f"User{index % ROOMS}@example.com ", session),
+        "confirm_activty": lambda session, index: activity_crud.confirm_activty(
+            1 + index % 2, 1, timedelta(minutes=5), session),
+        "room_has_same_time": lambda session, index: reservation_crud.room_has_reservations_at_the_same_time(
+            **interval(index), meetingroom_id=1 + index % ROOMS, reservation_id=index % 2 or None, session=session),
+        "user_has_same_time": lambda session, index: reservation_crud.user_has_reservations_at_the_same_time(
+            **interval(index), user_id=1 + index % ROOMS, session=session),
+        "room_same_time": lambda session, index: reservation_crud.get_room_reservations_at_the_same_time(
+            **interval(index), meetingroom_id=1 + index % ROOMS, session=session),
+        "user_same_time": lambda session, index: reservation_crud.get_user_reservations_at_the_same_time(
+            **interval(index), user_id=1 + index % ROOMS, session=session),
+        "reservations_current": lambda session, index: reservation_crud.get_reservations_current(session),
+    }
+
+
+def per_call_builds(now: datetime) -> dict:
+    """Запросы, как их собирал каждый вызов: значения - литералы в условиях."""
+    from sqlalchemy import exists, func, select
+
+    from app.crud.reservation import reservation_crud, room_same_time, rtree_box
+    from app.crud.user import user_crud
+    from app.core.config import settings
+    from app.models import Activity, MeetingRoom, Reservation, User
+
+    def current():
+        statement = select(Reservation).options(*reservation_crud.load_options()).where(
+            Reservation.to_reserve > now, Reservation.from_reserve <= now,
+        ).order_by(Reservation.from_reserve.desc())
+        if settings.reservation_rtree_enabled:
+            statement = statement.where(*rtree_box(now, now))
+        return statement
+
+    hour = now + timedelta(hours=1)
+    return {
+        "get_room_by_name": lambda index: select(MeetingRoom).where(MeetingRoom.name == f"Комната {index}"),
+        "get_user_by_email": lambda index: select(User).options(*user_crud.load_options()).where(
+            func.lower(func.trim(User.email)) == f"user{index}@example.com"),
+        "confirm_activty": lambda index: select(exists().where(
+            Activity.meetingroom_id == 1, Activity.user_id == index, Activity.computer_time >= now)),
+        "room_has_same_time": lambda index: select(exists().where(*room_same_time(1, now, hour, index))),
+        "room_same_time": lambda index: select(Reservation).options(*reservation_crud.load_options()).where(
+            *room_same_time(1, now, hour)),
+        "reservations_current": lambda index: current(),
+    }
+
+
+async def measure_calls(now: datetime, calls: int) -> dict:
+    from app.core.db import AsyncSessionLocal
+
+    result = {}
+    async with AsyncSessionLocal() as session:
+        for name, call in crud_calls(now).items():
+            for index in range(200):
+                await call(session, index)
+            best = None
+            for _ in range(3):
+                started = time.perf_counter()
+                for index in range(calls):
+                    await call(session, index)
+                    # Карта идентичности не растет на весь прогон
+                    if index % 100 == 0:
+                        session.expunge_all()
+                elapsed = (time.perf_counter() - started) / calls * 1e6
+                best = elapsed if best is None else min(best, elapsed)
+            result[name] = best
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=3000, help="вызовов на запрос")
+    args = parser.parse_args()
+
+    use_temp_database(SCHEDULE_STORE_ENABLED="false", CRUD_CACHE_ENABLED="false")
+    migrate()
+
+    from app.core import db
+
+    now = datetime.now().replace(microsecond=0)
+
+    async def run() -> dict:
+        await seed(now)
+        try:
+            return await measure_calls(now, args.calls)
+        finally:
+            await db.engine.dispose()
+
+    timings = asyncio.run(run())
+    print(f"CRUD calls, {args.calls} calls, us per call")
+    for name, elapsed in timings.items():
+        print(f"  {name:24s} {elapsed:8.1f}")
+
+    # Общего кэша компиляции до CRUDBase.statement не было
+    statement_cache = getattr(db, "statement_cache", None)
+    if statement_cache is not None:
+        print(f"compiled cache: {statement_cache.as_dict()}")
+
+    print(f"statement build + cache key, {args.calls} builds, us per call")
+    for name, build in per_call_builds(now).items():
+        started = time.perf_counter()
+        for index in range(args.calls):
+            build(index)._generate_cache_key()
+        print(f"  {name:24s} {(time.perf_counter() - started) / args.calls * 1e6:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# tests/conftest.py
+import asyncio
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Настройки читаются при импорте app, поэтому окружение - до него. Рабочий
+# каталог временный: туда пишутся config/, data/uploads и база
+TMP_DIR = tempfile.mkdtemp(prefix="bronyka-tests-")
+atexit.register(shutil.rmtree, TMP_DIR, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TMP_DIR}/test.db"
+os.environ["CRON_TIMESHEET_ENABLED"] = "false"
+os.environ["CRON_AUTOCANCEL_ENABLED"] = "false"
+os.environ["AUTH_REQURE_STRONGPASS"] = "false"
+os.chdir(TMP_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.core.db import AsyncSessionLocal, engine  # noqa: E402
+from app.core.init_db import create_user  # noqa: E402
+from app.models import Reservation  # noqa: E402
+
+ADMIN = ("admin@example.com", "admin")
+USER = ("user@example.com", "user")
+
+
+def iso(value: datetime) -> str:
+    return value.isoformat(timespec="minutes")
+
+
+def login(client: TestClient, email: str, password: str) -> dict:
+    response = client.post("/auth/jwt/login", data={"username": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+async def prepare_db():
+    await create_user(*ADMIN, "Администратор", is_superuser=True)
+    await create_user(*USER, "Пользователь")
+    await engine.dispose()
+
+
+async def add_past_reservations(room_id: int, user_id: int, now: datetime):
+    # Закончившиеся брони API создать не дает - только напрямую в БД
+    async with AsyncSessionLocal() as session:
+        for days in (100, 60, 2):
+            from_reserve = now - timedelta(days=days)
+            await session.execute(insert(Reservation).values(
+                from_reserve=from_reserve,
+                to_reserve=from_reserve + timedelta(hours=1),
+                meetingroom_id=room_id,
+                user_id=user_id,
+            ))
+        await session.commit()
+
+
+@pytest.fixture(scope="session")
+def client():
+    config = Config(os.path.join(PROJECT_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(PROJECT_DIR, "alembic"))
+    command.upgrade(config, "head")
+    asyncio.run(prepare_db())
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def data(client):
+    """Комнаты, группа с правами, пользователь в группе, брони - текущие, прошедшие и архивные."""
+    admin = login(client, *ADMIN)
+    user = login(client, *USER)
+    user_id = client.get("/users/me", headers=user).json()["id"]
+    rooms = [
+        client.post("/api/meeting_rooms/", json={"name": name, "description": "-"}, headers=admin).json()
+        for name in ("Комната 1", "Комната 2")
+    ]
+    group = client.post("/api/groups/", json={"name": "Группа", "adGroupDN": "CN=group"}, headers=admin).json()
+    response = client.patch(f"/api/groups/{group['id']}", json={
+        "name": "Группа",
+        "adGroupDN": "CN=group",
+        "permissions": [
+            {"meetingroom_id": room["id"], "max_future_reservation": "7d"} for room in rooms
+        ],
+    }, headers=admin)
+    assert response.status_code == 200, response.text
+    response = client.patch(f"/users/{user_id}", json={"group_id": group["id"]}, headers=admin)
+    assert response.status_code == 200, response.text
+
+    now = datetime.now().replace(second=0, microsecond=0)
+    reservations = []
+    for hours, room in ((1, rooms[0]), (3, rooms[1]), (26, rooms[0])):
+        response = client.post("/api/reservations/", json={
+            "from_reserve": iso(now + timedelta(hours=hours)),
+            "to_reserve": iso(now + timedelta(hours=hours + 1)),
+            "meetingroom_id": room["id"],
+        }, headers=user)
+        assert response.status_code == 200, response.text
+        reservations.append(response.json())
+
+    client.portal.call(add_past_reservations, rooms[0]["id"], user_id, now)
+    # Брони старше 45 дней уходят в архив
+    response = client.post("/api/audit/clear_old", params={"days_after": 45}, headers=admin)
+    assert response.status_code == 200, response.text
+
+    return dict(
+        admin=admin,
+        user=user,
+        user_id=user_id,
+        rooms=rooms,
+        group=group,
+        reservations=reservations,
+        now=now,
+    )
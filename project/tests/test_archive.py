@@ -0,0 +1,98 @@
+# tests/test_archive.py
+"""
+Перенос броней в архив фоновой задачей (app.job.archive) одновременно с
+бронированием через API: задача пишет через очередь записи из своего
+потока и цикла событий, поэтому не получает "database is locked", а
+расписание в памяти остается согласованным с БД.
+"""
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.core.schedule import schedule_store
+from app.core.writer import write_queue
+from app.job.archive import archive_finished_reservations
+from app.models import Reservation, ReservationArchive
+
+OLD_RESERVATIONS = 500
+BOOKINGS = 20
+
+
+async def add_old_reservations(room_id: int, user_id: int, start: datetime) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(Reservation), [
+            dict(
+                from_reserve=start + timedelta(hours=index),
+                to_reserve=start + timedelta(hours=index, minutes=30),
+                meetingroom_id=room_id,
+                user_id=user_id,
+            )
+            for index in range(OLD_RESERVATIONS)
+        ])
+        await session.commit()
+
+
+async def load_schedule() -> None:
+    async with AsyncSessionLocal() as session:
+        await schedule_store.load(session)
+
+
+async def count_left(model, before: datetime) -> int:
+    async with AsyncSessionLocal() as session:
+        return await session.scalar(select(func.count()).select_from(model).where(model.to_reserve <= before))
+
+
+async def book_concurrently(app, headers: dict, bookings: list[dict]) -> list:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        responses = await asyncio.gather(*(
+            http.post("/api/reservations/", json=booking, headers=headers) for booking in bookings
+        ))
+    return [response.json() if response.status_code == 200 else response.text for response in responses]
+
+
+@pytest.mark.skipif(not write_queue.enabled, reason="очередь записи выключена (не WAL)")
+def test_archive_job_concurrent_with_bookings(client, data, monkeypatch):
+    # Мелкие пачки: перенос идет многими записями вперемешку с бронями
+    monkeypatch.setattr(settings, "reservation_archive_chunk_size", 10)
+    # Соединения задачи (job_engine без пула) открываются заново: без
+    # ожидания блокировки запись в обход очереди сразу получила бы SQLITE_BUSY
+    monkeypatch.setattr(settings, "sqlite_busy_timeout_ms", 0)
+    room_id = data["rooms"][1]["id"]
+    old_start = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=200)
+    client.portal.call(add_old_reservations, room_id, data["user_id"], old_start)
+
+    start = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=6)
+    bookings = [
+        {
+            "meetingroom_id": room_id,
+            "from_reserve": (start + timedelta(minutes=30 * index)).isoformat(timespec="minutes"),
+            "to_reserve": (start + timedelta(minutes=30 * index + 30)).isoformat(timespec="minutes"),
+        }
+        for index in range(BOOKINGS)
+    ]
+
+    client.portal.call(load_schedule)
+    # Как run_archive: asyncio.run в потоке задачи
+    archived = []
+    job = threading.Thread(target=lambda: archived.append(asyncio.run(archive_finished_reservations(45))))
+    job.start()
+    results = client.portal.call(book_concurrently, client.app, data["user"], bookings)
+    job.join()
+
+    assert all(isinstance(result, dict) for result in results), results
+    assert archived and archived[0] >= OLD_RESERVATIONS
+    before = datetime.now() - timedelta(days=45)
+    assert client.portal.call(count_left, Reservation, before) == 0
+    assert client.portal.call(count_left, ReservationArchive, before) >= OLD_RESERVATIONS
+
+    # Брони, записанные во время переноса, есть в расписании
+    assert schedule_store.is_fresh()
+    conflicts = schedule_store.room_conflicts(room_id, start, start + timedelta(minutes=30 * BOOKINGS))
+    assert {reservation.id for reservation in conflicts} == {result["id"] for result in results}
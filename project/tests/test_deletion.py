@@ -0,0 +1,82 @@
+# tests/test_deletion.py
+"""
+Удаление комнаты с правами групп и бронями и группы с пользователями.
+В схеме у этих внешних ключей нет ondelete, поэтому SQLite работает без
+PRAGMA foreign_keys (settings.sqlite_foreign_keys).
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.core.db import AsyncSessionLocal
+from app.core.init_db import create_user
+from app.models import ReservationQuotaCounter
+
+MEMBER = ("member@example.com", "member")
+
+
+def iso(value: datetime) -> str:
+    return value.isoformat(timespec="minutes")
+
+
+def login(client, email: str, password: str) -> dict:
+    response = client.post("/auth/jwt/login", data={"username": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+async def count_quota_counters(room_id: int) -> int:
+    async with AsyncSessionLocal() as session:
+        return await session.scalar(
+            select(func.count()).where(ReservationQuotaCounter.meetingroom_id == room_id)
+        )
+
+
+def group_permissions(client, data, rooms: list[dict]) -> None:
+    response = client.patch(f"/api/groups/{data['group']['id']}", json={
+        "name": data["group"]["name"],
+        "adGroupDN": data["group"]["adGroupDN"],
+        "permissions": [
+            {"meetingroom_id": room["id"], "max_future_reservation": "7d"} for room in rooms
+        ],
+    }, headers=data["admin"])
+    assert response.status_code == 200, response.text
+
+
+def test_delete_room_with_permissions_and_reservations(client, data):
+    admin = data["admin"]
+    room = client.post("/api/meeting_rooms/", json={"name": "Удаляемая комната", "description": "-"}, headers=admin).json()
+    group_permissions(client, data, data["rooms"] + [room])
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=5)
+    response = client.post("/api/reservations/", json={
+        "meetingroom_id": room["id"],
+        "from_reserve": iso(start),
+        "to_reserve": iso(start + timedelta(hours=1)),
+    }, headers=data["user"])
+    assert response.status_code == 200, response.text
+    assert client.portal.call(count_quota_counters, room["id"]) == 1
+
+    response = client.delete(f"/api/meeting_rooms/{room['id']}", headers=admin)
+    assert response.status_code == 200, response.text
+    # Счетчики квот комнаты удалены вместе с ней: id комнаты SQLite может
+    # выдать снова
+    assert client.portal.call(count_quota_counters, room["id"]) == 0
+
+    group_permissions(client, data, data["rooms"])
+    rooms = client.get("/api/meeting_rooms/", headers=admin).json()
+    assert room["id"] not in [item["id"] for item in rooms]
+
+
+def test_delete_group_with_users(client, data):
+    admin = data["admin"]
+    group = client.post("/api/groups/", json={"name": "Удаляемая группа", "adGroupDN": "CN=removed"}, headers=admin).json()
+    client.portal.call(create_user, *MEMBER, "Участник группы")
+    member_id = client.get("/users/me", headers=login(client, *MEMBER)).json()["id"]
+    response = client.patch(f"/users/{member_id}", json={"group_id": group["id"]}, headers=admin)
+    assert response.status_code == 200, response.text
+
+    response = client.delete(f"/api/groups/{group['id']}", headers=admin)
+    assert response.status_code == 200, response.text
+
+    # Пользователь остается и может войти
+    assert client.get("/users/me", headers=login(client, *MEMBER)).status_code == 200
@@ -0,0 +1,59 @@
+# tests/test_double_booking.py
+"""
+Параллельные бронирования одного слота одной комнаты за одного
+пользователя: проходит ровно одно, остальные получают 422, а в
+reservation не остается пересекающихся броней ни по комнате, ни по
+пользователю.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import text
+
+from app.core.db import AsyncSessionLocal
+
+CLIENTS = 20
+
+# Пары броней одной комнаты (одного пользователя), пересекающиеся по
+# [from_reserve, to_reserve)
+OVERLAPS = (
+    "SELECT count(*) FROM reservation a JOIN reservation b "
+    "ON a.id < b.id AND a.{column} = b.{column} "
+    "AND a.from_reserve < b.to_reserve AND b.from_reserve < a.to_reserve"
+)
+
+
+async def book_concurrently(app, headers: dict, bookings: list[dict]) -> list[int]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        responses = await asyncio.gather(*(
+            http.post("/api/reservations/", json=booking, headers=headers) for booking in bookings
+        ))
+    return [response.status_code for response in responses]
+
+
+async def count_overlaps() -> dict:
+    async with AsyncSessionLocal() as session:
+        return {
+            column: (await session.execute(text(OVERLAPS.format(column=column)))).scalar()
+            for column in ("meetingroom_id", "user_id")
+        }
+
+
+def test_concurrent_bookings_of_one_slot(client, data):
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=4)
+    # Одинаковые и сдвинутые на 15 минут интервалы: пересекаются все
+    bookings = [
+        {
+            "meetingroom_id": data["rooms"][0]["id"],
+            "from_reserve": (start + timedelta(minutes=15 * (index % 2))).isoformat(timespec="minutes"),
+            "to_reserve": (start + timedelta(minutes=60 + 15 * (index % 2))).isoformat(timespec="minutes"),
+        }
+        for index in range(CLIENTS)
+    ]
+
+    codes = client.portal.call(book_concurrently, client.app, data["user"], bookings)
+
+    assert sorted(codes) == [200] + [422] * (CLIENTS - 1)
+    assert client.portal.call(count_overlaps) == {"meetingroom_id": 0, "user_id": 0}
@@ -0,0 +1,188 @@
+# tests/test_loads.py
+"""
+Связи моделей по умолчанию lazy="raise_on_sql": все, что отдают схемы
+ответа, CRUD загружает сам (loads, returning_loads). Тесты проходят
+чтения CRUD и эндпоинты - пропущенная загрузка связи падает с
+InvalidRequestError, а TestClient пробрасывает ошибку сервера в тест.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.crud.group import group_crud
+from app.crud.meeting_room import meeting_room_crud
+from app.crud.reservation import reservation_crud
+from app.crud.reservation_archive import reservation_archive_crud
+from app.crud.user import user_crud
+from app.schemas.group import GroupWithPerms
+from app.schemas.meeting_room import MeetingRoomDB
+from app.schemas.reservation import ReservationRoomDB
+from app.schemas.user import UserRead
+
+
+def iso(value: datetime) -> str:
+    return value.isoformat(timespec="minutes")
+
+
+@pytest.fixture(params=[True, False], ids=["schedule_store", "db"])
+def schedule_store(request, monkeypatch):
+    # Часть чтений броней отвечает из расписания в памяти, часть - из БД
+    monkeypatch.setattr(settings, "schedule_store_enabled", request.param)
+
+
+@pytest.fixture(params=[True, False], ids=["cached", "uncached"])
+def read_cache(request, monkeypatch):
+    # Из кэша чтения приходят копии объектов, а не объекты сессии
+    monkeypatch.setattr(settings, "crud_cache_enabled", request.param)
+
+
+def get_ok(client, url, headers, **params):
+    response = client.get(url, params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_reservation_endpoints(client, data, schedule_store, read_cache):
+    user, admin, now = data["user"], data["admin"], data["now"]
+    room_id = data["rooms"][0]["id"]
+    window = {"from": iso(now - timedelta(days=200)), "to": iso(now + timedelta(days=2))}
+
+    assert get_ok(client, "/api/reservations/", user)
+    get_ok(client, "/api/reservations/", user, current="true")
+    get_ok(client, "/api/reservations/", user, room_id=room_id, user_id=data["user_id"], limit=1)
+    assert get_ok(client, "/api/reservations/my_reservations", user)
+    assert get_ok(client, "/api/reservations/my_reservations", user, history="true")
+    assert get_ok(client, "/api/reservations/my_reservations", user, **window)
+    assert get_ok(client, f"/api/reservations/for-user/{data['user_id']}", admin, **window)
+    assert get_ok(client, f"/api/meeting_rooms/{room_id}/reservations", user)
+    assert get_ok(client, f"/api/meeting_rooms/{room_id}/reservations", user, history="true")
+    assert get_ok(client, f"/api/meeting_rooms/{room_id}/reservations", user, **window)
+    get_ok(client, "/api/meeting_rooms/availability", user, **{
+        "from": iso(now), "to": iso(now + timedelta(days=1)),
+    })
+
+    response = client.post("/api/reservations/check", json=[{
+        "meetingroom_id": room_id,
+        "from_reserve": iso(now + timedelta(hours=1)),
+        "to_reserve": iso(now + timedelta(hours=2)),
+    }], headers=user)
+    assert response.status_code == 200, response.text
+
+
+def test_reservation_writes(client, data, schedule_store, read_cache):
+    user, admin, now = data["user"], data["admin"], data["now"]
+    room_id = data["rooms"][1]["id"]
+    start = now + timedelta(days=2)
+
+    def slot(hours: int) -> dict:
+        return {
+            "meetingroom_id": room_id,
+            "from_reserve": iso(start + timedelta(hours=hours)),
+            "to_reserve": iso(start + timedelta(hours=hours + 1)),
+        }
+
+    # Ответы записей собираются из RETURNING (returning_loads)
+    response = client.post("/api/reservations/", json=slot(0), headers=user)
+    assert response.status_code == 200, response.text
+    reservation = response.json()
+    response = client.patch(f"/api/reservations/{reservation['id']}", params={"version": reservation["version"]}, json={
+        "from_reserve": slot(0)["from_reserve"],
+        "to_reserve": iso(start + timedelta(minutes=90)),
+    }, headers=user)
+    assert response.status_code == 200, response.text
+    response = client.delete(f"/api/reservations/{reservation['id']}", headers=user)
+    assert response.status_code == 200, response.text
+
+    items = [dict(slot(hours), user_id=data["user_id"]) for hours in (2, 3)]
+    response = client.post("/api/reservations/bulk", json={"items": items}, headers=admin)
+    assert response.status_code == 200, response.text
+    ids = [item["id"] for item in response.json()["reservations"]]
+    assert len(ids) == 2
+    response = client.request("DELETE", "/api/reservations/bulk", json={"ids": ids}, headers=admin)
+    assert response.status_code == 200, response.text
+    assert sorted(item["id"] for item in response.json()["reservations"]) == sorted(ids)
+
+
+def test_user_and_group_endpoints(client, data, read_cache):
+    user, admin = data["user"], data["admin"]
+
+    assert get_ok(client, "/users/me", user)["group"]
+    assert get_ok(client, f"/users/{data['user_id']}", admin)["group"]
+    assert get_ok(client, "/users", admin)
+    assert get_ok(client, "/api/groups/", admin)
+    assert get_ok(client, f"/api/groups/{data['group']['id']}", admin)["permissions"]
+    assert get_ok(client, "/api/meeting_rooms/", user)
+
+
+def test_crud_reads(client, data, schedule_store, read_cache):
+    now, user_id = data["now"], data["user_id"]
+    room_ids = [room["id"] for room in data["rooms"]]
+    window = dict(from_reserve=now - timedelta(days=200), to_reserve=now + timedelta(days=2))
+
+    async def read():
+        # Схемы проверяются внутри сессии: связи, не загруженные CRUD,
+        # здесь и падают с raise_on_sql
+        async with AsyncSessionLocal() as session:
+            reservations = [
+                *await reservation_crud.get_room_reservations_at_the_same_time(
+                    meetingroom_id=room_ids[0], **window, session=session),
+                *await reservation_crud.get_user_reservations_at_the_same_time(
+                    user_id=user_id, **window, session=session),
+                *await reservation_crud.get_reservations_at_the_same_time(**window, session=session),
+                *await reservation_crud.get_reservations_for_room(
+                    room_ids[0], include_past=True, session=session),
+                *await reservation_crud.get_reservations_for_room(
+                    room_ids[0], include_past=False, **window, session=session),
+                *await reservation_crud.get_reservations_for_user(
+                    user_id, include_past=True, session=session),
+                *await reservation_crud.get_reservations_for_user(
+                    user_id, include_past=False, **window, session=session),
+                *await reservation_crud.get_page(limit=10, session=session),
+                *await reservation_crud.get_reservations_current(session=session),
+                *await reservation_archive_crud.get_window(user_id=user_id, **window, session=session),
+            ]
+            for room_conflicts, user_conflicts in await reservation_crud.get_slots_reservations_at_the_same_time(
+                slots=[(room_ids[0], user_id, window["from_reserve"], window["to_reserve"])],
+                session=session,
+            ):
+                reservations += [*room_conflicts, *user_conflicts]
+            assert reservations
+            for reservation in reservations:
+                ReservationRoomDB.model_validate(reservation)
+
+            context = await reservation_crud.get_reservation_context(
+                meetingroom_id=room_ids[0], user_id=user_id,
+                from_reserve=now + timedelta(days=3), to_reserve=now + timedelta(days=3, hours=1),
+                session=session,
+            )
+            MeetingRoomDB.model_validate(context[0])
+            UserRead.model_validate(context[1])
+            for row in await reservation_crud.get_rooms_permissions(
+                meetingroom_ids=room_ids, group_id=data["group"]["id"], session=session,
+            ):
+                MeetingRoomDB.model_validate(row[0])
+
+            users = [
+                await user_crud.get(user_id, session),
+                await user_crud.get_user_by_email("user@example.com", session),
+                *await user_crud.get_user_by_fio("Пользователь", session),
+                *await user_crud.get_multi(session),
+            ]
+            for user in users:
+                UserRead.model_validate(user)
+
+            for group in [await group_crud.get(data["group"]["id"], session), *await group_crud.get_multi(session)]:
+                GroupWithPerms.model_validate(group)
+                repr(group)
+
+            rooms = [
+                await meeting_room_crud.get(room_ids[0], session),
+                await meeting_room_crud.get_room_by_name(data["rooms"][0]["name"], session),
+                *await meeting_room_crud.get_allowed_rooms(data["group"]["id"], session),
+            ]
+            for room in rooms:
+                MeetingRoomDB.model_validate(room)
+
+    client.portal.call(read)
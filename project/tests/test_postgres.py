@@ -0,0 +1,183 @@
+# tests/test_postgres.py
+"""
+EXCLUDE-ограничения PostgreSQL против пересечений броней (миграция
+e5c3a9f07b18). Нужен сервер: TEST_POSTGRES_URL=postgresql+asyncpg://...
+Тесты создают на нем отдельную базу, накатывают миграции и удаляют ее
+после себя. Без TEST_POSTGRES_URL тесты пропускаются.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.api.validators import check_overlap_violation
+from app.core.db import overlap_savepoint
+from app.core.schedule import schedule_store
+from app.crud.reservation import ROOM_OVERLAP_CONSTRAINT, USER_OVERLAP_CONSTRAINT, overlap_constraint, reservation_crud
+from app.models import MeetingRoom, Reservation, User
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL не задан")
+
+
+async def execute_autocommit(url, statement: str) -> None:
+    # CREATE/DROP DATABASE не выполняются внутри транзакции
+    engine = create_async_engine(url, poolclass=NullPool, isolation_level="AUTOCOMMIT")
+    async with engine.connect() as connection:
+        await connection.execute(text(statement))
+    await engine.dispose()
+
+
+def migrate(url) -> None:
+    # alembic/env.py берет адрес базы из окружения
+    previous = os.environ["DATABASE_URL"]
+    os.environ["DATABASE_URL"] = url.render_as_string(hide_password=False)
+    try:
+        config = Config(os.path.join(PROJECT_DIR, "alembic.ini"))
+        config.set_main_option("script_location", os.path.join(PROJECT_DIR, "alembic"))
+        command.upgrade(config, "head")
+    finally:
+        os.environ["DATABASE_URL"] = previous
+
+
+async def add_room_and_users(session_factory) -> tuple[int, int, int]:
+    async with session_factory() as session:
+        room = MeetingRoom(name="Комната", description="-")
+        users = [User(email=f"user{index}@example.com", hashed_password="-", fio="-") for index in range(2)]
+        session.add_all([room, *users])
+        await session.commit()
+        return room.id, users[0].id, users[1].id
+
+
+@pytest.fixture(scope="module")
+def postgres():
+    server_url = make_url(POSTGRES_URL)
+    name = f"bronyka_test_{uuid.uuid4().hex[:8]}"
+    url = server_url.set(database=name)
+    asyncio.run(execute_autocommit(server_url, f"CREATE DATABASE {name}"))
+    try:
+        migrate(url)
+        engine = create_async_engine(url, poolclass=NullPool)
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        room_id, user_id, other_user_id = asyncio.run(add_room_and_users(session_factory))
+        yield session_factory, room_id, user_id, other_user_id
+    finally:
+        # Брони этой базы не должны остаться в расписании процесса
+        schedule_store.invalidate()
+        asyncio.run(execute_autocommit(server_url, f"DROP DATABASE IF EXISTS {name} WITH (FORCE)"))
+
+
+def write_reservations(session_factory, reservations: list[dict]) -> list:
+    """
+    Пишет брони по одной, каждую в своей точке сохранения, как эндпоинты.
+    Возвращает имена нарушенных ограничений (None - бронь записана).
+    """
+    async def write():
+        violations = []
+        async with session_factory() as session:
+            for values in reservations:
+                try:
+                    async with overlap_savepoint(session):
+                        await reservation_crud.create(Reservation(**values), session, commit=False)
+                    violations.append(None)
+                except IntegrityError as error:
+                    violations.append(overlap_constraint(error))
+            await session.commit()
+        return violations
+
+    return asyncio.run(write())
+
+
+def slot(start: datetime, hours: float, minutes: int, room_id: int, user_id: int) -> dict:
+    from_reserve = start + timedelta(hours=hours)
+    return dict(
+        from_reserve=from_reserve,
+        to_reserve=from_reserve + timedelta(minutes=minutes),
+        meetingroom_id=room_id,
+        user_id=user_id,
+    )
+
+
+def test_overlapping_reservations_rejected(postgres):
+    session_factory, room_id, user_id, other_user_id = postgres
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=1)
+
+    assert write_reservations(session_factory, [
+        slot(start, 0, 60, room_id, user_id),
+        # Та же комната, другой пользователь
+        slot(start, 0.5, 60, room_id, other_user_id),
+        slot(start, -0.5, 45, room_id, other_user_id),
+    ]) == [None, ROOM_OVERLAP_CONSTRAINT, ROOM_OVERLAP_CONSTRAINT]
+
+
+def test_user_overlap_rejected(postgres):
+    session_factory, room_id, user_id, other_user_id = postgres
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=2)
+
+    async def add_room() -> int:
+        async with session_factory() as session:
+            room = MeetingRoom(name="Другая комната", description="-")
+            session.add(room)
+            await session.commit()
+            return room.id
+
+    other_room_id = asyncio.run(add_room())
+    assert write_reservations(session_factory, [
+        slot(start, 0, 60, room_id, user_id),
+        slot(start, 0.5, 60, other_room_id, user_id),
+        slot(start, 0.5, 60, other_room_id, other_user_id),
+    ]) == [None, USER_OVERLAP_CONSTRAINT, None]
+
+
+def test_touching_reservations_accepted(postgres):
+    session_factory, room_id, user_id, other_user_id = postgres
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=3)
+
+    # Интервалы полуоткрытые '[)': конец одной брони - начало следующей
+    assert write_reservations(session_factory, [
+        slot(start, 0, 60, room_id, user_id),
+        slot(start, 1, 60, room_id, user_id),
+        slot(start, 2, 60, room_id, other_user_id),
+        slot(start, -1, 60, room_id, other_user_id),
+    ]) == [None, None, None, None]
+
+
+def test_violation_maps_to_422(postgres):
+    session_factory, room_id, user_id, other_user_id = postgres
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=4)
+    write_reservations(session_factory, [slot(start, 0, 60, room_id, user_id)])
+
+    async def write() -> tuple[HTTPException, int]:
+        async with session_factory() as session:
+            try:
+                async with overlap_savepoint(session):
+                    await reservation_crud.create(
+                        Reservation(**slot(start, 0.5, 60, room_id, other_user_id)), session, commit=False
+                    )
+            except IntegrityError as error:
+                with pytest.raises(HTTPException) as raised:
+                    await check_overlap_violation(error, session)
+            # Откатилась только точка сохранения: транзакция продолжается
+            count = await session.scalar(text(
+                "SELECT count(*) FROM reservation WHERE meetingroom_id = :room_id"
+            ), {"room_id": room_id})
+            return raised.value, count
+
+    error, count = asyncio.run(write())
+    assert error.status_code == 422
+    assert "комнаты" in error.detail
+    assert count >= 1
@@ -0,0 +1,111 @@
+# tests/test_quotas.py
+"""
+Квота активных броней группы (max_active_reservations): активной
+считается бронь, которая еще не закончилась (to_reserve > now), а не
+любая бронь, начавшаяся сегодня.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete
+
+from app.core.db import AsyncSessionLocal
+from app.core.schedule import schedule_store
+from app.crud.reservation import reservation_crud
+from app.models import Reservation, ReservationQuotaCounter
+
+
+def iso(value: datetime) -> str:
+    return value.isoformat(timespec="minutes")
+
+
+async def add_reservation(room_id: int, user_id: int, from_reserve: datetime, to_reserve: datetime) -> None:
+    # Брони, начавшиеся в прошлом, API создать не дает - только через CRUD,
+    # который ведет и счетчики квот
+    async with AsyncSessionLocal() as session:
+        await reservation_crud.create(Reservation(
+            from_reserve=from_reserve,
+            to_reserve=to_reserve,
+            meetingroom_id=room_id,
+            user_id=user_id,
+        ), session, commit=False)
+        await session.commit()
+
+
+async def remove_reservations(room_id: int) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(Reservation).where(Reservation.meetingroom_id == room_id))
+        await session.execute(delete(ReservationQuotaCounter).where(ReservationQuotaCounter.meetingroom_id == room_id))
+        await session.commit()
+    # Удаление мимо CRUD: расписание и кэш чтения перечитают БД
+    schedule_store.invalidate()
+    reservation_crud.invalidate()
+
+
+@pytest.fixture
+def quota_room(client, data):
+    """Комната с квотой в одну активную бронь в группе пользователя."""
+    admin = data["admin"]
+    room = client.post("/api/meeting_rooms/", json={"name": "Комната с квотой", "description": "-"}, headers=admin).json()
+
+    def set_permissions(extra: list[dict]) -> None:
+        response = client.patch(f"/api/groups/{data['group']['id']}", json={
+            "name": data["group"]["name"],
+            "adGroupDN": data["group"]["adGroupDN"],
+            "permissions": [
+                {"meetingroom_id": item["id"], "max_future_reservation": "7d"} for item in data["rooms"]
+            ] + extra,
+        }, headers=admin)
+        assert response.status_code == 200, response.text
+
+    set_permissions([{"meetingroom_id": room["id"], "max_future_reservation": "7d", "max_active_reservations": 1}])
+    yield room
+    set_permissions([])
+    client.portal.call(remove_reservations, room["id"])
+    response = client.delete(f"/api/meeting_rooms/{room['id']}", headers=admin)
+    assert response.status_code == 200, response.text
+
+
+def book(client, data, room_id: int, days: int):
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(days=days)
+    return client.post("/api/reservations/", json={
+        "meetingroom_id": room_id,
+        "from_reserve": iso(start),
+        "to_reserve": iso(start + timedelta(hours=1)),
+    }, headers=data["user"])
+
+
+def test_ended_today_is_not_active(client, data, quota_room):
+    now = datetime.now()
+    # Закончилась только что: для квоты уже не активна, хотя день тот же
+    client.portal.call(
+        add_reservation, quota_room["id"], data["user_id"],
+        max(now.replace(hour=0, minute=0, second=0, microsecond=0), now - timedelta(hours=1)),
+        now - timedelta(seconds=1),
+    )
+
+    response = book(client, data, quota_room["id"], days=2)
+    assert response.status_code == 200, response.text
+    response = book(client, data, quota_room["id"], days=3)
+    assert response.status_code == 422, response.text
+
+
+def test_running_is_active(client, data, quota_room):
+    now = datetime.now()
+    # Идет сейчас: занимает квоту до to_reserve
+    client.portal.call(
+        add_reservation, quota_room["id"], data["user_id"],
+        now - timedelta(minutes=30), now + timedelta(minutes=5),
+    )
+
+    response = book(client, data, quota_room["id"], days=2)
+    assert response.status_code == 422, response.text
+    assert "предстоящих" in response.text
+
+    response = client.post("/api/reservations/check", json=[{
+        "meetingroom_id": quota_room["id"],
+        "from_reserve": iso(now + timedelta(days=2)),
+        "to_reserve": iso(now + timedelta(days=2, hours=1)),
+    }], headers=data["user"])
+    assert response.status_code == 200, response.text
+    assert not response.json()[0]["available"]
@@ -0,0 +1,27 @@
+# tests/test_settings.py
+"""
+Значения PRAGMA SQLite подставляются в запрос как есть, поэтому Settings
+принимает только допустимые значения (в любом регистре).
+"""
+import pytest
+from pydantic.v1 import ValidationError
+
+from app.core.config import Settings
+
+
+def test_pragma_values_are_normalized():
+    settings = Settings(sqlite_journal_mode="wal", sqlite_synchronous="full", sqlite_temp_store="memory")
+    assert settings.sqlite_journal_mode == "WAL"
+    assert settings.sqlite_synchronous == "FULL"
+    assert settings.sqlite_temp_store == "MEMORY"
+
+
+@pytest.mark.parametrize("field, value", [
+    ("sqlite_journal_mode", "WAL; DROP TABLE reservation"),
+    ("sqlite_journal_mode", "wal2"),
+    ("sqlite_synchronous", "FAST"),
+    ("sqlite_temp_store", "DISK"),
+])
+def test_invalid_pragma_values_rejected(field, value):
+    with pytest.raises(ValidationError):
+        Settings(**{field: value})